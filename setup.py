@@ -28,6 +28,7 @@ setup(
               'factiva.analytics.streams', 'factiva.analytics.integration'
             #   , 'factiva.analytics.lists',
               ],
+    package_data={'factiva.analytics.common': ['*.csv', '*.npz']},
     # packages=find_packages(where='src'),
     url='https://developer.dowjones.com/',
     project_urls={
@@ -84,5 +85,6 @@ setup(
         ],
         'mongodb': ['pymongo'],
         'elasticsearch': ['elasticsearch'],
-        'bigquery': ['google-cloud-bigquery']
+        'bigquery': ['google-cloud-bigquery'],
+        'parquet': ['pyarrow']
     })
@@ -9,6 +9,7 @@ __all__ = [
     'SnapshotTimeSeries', 'SnapshotTimeSeriesQuery', 'SnapshotTimeSeriesJobReponse',
     'SnapshotExtraction', 'SnapshotExtractionQuery', 'SnapshotExtractionJobReponse',
     'SnapshotExtractionList', 'SnapshotExtractionListItem',
+    'SnapshotUpdate', 'SnapshotUpdateJobReponse', 'SnapshotExtractionPlanner',
     'StreamingInstance', 'StreamingQuery', 'StreamingSubscription',
     'StreamingInstanceList', 'StreamingInstanceListItem',
     'SnapshotFiles'
@@ -21,6 +22,7 @@ from .taxonomy import FactivaTaxonomy, FactivaTaxonomyCategories
 from .snapshots import SnapshotExplain, SnapshotExplainQuery, SnapshotExplainJobResponse, SnapshotExplainSamplesResponse
 from .snapshots import SnapshotTimeSeries, SnapshotTimeSeriesQuery, SnapshotTimeSeriesJobReponse
 from .snapshots import SnapshotExtraction, SnapshotExtractionQuery, SnapshotExtractionJobReponse, SnapshotExtractionList, SnapshotExtractionListItem
+from .snapshots import SnapshotUpdate, SnapshotUpdateJobReponse, SnapshotExtractionPlanner
 from .streams import StreamingInstance, StreamingQuery, StreamingSubscription, StreamingInstanceList, StreamingInstanceListItem
 from .integration import SnapshotFiles
 # from .tools import JSONLFileHandler, BigQueryHandler, MongoDBHandler
@@ -2,9 +2,10 @@
 Factiva Analytics package constants
 """
 
-__all__ = ['const', 'config']
+__all__ = ['const', 'config', 'ResultCache']
 
 from . import const, config
+from .cache import ResultCache
 
 
 
@@ -0,0 +1,175 @@
+"""
+  Persistent on-disk cache for job results, keyed by query fingerprint
+"""
+import os
+import json
+import time
+import pickle
+from . import config, const, tools
+
+
+def _remove_if_exists(f_path) -> bool:
+    # Entries removed by another process in the meantime are ignored
+    try:
+        os.remove(f_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class ResultCache(object):
+    """
+    Stores results of Snapshot jobs (Explain volumes, TimeSeries datasets)
+    on disk, so identical requests can be answered without submitting a
+    new job. Entries expire after a per-job-type TTL and the least recently
+    used entries are evicted when ``max_entries`` is exceeded.
+
+    Parameters
+    ----------
+    cache_folder : str, optional
+        Folder where entries are stored. Default is the ``results`` subfolder
+        of ``config.CACHE_DEFAULT_FOLDER``.
+    ttl : dict, optional
+        Time-to-live in seconds per job type. Default is ``const.RESULT_CACHE_TTL``.
+    max_entries : int, optional
+        Max number of entries kept in the cache folder.
+
+    """
+
+    cache_folder = None
+    ttl = None
+    max_entries = None
+
+    def __init__(self, cache_folder=None, ttl=None, max_entries=const.RESULT_CACHE_MAX_ENTRIES):
+        if cache_folder is None:
+            cache_folder = os.path.join(config.CACHE_DEFAULT_FOLDER, const.RESULT_CACHE_SUBFOLDER)
+        self.cache_folder = cache_folder
+        self.ttl = dict(const.RESULT_CACHE_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.max_entries = max_entries
+
+
+    @staticmethod
+    def make_key(payload, user_key) -> str:
+        """Creates a canonical fingerprint for a request payload
+        Parameters
+        ----------
+        payload : dict
+            Request payload as returned by the query ``get_payload()`` method
+        user_key : UserKey or str
+            User key sending the request. Results are not shared between keys.
+        Returns
+        -------
+        str
+            MD5 hash of the user key and the sorted JSON payload
+        """
+        key = user_key.key if hasattr(user_key, 'key') else str(user_key)
+        return tools.md5hash(f"{key}|{json.dumps(payload, sort_keys=True, separators=(',', ':'))}")
+
+
+    def _entry_path(self, job_type, key) -> str:
+        return os.path.join(self.cache_folder, f"{job_type}-{key}.pkl")
+
+
+    def get(self, job_type, key):
+        """Obtains a cached value if it exists and has not expired
+        Parameters
+        ----------
+        job_type : str
+            Job type of the entry, e.g. ``explain`` or ``timeseries``
+        key : str
+            Entry key created with ``make_key``
+        Returns
+        -------
+        object
+            Cached value, or None if not found or expired
+        """
+        entry_path = self._entry_path(job_type, key)
+        if not os.path.exists(entry_path):
+            return None
+        try:
+            with open(entry_path, 'rb') as entry_file:
+                entry = pickle.load(entry_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Other processes can expire or evict the same entry at any time
+        if time.time() - entry['created'] > self.ttl.get(job_type, 0):
+            _remove_if_exists(entry_path)
+            return None
+        try:
+            os.utime(entry_path)  # Marks the entry as recently used
+        except FileNotFoundError:
+            pass
+        return entry['value']
+
+
+    def set(self, job_type, key, value) -> str:
+        """Stores a value in the cache, replacing any previous entry
+        Parameters
+        ----------
+        job_type : str
+            Job type of the entry, e.g. ``explain`` or ``timeseries``
+        key : str
+            Entry key created with ``make_key``
+        value : object
+            Picklable value to store
+        Returns
+        -------
+        str
+            Path of the stored entry
+        """
+        tools.create_path_if_not_exist(self.cache_folder)
+        entry_path = self._entry_path(job_type, key)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as entry_file:
+            pickle.dump({'created': time.time(), 'value': value}, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        self._evict()
+        return entry_path
+
+
+    def _evict(self):
+        entries = []
+        for file_name in os.listdir(self.cache_folder):
+            if file_name.endswith('.pkl'):
+                f_path = os.path.join(self.cache_folder, file_name)
+                try:
+                    entries.append((os.stat(f_path).st_mtime, f_path))
+                except FileNotFoundError:
+                    continue
+        for _, f_path in sorted(entries)[:max(len(entries) - self.max_entries, 0)]:
+            _remove_if_exists(f_path)
+
+
+    def clear(self, job_type=None) -> int:
+        """Removes entries from the cache folder
+        Parameters
+        ----------
+        job_type : str, optional
+            If provided, only entries for this job type are removed.
+        Returns
+        -------
+        int
+            Number of removed entries
+        """
+        if not os.path.exists(self.cache_folder):
+            return 0
+        removed = 0
+        prefix = f"{job_type}-" if job_type else ''
+        for file_name in os.listdir(self.cache_folder):
+            if file_name.endswith('.pkl') and file_name.startswith(prefix):
+                removed += _remove_if_exists(os.path.join(self.cache_folder, file_name))
+        return removed
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}cache_folder: {tools.print_property(self.cache_folder)}\n"
+        ret_val += f"{prefix}ttl: {self.ttl}\n"
+        ret_val += f"{prefix[0:-2]}└─max_entries: {tools.print_property(self.max_entries)}"
+        return ret_val
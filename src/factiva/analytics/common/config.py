@@ -22,4 +22,13 @@ LISTENER_FILES_DEFAULT_FOLDER = load_environment_value(
     'STREAM_FILES_DIR', os.path.join(os.getcwd(), 'listener'))
 LOGS_DEFAULT_FOLDER = load_environment_value(
     'LOG_FILES_DIR', os.path.join(os.path.expanduser('~'), const.LOGS_DEFAULT_PATH))
+CACHE_DEFAULT_FOLDER = load_environment_value(
+    'CACHE_FILES_DIR', os.path.join(os.path.expanduser('~'), const.CACHE_DEFAULT_PATH))
 
+# Taxonomy cache revalidation period in seconds
+TAXONOMY_CACHE_REVALIDATE_AFTER = load_environment_value(
+    'TAXONOMY_CACHE_REVALIDATE_AFTER', str(const.TAXONOMY_CACHE_REVALIDATE_AFTER))
+
+# Taxonomy categories downloaded in background by FactivaTaxonomy(prefetch=True)
+TAXONOMY_PREFETCH_CATEGORIES = load_environment_value(
+    'TAXONOMY_PREFETCH_CATEGORIES', const.TAXONOMY_PREFETCH_CATEGORIES)
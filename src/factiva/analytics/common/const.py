@@ -3,6 +3,7 @@ Constants for the Factiva Analytics package
 """
 
 LOGS_DEFAULT_PATH = '.factiva/logs'
+CACHE_DEFAULT_PATH = '.factiva/cache'
 
 API_HOST = 'https://api.dowjones.com'
 API_ACCOUNT_OAUTH2_URL = 'https://accounts.dowjones.com/oauth2/v1/token'
@@ -34,6 +35,14 @@ CUSIP_COMPANY_IDENTIFIER = 'cusip'
 ISIN_COMPANY_IDENTIFIER = 'isin'
 SEDOL_COMPANY_IDENTIFIER = 'sedol'
 TICKER_COMPANY_IDENTIFIER = 'ticker'
+API_COMPANIES_MAX_BATCH_SIZE = 1000  # Identifiers per request to the companies endpoint
+API_COMPANIES_MAX_CONCURRENT_REQUESTS = 4
+PIT_FIELD_CANDIDATES = {  # Lower-case column names detected in point-in-time files
+    'value': ['value', 'identifier', 'identifier_value', 'id', 'isin', 'cusip', 'sedol', 'ticker', 'ticker_exchange'],
+    'code': ['fcode', 'factiva_code', 'code', 'company_code'],
+    'start': ['start_date', 'from_date', 'valid_from', 'start', 'from'],
+    'end': ['end_date', 'to_date', 'valid_to', 'end', 'to']
+}
 API_COMPANIES_IDENTIFIER_TYPE = [
     CUSIP_COMPANY_IDENTIFIER, ISIN_COMPANY_IDENTIFIER,
     SEDOL_COMPANY_IDENTIFIER, TICKER_COMPANY_IDENTIFIER
@@ -47,6 +56,16 @@ API_EXTRACTION_FILE_FORMATS = [
     API_AVRO_FORMAT, API_JSON_FORMAT, API_CSV_FORMAT
 ]
 
+API_EXTRACTION_MIN_SHARDS = 25
+API_EXTRACTION_MAX_SHARDS = 10000
+API_EXTRACTION_AUTO_SHARDS = 'auto'
+EXTRACTION_TARGET_FILE_BYTES = 128 * 1024 ** 2  # 128 MiB per file
+EXTRACTION_AVG_DOCUMENT_BYTES = {  # Approximate full-content size per document
+    API_AVRO_FORMAT: 4 * 1024,
+    API_JSON_FORMAT: 7 * 1024,
+    API_CSV_FORMAT: 7 * 1024
+}
+
 # Time Series Query
 API_DAY_PERIOD = 'DAY'
 API_MONTH_PERIOD = 'MONTH'
@@ -98,6 +117,19 @@ API_JOB_EXPECTED_STATES = [
 ]
 
 API_JOB_ACTIVE_WAIT_SPACING = 15
+API_MAX_CONCURRENT_DOWNLOADS = 4
+API_MAX_CONCURRENT_EXTRACTIONS = 5
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# EXTRACTION PLANNER
+PLANNER_MAX_SLICE_VOLUME = 1000000
+PLANNER_MIN_SLICE_SECONDS = 3600
+
+# SNAPSHOT UPDATES
+API_UPDATE_ADDITIONS = 'additions'
+API_UPDATE_REPLACEMENTS = 'replacements'
+API_UPDATE_DELETES = 'deletes'
+API_UPDATE_TYPES = [API_UPDATE_ADDITIONS, API_UPDATE_REPLACEMENTS, API_UPDATE_DELETES]
 
 # SNAPSHOT FILES
 SNAPSHOT_FILE_STATS_FIELDS = [
@@ -112,6 +144,42 @@ SNAPSHOT_FILE_DELETE_FIELDS = [
     'art', 'credit', 'document_type', 'publication_date', 'modfication_date'
 ]  # publication_date and modification_date are deprecated
 
+SNAPSHOT_FILES_CHUNKSIZE = 100000
+SNAPSHOT_FILES_CACHE_SUBFOLDER = 'snapshot_files'
+SNAPSHOT_FILES_CACHE_MAX_SIZE = 10 * 1024 ** 3  # 10 GiB
+SNAPSHOT_FILES_PARTITION_FIELDS = ['publication_date', 'source_code']
+SNAPSHOT_FILES_DEDUP_BUCKET_SIZE = 256 * 1024 ** 2  # Source bytes per spill bucket
+PARQUET_ROW_GROUP_SIZE = 100000
+PARQUET_MAX_ROWS_PER_FILE = 1000000
+
+# TIME SERIES
+TIMESERIES_RESULTS_CHUNKSIZE = 100000
+TIMESERIES_MAX_CONCURRENT_JOBS = 8
+LOCAL_TIMESERIES_COMBINE_EVERY = 16  # Chunks aggregated before combining partial counts
+
+# RESULT CACHE
+RESULT_CACHE_SUBFOLDER = 'results'
+RESULT_CACHE_MAX_ENTRIES = 1000
+RESULT_CACHE_EXPLAIN = 'explain'
+RESULT_CACHE_TIMESERIES = 'timeseries'
+RESULT_CACHE_TIMESERIES_HISTORY = 'tshistory'
+RESULT_CACHE_COMPANY_IDENTIFIERS = 'companyids'
+RESULT_CACHE_TTL = {  # Seconds
+    RESULT_CACHE_EXPLAIN: 6 * 3600,
+    RESULT_CACHE_TIMESERIES: 6 * 3600,
+    RESULT_CACHE_TIMESERIES_HISTORY: 365 * 24 * 3600,
+    RESULT_CACHE_COMPANY_IDENTIFIERS: 365 * 24 * 3600
+}
+COMPANY_IDENTIFIERS_CACHE_TTL = 7 * 24 * 3600  # Seconds a resolved identifier is reused
+
+# SNAPSHOT STORE
+SNAPSHOT_STORE_BATCH_SIZE = 50000
+SNAPSHOT_STORE_CODE_FIELDS = [
+    'company_codes', 'company_codes_about', 'company_codes_occur',
+    'subject_codes', 'industry_codes', 'region_codes', 'region_of_origin',
+    'person_codes'
+]
+
 
 #TIMESTAMP
 TIMESTAMP_FIELDS = [
@@ -144,6 +212,44 @@ MULTIVALUE_FIELDS_COMMA = [
 MULTIVALUE_FIELDS_SPACE = ["region_of_origin"]
 
 
+# TAXONOMY ENRICHMENT
+# Snapshot fields with Factiva codes, and the taxonomy category value used to get their descriptors
+TAXONOMY_ENRICH_FIELDS = {
+    'company_codes': 'companies',
+    'company_codes_about': 'companies',
+    'company_codes_association': 'companies',
+    'company_codes_lineage': 'companies',
+    'company_codes_occur': 'companies',
+    'company_codes_relevance': 'companies',
+    'subject_codes': 'news_subjects',
+    'industry_codes': 'industries',
+    'region_codes': 'regions',
+    'region_of_origin': 'regions'
+}
+TAXONOMY_ENRICH_OUTPUTS = ['list', 'parallel']
+
+# TAXONOMY SEARCH
+TAXONOMY_SEARCH_MAX_CANDIDATES = 5000  # Substring matches checked before results are returned
+
+
+# COMPANY NAME RESOLVER
+COMPANY_RESOLVER_CHUNKSIZE = 2000  # Names scored per task
+COMPANY_RESOLVER_STOPWORDS = [
+    'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'ltd', 'limited',
+    'llc', 'plc', 'sa', 'ag', 'nv', 'bv', 'gmbh', 'spa', 'ab', 'as', 'oyj', 'holdings', 'the'
+]
+
+
+# TAXONOMY PREFETCH
+TAXONOMY_PREFETCH_CATEGORIES = 'news_subjects,regions,industries'
+TAXONOMY_PREFETCH_MAX_WORKERS = 4
+
+
+# TAXONOMY CACHE
+TAXONOMY_CACHE_SUBFOLDER = 'taxonomy'
+TAXONOMY_CACHE_REVALIDATE_AFTER = 24 * 3600  # Seconds
+
+
 # Taxonomy column renaming proposal
 # Code,Descriptor,Description,direct_parents_1,direct_parents_2,direct_parents_3,direct_parents_4,direct_parents_5,direct_parents_6,indirect_parents_1,indirect_parents_2,indirect_parents_3,indirect_parents_4,indirect_parents_5,indirect_parents_6,indirect_parents_7,indirect_parents_8
 TAXONOMY_H_FIELDS_RENAME_DICT = {
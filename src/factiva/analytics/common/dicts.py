@@ -1,13 +1,28 @@
 """Define basic dictionaries of Hierarchies adn Taxonomies."""
 import os
+import hashlib
+from functools import lru_cache
 import pandas as pd
 import numpy as np
+from .hierarchy import HierarchyIndex
 
-rootdir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-datadir = os.path.join(rootdir, 'dicts')
+datadir = os.path.abspath(os.path.dirname(__file__))
 ind_hrchy_path = os.path.join(datadir, 'industries-hrchy.csv')
 reg_hrchy_path = os.path.join(datadir, 'regions-hrchy.csv')
 countries_path = os.path.join(datadir, 'factiva-countries.csv')
+ind_index_path = os.path.join(datadir, 'industries-hrchy.npz')
+reg_index_path = os.path.join(datadir, 'regions-hrchy.npz')
+
+
+@lru_cache(maxsize=None)
+def _read_csv(csv_path) -> pd.DataFrame:
+    # CSV files are parsed once per process. Public functions return copies.
+    return pd.read_csv(csv_path, encoding='utf-8-sig')
+
+
+def _file_hash(file_path) -> str:
+    with open(file_path, 'rb') as source_file:
+        return hashlib.md5(source_file.read()).hexdigest()
 
 
 def industries_hierarchy() -> pd.DataFrame:
@@ -28,8 +43,7 @@ def industries_hierarchy() -> pd.DataFrame:
             Factiva Code of the parent Industry
 
     """
-    ret_ind = pd.read_csv(ind_hrchy_path)
-    ret_ind = ret_ind.replace(np.nan, '', regex=True)
+    ret_ind = _read_csv(ind_hrchy_path).fillna('')
     return ret_ind
 
 
@@ -58,8 +72,7 @@ def regions_hierarchy() -> pd.DataFrame:
             Level number of the node
 
     """
-    ret_reg = pd.read_csv(reg_hrchy_path)
-    ret_reg = ret_reg.replace(np.nan, '', regex=True)
+    ret_reg = _read_csv(reg_hrchy_path).fillna('')
     return ret_reg
 
 
@@ -75,8 +88,185 @@ def countries_list() -> pd.DataFrame:
     DataFrame : A Pandas DataFrame
 
     """
-    ret_reg = pd.read_csv(countries_path)
+    ret_reg = _read_csv(countries_path).copy()
     ret_reg['factiva_code'] = ret_reg['factiva_code'].str.lower()
     ret_reg.set_index('factiva_code', inplace=True)
-    ret_reg = ret_reg.replace(np.nan, '', regex=True)
+    ret_reg = ret_reg.fillna('')
     return ret_reg
+
+
+def _load_index(csv_path, index_path, code_field) -> HierarchyIndex:
+    # Uses the precompiled index when it matches the CSV content, otherwise it is rebuilt
+    source_hash = _file_hash(csv_path)
+    if os.path.exists(index_path):
+        with np.load(index_path, allow_pickle=False) as npz_file:
+            index_hash = str(npz_file['source_hash']) if 'source_hash' in npz_file.files else None
+        if index_hash == source_hash:
+            return HierarchyIndex.load(index_path)
+    h_df = _read_csv(csv_path).fillna('')
+    return HierarchyIndex.from_edges(h_df[code_field].str.lower(), h_df['parent'].str.lower())
+
+
+@lru_cache(maxsize=None)
+def industries_index() -> HierarchyIndex:
+    """Get a memoized index of the Dow Jones Industry hierarchy.
+
+    The index is loaded once per process from a precompiled binary file
+    shipped with the package. Codes are lowercase, and the root node is
+    ``indroot``.
+
+    Returns
+    -------
+    HierarchyIndex : Immutable index with O(1) code lookups, and
+        precomputed ancestor and descendant closures.
+
+    """
+    return _load_index(ind_hrchy_path, ind_index_path, 'ind_fcode')
+
+
+@lru_cache(maxsize=None)
+def regions_index() -> HierarchyIndex:
+    """Get a memoized index of the Dow Jones Regions hierarchy.
+
+    The index is loaded once per process from a precompiled binary file
+    shipped with the package. Codes are lowercase, and the root node is
+    ``world``. Some regions have several parents.
+
+    Returns
+    -------
+    HierarchyIndex : Immutable index with O(1) code lookups, and
+        precomputed ancestor and descendant closures.
+
+    """
+    return _load_index(reg_hrchy_path, reg_index_path, 'reg_fcode')
+
+
+def build_hierarchy_indexes() -> list:
+    """Rebuild the precompiled hierarchy index files from the CSV files.
+
+    Needs to be executed when the hierarchy CSV files are updated.
+
+    Returns
+    -------
+    list : Paths of the generated files
+
+    """
+    ret_val = []
+    for csv_path, index_path, code_field in [(ind_hrchy_path, ind_index_path, 'ind_fcode'),
+                                             (reg_hrchy_path, reg_index_path, 'reg_fcode')]:
+        h_df = _read_csv(csv_path).fillna('')
+        h_index = HierarchyIndex.from_edges(h_df[code_field].str.lower(), h_df['parent'].str.lower())
+        h_index.save(index_path, source_hash=np.array(_file_hash(csv_path)))
+        ret_val.append(index_path)
+    industries_index.cache_clear()
+    regions_index.cache_clear()
+    return ret_val
+
+
+def ancestor_closure(codes: pd.Series, parents: pd.Series) -> pd.DataFrame:
+    """Calculate all ancestors of every node in a hierarchy.
+
+    The closure is built with ``HierarchyIndex``, using one join per
+    hierarchy level instead of walking the tree for each code. Nodes with
+    several parents are supported, and each ancestor appears only once per
+    code.
+
+    Parameters
+    ----------
+    codes : pandas.Series
+        Node codes
+    parents : pandas.Series
+        Parent code for each node. Empty or NaN for root nodes.
+
+    Returns
+    -------
+    DataFrame : A Pandas DataFrame with the columns:
+        * code : string
+            Node code
+        * ancestor : string
+            Code of the node itself or any of its ancestors
+        * distance : int
+            Number of levels between code and ancestor. Zero for the node itself.
+
+    """
+    closure = HierarchyIndex.from_edges(codes, parents).closure_frame(include_self=True)
+    return closure.sort_values('distance', kind='stable', ignore_index=True)
+
+
+def rollup_counts(r_df: pd.DataFrame, hierarchy: str = 'industries', code_field: str = None,
+                  count_field: str = 'count') -> pd.DataFrame:
+    """Aggregate code counts at every ancestor level of a hierarchy.
+
+    Takes a DataFrame with counts per code, like a time-series dataset
+    grouped by ``industry_codes`` or ``region_codes``, and adds the counts of
+    each code to all its ancestors, up to ``indroot`` for industries and
+    ``WORLD`` for regions. All other columns (e.g. the period) are kept as
+    grouping keys. Codes are matched case-insensitively and returned in
+    lowercase. Codes not in the hierarchy are kept as they are.
+
+    Long-format results with ``dimension`` and ``code`` columns, as returned
+    by ``SnapshotTimeSeries.multi``, are also supported. Only rows where
+    ``dimension`` is ``industry_codes`` or ``region_codes`` (matching
+    ``hierarchy``) are rolled up, and rows of other dimensions are returned
+    unchanged.
+
+    Counts are summed, so documents tagged with several codes under the same
+    ancestor are counted once per code.
+
+    Parameters
+    ----------
+    r_df : pandas.DataFrame
+        DataFrame with a code column and a count column
+    hierarchy : str
+        Hierarchy to use. Either ``industries`` (default) or ``regions``.
+    code_field : str, optional
+        Name of the code column. Default is the first of ``industry_codes``,
+        ``region_codes`` or ``code`` present.
+    count_field : str
+        Name of the count column. Default ``count``.
+
+    Returns
+    -------
+    DataFrame : A Pandas DataFrame with the same columns as ``r_df``, where the
+    code column contains every code and ancestor, plus a ``level`` column
+    with the hierarchy level of each code (root is 0).
+
+    """
+    if hierarchy == 'industries':
+        h_index = industries_index()
+        dimension = 'industry_codes'
+    elif hierarchy == 'regions':
+        h_index = regions_index()
+        dimension = 'region_codes'
+    else:
+        raise ValueError('Unexpected hierarchy value. Use industries or regions.')
+
+    if code_field is None:
+        candidates = [field for field in ['industry_codes', 'region_codes', 'code'] if field in r_df.columns]
+        if not candidates:
+            raise ValueError('code_field not provided and no code column found')
+        code_field = candidates[0]
+    if count_field not in r_df.columns:
+        raise ValueError(f"Count column {count_field} not found")
+    other_df = r_df.iloc[0:0]
+    if (code_field == 'code') and ('dimension' in r_df.columns):
+        in_dimension = (r_df['dimension'].astype(str) == dimension).to_numpy()
+        other_df = r_df[~in_dimension]
+        r_df = r_df[in_dimension]
+
+    closure = h_index.closure_frame(include_self=True)
+    levels = pd.Series(h_index.levels, index=h_index.codes, name='level')
+    key_fields = [field for field in r_df.columns if field not in [code_field, count_field]]
+
+    in_df = r_df.copy()
+    in_df[code_field] = in_df[code_field].astype(str).str.lower()
+    rolled = in_df.merge(closure[['code', 'ancestor']], how='left', left_on=code_field, right_on='code')
+    rolled['ancestor'] = rolled['ancestor'].fillna(rolled[code_field])
+    rolled = rolled.groupby(key_fields + ['ancestor'], dropna=False, sort=True, observed=True)[count_field].sum().reset_index()
+    rolled = rolled.rename(columns={'ancestor': code_field})
+    rolled['level'] = rolled[code_field].map(levels).astype('Int64')
+    rolled = rolled[key_fields + [code_field, count_field, 'level']]
+    if not other_df.empty:
+        other_df = other_df.assign(level=pd.Series(pd.NA, index=other_df.index, dtype='Int64'))
+        rolled = pd.concat([rolled, other_df[rolled.columns]], ignore_index=True)
+    return rolled
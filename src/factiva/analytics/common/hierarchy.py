@@ -0,0 +1,251 @@
+"""
+  Immutable index for code hierarchies with precomputed closures
+"""
+import numpy as np
+import pandas as pd
+
+
+class HierarchyIndex(object):
+    """
+    Immutable index over a code hierarchy. Parent and child links, and the
+    transitive ancestor and descendant closures, are stored as compact
+    integer arrays in CSR layout (an ``indptr`` array with the offsets of each
+    node and an ``indices`` array with the related nodes). Nodes can have
+    several parents.
+
+    Lookups by code are O(1). Ancestor and descendant queries return
+    precomputed slices in O(k), where k is the number of returned codes,
+    and ``is_ancestor`` is O(1).
+
+    Instances are usually created with ``from_edges`` or ``load``.
+
+    Attributes
+    ----------
+    codes : numpy.ndarray
+        Node codes. The position of each code is its integer id.
+    levels : numpy.ndarray
+        Level of each node. Roots are level 0. For nodes with several paths
+        to the root, the longest path is used.
+
+    """
+
+    _ARRAYS = ['codes', 'parent_indptr', 'parent_indices', 'child_indptr', 'child_indices',
+               'ancestor_indptr', 'ancestor_indices', 'ancestor_distances',
+               'descendant_indptr', 'descendant_indices', 'levels']
+
+    def __init__(self, **arrays):
+        for name in self._ARRAYS:
+            value = np.asarray(arrays[name])
+            value.flags.writeable = False
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_code_index', {code: i for i, code in enumerate(self.codes.tolist())})
+        n_nodes = len(self.codes)
+        pair_keys = np.repeat(np.arange(n_nodes, dtype=np.int64), np.diff(self.ancestor_indptr)) \
+            + self.ancestor_indices.astype(np.int64) * n_nodes
+        object.__setattr__(self, '_ancestor_pairs', frozenset(pair_keys.tolist()))
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError('HierarchyIndex instances are immutable')
+
+
+    @classmethod
+    def from_edges(cls, codes, parents):
+        """Builds an index from parent-child pairs
+        Parameters
+        ----------
+        codes : array-like
+            Child codes. Codes without parents (roots) must be included with an empty parent.
+        parents : array-like
+            Parent code for each element in ``codes``. Empty strings or NaN denote roots.
+            Codes with several parents appear once per parent.
+        Returns
+        -------
+        HierarchyIndex
+            New index instance
+        Raises
+        ------
+        ValueError
+            When the hierarchy contains a cycle.
+        """
+        edges = pd.DataFrame({'code': pd.Series(codes, dtype=object).values,
+                              'parent': pd.Series(parents, dtype=object).values})
+        edges['parent'] = edges['parent'].fillna('')
+        all_codes = pd.unique(pd.concat([edges['code'], edges.loc[edges['parent'] != '', 'parent']]))
+        node_ids = pd.Series(np.arange(len(all_codes)), index=all_codes)
+        n_nodes = len(all_codes)
+
+        links = edges[edges['parent'] != ''].drop_duplicates()
+        child_ids = node_ids[links['code']].to_numpy()
+        parent_ids = node_ids[links['parent']].to_numpy()
+        parent_indptr, parent_indices = _to_csr(child_ids, parent_ids, n_nodes)
+        child_indptr, child_indices = _to_csr(parent_ids, child_ids, n_nodes)
+
+        # Ancestor closure, one join per level
+        link_df = pd.DataFrame({'node': child_ids, 'ancestor': parent_ids})
+        closure = []
+        frontier = link_df.assign(distance=1)
+        while not frontier.empty:
+            closure.append(frontier)
+            frontier = frontier.merge(link_df.rename(columns={'node': 'ancestor', 'ancestor': 'next'}), on='ancestor')
+            frontier = pd.DataFrame({'node': frontier['node'], 'ancestor': frontier['next'],
+                                     'distance': frontier['distance'] + 1}).drop_duplicates(['node', 'ancestor'])
+            if (not frontier.empty) and (frontier['distance'].max() > n_nodes):
+                raise ValueError('The hierarchy contains a cycle')
+        if closure:
+            closure = pd.concat(closure, ignore_index=True).sort_values('distance')
+            closure = closure.drop_duplicates(['node', 'ancestor'])
+        else:
+            closure = pd.DataFrame({'node': [], 'ancestor': [], 'distance': []}, dtype=np.int64)
+        closure = closure.sort_values(['node', 'distance', 'ancestor'])
+        a_nodes = closure['node'].to_numpy(np.int64)
+        a_ancestors = closure['ancestor'].to_numpy(np.int64)
+        ancestor_indptr = np.concatenate([[0], np.cumsum(np.bincount(a_nodes, minlength=n_nodes))])
+        d_order = np.lexsort((a_nodes, a_ancestors))
+        descendant_indptr = np.concatenate([[0], np.cumsum(np.bincount(a_ancestors, minlength=n_nodes))])
+
+        levels = np.zeros(n_nodes, dtype=np.int32)
+        if len(a_nodes):
+            np.maximum.at(levels, a_nodes, closure['distance'].to_numpy(np.int32))
+
+        return cls(codes=np.asarray(all_codes, dtype=str),
+                   parent_indptr=parent_indptr, parent_indices=parent_indices,
+                   child_indptr=child_indptr, child_indices=child_indices,
+                   ancestor_indptr=ancestor_indptr.astype(np.int64),
+                   ancestor_indices=a_ancestors.astype(np.int32),
+                   ancestor_distances=closure['distance'].to_numpy(np.int32),
+                   descendant_indptr=descendant_indptr.astype(np.int64),
+                   descendant_indices=a_nodes[d_order].astype(np.int32),
+                   levels=levels)
+
+
+    @classmethod
+    def load(cls, path):
+        """Loads an index saved with ``save``
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file
+        Returns
+        -------
+        HierarchyIndex
+            Loaded index instance
+        """
+        with np.load(path, allow_pickle=False) as npz_file:
+            return cls(**{name: npz_file[name] for name in cls._ARRAYS})
+
+
+    def save(self, path, **extra_arrays):
+        """Saves the index arrays to a ``.npz`` file
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file
+        extra_arrays : numpy.ndarray, optional
+            Additional arrays stored in the same file, e.g. a source version
+        """
+        np.savez_compressed(path, **{name: getattr(self, name) for name in self._ARRAYS}, **extra_arrays)
+
+
+    def __len__(self):
+        return len(self.codes)
+
+
+    def __contains__(self, code):
+        return code in self._code_index
+
+
+    def index_of(self, code) -> int:
+        """Returns the integer id of a code. Raises KeyError if not found."""
+        return self._code_index[code]
+
+
+    def _slice(self, indptr, indices, code):
+        node_id = self._code_index[code]
+        return indices[indptr[node_id]:indptr[node_id + 1]]
+
+
+    def parents(self, code) -> list:
+        """Returns the direct parents of a code"""
+        return self.codes[self._slice(self.parent_indptr, self.parent_indices, code)].tolist()
+
+
+    def children(self, code) -> list:
+        """Returns the direct children of a code"""
+        return self.codes[self._slice(self.child_indptr, self.child_indices, code)].tolist()
+
+
+    def ancestors(self, code, include_self=False) -> list:
+        """Returns all ancestors of a code, closest first"""
+        ret_val = self.codes[self._slice(self.ancestor_indptr, self.ancestor_indices, code)].tolist()
+        return [code] + ret_val if include_self else ret_val
+
+
+    def descendants(self, code, include_self=False) -> list:
+        """Returns all descendants of a code"""
+        ret_val = self.codes[self._slice(self.descendant_indptr, self.descendant_indices, code)].tolist()
+        return [code] + ret_val if include_self else ret_val
+
+
+    def expand(self, codes, include_self=True) -> list:
+        """Returns a sorted list with the codes and all their descendants. Unknown codes are kept."""
+        expanded = set()
+        for code in codes:
+            if code in self._code_index:
+                expanded.update(self.descendants(code, include_self=include_self))
+            elif include_self:
+                expanded.add(code)
+        return sorted(expanded)
+
+
+    def is_ancestor(self, ancestor, code) -> bool:
+        """Checks if ``ancestor`` is a direct or indirect ancestor of ``code``"""
+        if (ancestor not in self._code_index) or (code not in self._code_index):
+            return False
+        return (self._code_index[code] + self._code_index[ancestor] * len(self.codes)) in self._ancestor_pairs
+
+
+    def level(self, code) -> int:
+        """Returns the level of a code. Roots are level 0."""
+        return int(self.levels[self._code_index[code]])
+
+
+    def closure_frame(self, include_self=True) -> pd.DataFrame:
+        """Returns the ancestor closure as a DataFrame
+        Parameters
+        ----------
+        include_self : bool, optional
+            If True, each code is also listed as its own ancestor with distance 0.
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with the columns ``code``, ``ancestor`` and ``distance``
+        """
+        closure = pd.DataFrame({
+            'code': np.repeat(self.codes, np.diff(self.ancestor_indptr)),
+            'ancestor': self.codes[self.ancestor_indices],
+            'distance': self.ancestor_distances
+        })
+        if include_self:
+            closure = pd.concat([pd.DataFrame({'code': self.codes, 'ancestor': self.codes, 'distance': 0}), closure],
+                                ignore_index=True)
+        return closure
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}codes: {len(self.codes):,d}\n"
+        ret_val += f"{prefix}links: {len(self.parent_indices):,d}\n"
+        ret_val += f"{prefix[0:-2]}└─max_level: {int(self.levels.max()) if len(self.levels) else 0}"
+        return ret_val
+
+
+
+def _to_csr(rows, values, n_rows):
+    order = np.lexsort((values, rows))
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))]).astype(np.int64)
+    return indptr, np.asarray(values)[order].astype(np.int32)
@@ -40,6 +40,13 @@ def validate_type(var_to_validate, expected_type, error_message) -> bool:
         raise ValueError(error_message)
 
 
+def validate_top(top) -> None:
+    """Validate a time-series top value, an integer greater than or equal to -1."""
+    validate_type(top, int, 'Unexpected value for top')
+    if top < -1:
+        raise ValueError('Top value must be an integer greater than or equal to -1')
+
+
 def validate_field_options(field, available_options):
     """Validate that field is among the available options.
     Parameters
@@ -126,6 +133,61 @@ def multivalue_to_list(fieldvalue: str, sep=',') -> list:
     return retval
 
 
+def top_per_period(ts_df: pd.DataFrame, date_field, group_dimension, top) -> pd.DataFrame:
+    """Keep the top values of a group dimension within each period.
+
+    Applies the ``top`` semantics of ``SnapshotTimeSeriesQuery`` to a
+    time-series dataset with all group dimension values.
+
+    Parameters
+    ----------
+    ts_df:
+        Time-series dataset with the date field, group dimension and ``count`` columns
+    date_field:
+        Period column
+    group_dimension:
+        Group dimension column
+    top:
+        Max number of values per period. -1 keeps all values.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of the top values, sorted by period and descending count. Ties
+        are broken by value.
+    """
+    if top < 0:
+        return ts_df
+    ts_df = ts_df.sort_values([date_field, 'count', group_dimension], ascending=[True, False, True], kind='stable')
+    return ts_df.groupby(date_field, sort=False).head(top)
+
+
+def explode_multivalue(series: pd.Series, sep=',') -> pd.Series:
+    """Split a multivalue field into one row per value.
+
+    Vectorised version of ``multivalue_to_list`` for Pandas Series. Empty
+    values are removed, and repeated values within the same row are dropped.
+
+    Parameters
+    ----------
+    series:
+        Series with multivalue strings like ``,c11,ccat,``
+    sep:
+        Value separator. Default is a comma.
+
+    Returns
+    -------
+    pandas.Series
+        Series with one value per row. The index refers to the row in the
+        original series.
+    """
+    e_series = series.dropna().astype(str).str.split(sep).explode()
+    e_series = e_series[e_series.notna() & (e_series != '')]
+    dup_mask = pd.DataFrame({'row': e_series.index, 'value': e_series.values}).duplicated()
+    e_series = e_series[~dup_mask.values]
+    return e_series
+
+
 def format_multivalues(message: dict) -> dict:
     """Format multivalues from a dict
     Parameters
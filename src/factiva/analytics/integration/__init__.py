@@ -2,6 +2,8 @@
 Factiva Analytics package Integration Tools
 """
 
-__all__ = ['SnapshotFiles']
+__all__ = ['SnapshotFiles', 'SnapshotStore', 'LocalTimeSeries']
 
 from .files import SnapshotFiles
+from .store import SnapshotStore
+from .timeseries import LocalTimeSeries
@@ -1,13 +1,417 @@
 import os
+import json
+import pickle
+import shutil
+import tempfile
 import pandas as pd
 import fastavro
-from ..common import const
+from ..common import const, config, log, tools
+
+
+AVRO_MAGIC_BYTES = b'Obj\x01'
+
+
+def _import_pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError('Parquet support requires the pyarrow package. Install it with: pip install factiva-analytics[parquet]') from error
+    return pq
+
+
+def _remove_dataset_files(out_dir, basename) -> int:
+    # Removes the Parquet files written with basename in all partitions of out_dir
+    removed = 0
+    if not os.path.isdir(out_dir):
+        return removed
+    for dir_path, _, file_names in os.walk(out_dir):
+        for file_name in file_names:
+            if file_name.startswith(f"{basename}-") and file_name.endswith('.parquet'):
+                os.remove(os.path.join(dir_path, file_name))
+                removed += 1
+    return removed
 
 
 class SnapshotFiles(object):
+    """
+    Class with tools to read the files generated by Snapshot Extractions and
+    Updates.
+
+    Parameters
+    ----------
+    parquet_cache : bool, optional
+        If ``True``, a Parquet copy (sidecar) of every read file is written to
+        ``cache_folder`` on first read. Later reads of the same file, with the
+        same size and modification time, are loaded from the sidecar using
+        memory-mapping and column projection. Requires ``pyarrow``.
+        (default is False)
+    cache_folder : str, optional
+        Folder where sidecar files are stored. Default is the ``snapshot_files``
+        subfolder in ``config.CACHE_DEFAULT_FOLDER``.
+    cache_max_size : int, optional
+        Max total size in bytes of the sidecar files. Least recently used files
+        are removed when the limit is exceeded.
+        (default is ``const.SNAPSHOT_FILES_CACHE_MAX_SIZE``)
+
+    Attributes
+    ----------
+    last_dedup_stats : dict
+        Row and duplicate counts from the latest de-duplication operation
+
+    """
+
+    parquet_cache: bool = False
+    cache_folder: str = None
+    cache_max_size: int = None
+    last_dedup_stats: dict = None
+
+    def __init__(self, parquet_cache=False, cache_folder=None, cache_max_size=const.SNAPSHOT_FILES_CACHE_MAX_SIZE) -> None:
+        self.__log = log.get_factiva_logger()
+        self.parquet_cache = parquet_cache
+        if cache_folder is None:
+            cache_folder = os.path.join(config.CACHE_DEFAULT_FOLDER, const.SNAPSHOT_FILES_CACHE_SUBFOLDER)
+        self.cache_folder = cache_folder
+        tools.validate_type(cache_max_size, int, 'Unexpected value for cache_max_size')
+        self.cache_max_size = cache_max_size
+
+
+    def detect_file_format(self, filepath) -> str:
+        """Detects the format of a Dow Jones snapshot datafile
+        Parameters
+        ----------
+        filepath : str
+            Relative or absolute file path
+        Returns
+        -------
+        str
+            One of the values in ``const.API_EXTRACTION_FILE_FORMATS``. The file
+            extension is used first, and if it is not conclusive, the first bytes
+            of the file are inspected.
+        """
+        suffix = os.path.splitext(filepath)[1].lower().lstrip('.')
+        if suffix == 'jsonl':
+            suffix = const.API_JSON_FORMAT
+        if suffix in const.API_EXTRACTION_FILE_FORMATS:
+            return suffix
+
+        with open(filepath, "rb") as fp:
+            head = fp.read(len(AVRO_MAGIC_BYTES))
+            if head == AVRO_MAGIC_BYTES:
+                return const.API_AVRO_FORMAT
+            fp.seek(0)
+            first_char = fp.read(64).lstrip()[:1]
+        if first_char in [b'{', b'[']:
+            return const.API_JSON_FORMAT
+        return const.API_CSV_FORMAT
+
+
+    def _projection(self, stats_only=False, all_fields=False, columns=None) -> list:
+        # Fields to keep while decoding. None means all fields.
+        if columns is not None:
+            return list(columns)
+        if stats_only and not all_fields:
+            return const.SNAPSHOT_FILE_STATS_FIELDS
+        return None
+
+
+    def _to_timestamp(self, series) -> pd.Series:
+        # AVRO files store epoch milliseconds, while JSON and CSV files may contain
+        # either epoch milliseconds or ISO-8601 strings.
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.astype('datetime64[ms]')
+        if pd.api.types.is_numeric_dtype(series):
+            return series.astype('datetime64[ms]')
+        num_series = pd.to_numeric(series, errors='coerce')
+        if num_series.notna().sum() == series.notna().sum():
+            return num_series.astype('datetime64[ms]')
+        ts_series = pd.to_datetime(series, utc=True, errors='coerce', format='ISO8601')
+        return ts_series.dt.tz_localize(None).astype('datetime64[ms]')
+
+
+    def _format_df(self, r_df, stats_only=False, merge_body=False, all_fields=False, columns=None) -> pd.DataFrame:
+        # Applies the same field selection, dtype and timestamp rules to all formats
+        if columns is not None:
+            r_df = r_df.drop(columns=[c_field for c_field in r_df.columns if c_field not in columns and c_field != 'snippet'])
+            if merge_body and ('snippet' in r_df.columns) and ('body' in r_df.columns):
+                r_df['body'] = r_df['snippet'].fillna('') + '\n\n' + r_df['body'].fillna('')
+                r_df = r_df.drop('snippet', axis=1)
+            elif 'snippet' not in columns:
+                r_df = r_df.drop(columns=[c_field for c_field in ['snippet'] if c_field in r_df.columns])
+        elif not all_fields:
+            if stats_only:
+                r_df = r_df[[s_field for s_field in const.SNAPSHOT_FILE_STATS_FIELDS if s_field in r_df.columns]]
+            else:
+                if merge_body:
+                    r_df['body'] = r_df['snippet'] + '\n\n' + r_df['body']
+                    r_df.drop('snippet', axis=1, inplace=True)
+            r_df = r_df.drop(columns=[d_field for d_field in const.SNAPSHOT_FILE_DELETE_FIELDS if d_field in r_df.columns])
+        elif merge_body and ('snippet' in r_df.columns) and ('body' in r_df.columns):
+            r_df['body'] = r_df['snippet'].fillna('') + '\n\n' + r_df['body'].fillna('')
+            r_df = r_df.drop('snippet', axis=1)
+
+        if 'body' in r_df.columns:
+            r_df['body'] = r_df['body'].astype(str)
+
+        for field in const.TIMESTAMP_FIELDS:
+            if field in r_df.columns:
+                r_df[field] = self._to_timestamp(r_df[field])
+
+        return r_df
+
+
+    def _iter_avro_records(self, filepath, fields=None, chunksize=None):
+        with open(filepath, "rb") as fp:
+            reader = fastavro.reader(fp)
+            records = []
+            for record in reader:
+                if fields is not None:
+                    record = {field: record[field] for field in fields if field in record}
+                records.append(record)
+                if chunksize and len(records) >= chunksize:
+                    yield records
+                    records = []
+            if records or not chunksize:
+                yield records
+
+
+    def _iter_json_records(self, filepath, fields=None, chunksize=None):
+        with open(filepath, "r", encoding='utf-8') as fp:
+            first_char = fp.read(1)
+            while first_char and first_char.isspace():
+                first_char = fp.read(1)
+            fp.seek(0)
+            if first_char == '[':
+                # Plain JSON array. Not streamable, but kept for completeness.
+                lines = json.load(fp)
+            else:
+                lines = fp
+            records = []
+            for line in lines:
+                if isinstance(line, str):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    line = json.loads(line)
+                if fields is not None:
+                    line = {field: line[field] for field in fields if field in line}
+                records.append(line)
+                if chunksize and len(records) >= chunksize:
+                    yield records
+                    records = []
+            if records or not chunksize:
+                yield records
+
+
+    def iter_file(self, filepath, file_format=None, chunksize=const.SNAPSHOT_FILES_CHUNKSIZE, stats_only=False,
+                  merge_body=False, all_fields=False, columns=None):
+        """Reads a single Dow Jones snapshot datafile in chunks
+        Parameters
+        ----------
+        filepath : str
+            Relative or absolute file path
+        file_format : str, optional
+            File format. Current options are AVRO, JSON or CSV. When not provided, the
+            format is detected from the file extension or content.
+        chunksize : int, optional
+            Max number of rows per returned DataFrame. (default is ``const.SNAPSHOT_FILES_CHUNKSIZE``)
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+            (default is False)
+        all_fields : bool, optional
+            If set, all fields are loaded to the Pandas DataFrame. If set to `True`, parameters `stats_only` and
+            `merge_body` are ignored.
+        columns : list, optional
+            List of fields to load. Only these fields are kept in memory while decoding the file. When set,
+            parameters `stats_only` and `all_fields` are ignored.
+        Returns
+        -------
+        Iterator[pandas.DataFrame]
+            Pandas DataFrames with up to ``chunksize`` rows each
+        """
+        if file_format is None:
+            file_format = self.detect_file_format(filepath)
+        file_format = file_format.lower()
+        tools.validate_field_options(file_format, const.API_EXTRACTION_FILE_FORMATS)
+
+        fields = self._projection(stats_only, all_fields, columns)
+        if (fields is not None) and merge_body and ('body' in fields) and ('snippet' not in fields):
+            fields = fields + ['snippet']
+
+        if self.parquet_cache:
+            sidecar_path = self._get_sidecar(filepath, file_format)
+            if sidecar_path:
+                r_iter = self._iter_parquet_raw(sidecar_path, fields, chunksize)
+            else:
+                r_iter = self._iter_raw(filepath, file_format, fields, chunksize)
+        else:
+            r_iter = self._iter_raw(filepath, file_format, fields, chunksize)
+
+        for r_df in r_iter:
+            yield self._format_df(r_df, stats_only, merge_body, all_fields, columns)
+
+
+    def _iter_raw(self, filepath, file_format, fields=None, chunksize=None):
+        # Yields DataFrames with the decoded file content, before any formatting
+        if file_format == const.API_CSV_FORMAT:
+            # Code fields and other strings are kept as text, so values like
+            # leading zeros in identifiers are not altered by type inference.
+            # Only empty cells are nulls, as missing fields in AVRO and JSON files.
+            c_reader = pd.read_csv(filepath,
+                                   usecols=(lambda col: col in fields) if fields is not None else None,
+                                   dtype=str,
+                                   keep_default_na=False,
+                                   na_values=[''],
+                                   chunksize=chunksize)
+            if not chunksize:
+                c_reader = [c_reader]
+            for c_df in c_reader:
+                if 'word_count' in c_df.columns:
+                    c_df['word_count'] = pd.to_numeric(c_df['word_count'], errors='coerce').astype('Int64')
+                yield c_df
+        else:
+            if file_format == const.API_AVRO_FORMAT:
+                r_iter = self._iter_avro_records(filepath, fields, chunksize)
+            else:
+                r_iter = self._iter_json_records(filepath, fields, chunksize)
+            for records in r_iter:
+                yield pd.DataFrame.from_records(records)
+
+
+    def _sidecar_names(self, filepath):
+        # Sidecar file names are built from the source path, and its size and
+        # modification time. A changed source file never matches an old sidecar.
+        f_stat = os.stat(filepath)
+        path_hash = tools.md5hash(os.path.abspath(filepath))
+        version_hash = tools.md5hash(f"{f_stat.st_size}|{f_stat.st_mtime_ns}")
+        return path_hash, os.path.join(self.cache_folder, f"{path_hash}-{version_hash}.parquet")
+
+
+    def _get_sidecar(self, filepath, file_format) -> str:
+        # Returns the Parquet sidecar path for the file, creating it on first use.
+        # Returns None if the sidecar could not be created.
+        path_hash, sidecar_path = self._sidecar_names(filepath)
+        if os.path.exists(sidecar_path):
+            os.utime(sidecar_path)  # Used as last-access time for LRU eviction
+            return sidecar_path
+
+        pq = _import_pyarrow_parquet()
+        import pyarrow as pa
+        tools.create_path_if_not_exist(self.cache_folder)
+        for old_sidecar in os.listdir(self.cache_folder):
+            if old_sidecar.startswith(f"{path_hash}-"):
+                os.remove(os.path.join(self.cache_folder, old_sidecar))
+
+        tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+        writer = None
+        try:
+            for r_df in self._iter_raw(filepath, file_format, None, const.SNAPSHOT_FILES_CHUNKSIZE):
+                r_table = pa.Table.from_pandas(r_df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, r_table.schema)
+                else:
+                    r_table = r_table.cast(writer.schema)
+                writer.write_table(r_table)
+            if writer is None:
+                return None
+            writer.close()
+            writer = None
+            os.replace(tmp_path, sidecar_path)
+        except (pa.ArrowException, ValueError) as error:
+            self.__log.warning(f"Parquet sidecar not created for {filepath}: {error}")
+            return None
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._enforce_cache_size()
+        return sidecar_path
+
+
+    def _iter_parquet_raw(self, sidecar_path, fields=None, chunksize=None):
+        pq = _import_pyarrow_parquet()
+        p_file = pq.ParquetFile(sidecar_path, memory_map=True)
+        if fields is not None:
+            fields = [field for field in fields if field in p_file.schema_arrow.names]
+        if chunksize:
+            for r_batch in p_file.iter_batches(batch_size=chunksize, columns=fields):
+                yield r_batch.to_pandas()
+        else:
+            yield p_file.read(columns=fields).to_pandas()
+
+
+    def _enforce_cache_size(self):
+        # Evicts the least recently used sidecars until the folder fits in cache_max_size
+        sidecars = []
+        for file_name in os.listdir(self.cache_folder):
+            if file_name.endswith('.parquet'):
+                f_path = os.path.join(self.cache_folder, file_name)
+                f_stat = os.stat(f_path)
+                sidecars.append((f_stat.st_mtime, f_stat.st_size, f_path))
+        total_size = sum([s_size for _, s_size, _ in sidecars])
+        for _, s_size, f_path in sorted(sidecars):
+            if total_size <= self.cache_max_size:
+                break
+            os.remove(f_path)
+            total_size -= s_size
+
+
+    def clear_cache(self, filepath=None) -> int:
+        """Removes Parquet sidecar files from the cache folder
+        Parameters
+        ----------
+        filepath : str, optional
+            If provided, only the sidecar files for this snapshot datafile are removed.
+            Otherwise the cache folder is emptied.
+        Returns
+        -------
+        int
+            Number of removed sidecar files
+        """
+        if not os.path.exists(self.cache_folder):
+            return 0
+        prefix = f"{tools.md5hash(os.path.abspath(filepath))}-" if filepath else ''
+        removed = 0
+        for file_name in os.listdir(self.cache_folder):
+            if file_name.startswith(prefix) and file_name.endswith('.parquet'):
+                os.remove(os.path.join(self.cache_folder, file_name))
+                removed += 1
+        return removed
 
 
-    def read_avro_file(self, filepath, stats_only=False, merge_body=False, all_fields=False) -> pd.DataFrame:
+    def read_file(self, filepath, file_format=None, stats_only=False, merge_body=False, all_fields=False,
+                  columns=None) -> pd.DataFrame:
+        """Reads a single Dow Jones snapshot datafile in any of the supported formats
+        Parameters
+        ----------
+        filepath : str
+            Relative or absolute file path
+        file_format : str, optional
+            File format. Current options are AVRO, JSON or CSV. When not provided, the
+            format is detected from the file extension or content.
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False). On average,
+            only_stats loads about 1/10 and is recommended for quick metadata-based analysis. (Default is False)
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+            (default is False)
+        all_fields : bool, optional
+            If set, all fields are loaded to the Pandas DataFrame. If set to `True`, parameters `stats_only` and
+            `merge_body` are ignored.
+        columns : list, optional
+            List of fields to load. When set, parameters `stats_only` and `all_fields` are ignored.
+        Returns
+        -------
+        pandas.DataFrame
+            A single Pandas Dataframe with the file content
+        """
+        return next(self.iter_file(filepath, file_format, None, stats_only, merge_body, all_fields, columns))
+
+
+    def read_avro_file(self, filepath, stats_only=False, merge_body=False, all_fields=False, columns=None) -> pd.DataFrame:
         """Reads a single Dow Jones snapshot datafile
         Parameters
         ----------
@@ -22,64 +426,447 @@ class SnapshotFiles(object):
         all_fields : bool, optional
             If set, all fields are loaded to the Pandas DataFrame. If set to `True`, parameters `stats_only` and
             `merge_body` are ignored.
+        columns : list, optional
+            List of fields to load. When set, parameters `stats_only` and `all_fields` are ignored.
         Returns
         -------
         pandas.DataFrame
             A single Pandas Dataframe with the file content
         """
-        with open(filepath, "rb") as fp:
-            reader = fastavro.reader(fp)
-            records = [r for r in reader]
-            r_df = pd.DataFrame.from_records(records)
+        return self.read_file(filepath, const.API_AVRO_FORMAT, stats_only, merge_body, all_fields, columns)
 
-        if not all_fields:
-            if stats_only:
-                r_df = r_df[const.SNAPSHOT_FILE_STATS_FIELDS]
-            else:
-                if merge_body:
-                    r_df['body'] = r_df['snippet'] + '\n\n' + r_df['body']
-                    r_df.drop('snippet', axis=1, inplace=True)
-                r_df['body'] = r_df['body'].astype(str)
 
-            r_df.drop(columns=[d_field for d_field in const.SNAPSHOT_FILE_DELETE_FIELDS if d_field in r_df.columns], inplace=True)
+    def read_json_file(self, filepath, stats_only=False, merge_body=False, all_fields=False, columns=None) -> pd.DataFrame:
+        """Reads a single Dow Jones snapshot datafile in JSON Lines format
+        Parameters
+        ----------
+        filepath : str
+            Relative or absolute file path
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+            (default is False)
+        all_fields : bool, optional
+            If set, all fields are loaded to the Pandas DataFrame.
+        columns : list, optional
+            List of fields to load. When set, parameters `stats_only` and `all_fields` are ignored.
+        Returns
+        -------
+        pandas.DataFrame
+            A single Pandas Dataframe with the file content
+        """
+        return self.read_file(filepath, const.API_JSON_FORMAT, stats_only, merge_body, all_fields, columns)
+
+
+    def read_csv_file(self, filepath, stats_only=False, merge_body=False, all_fields=False, columns=None) -> pd.DataFrame:
+        """Reads a single Dow Jones snapshot datafile in CSV format
+        Parameters
+        ----------
+        filepath : str
+            Relative or absolute file path
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+            (default is False)
+        all_fields : bool, optional
+            If set, all fields are loaded to the Pandas DataFrame.
+        columns : list, optional
+            List of fields to load. When set, parameters `stats_only` and `all_fields` are ignored.
+        Returns
+        -------
+        pandas.DataFrame
+            A single Pandas Dataframe with the file content
+        """
+        return self.read_file(filepath, const.API_CSV_FORMAT, stats_only, merge_body, all_fields, columns)
+
+
+    def list_folder_files(self, folderpath, file_format=None) -> list:
+        """Lists the snapshot datafiles in a folder
+        Parameters
+        ----------
+        folderpath : str
+            Relative or absolute folder path
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. When not
+            provided, all files with a supported extension are listed.
+        Returns
+        -------
+        list
+            Sorted list of file paths
+        """
+        if file_format is None:
+            suffixes = tuple(f".{f_format}" for f_format in const.API_EXTRACTION_FILE_FORMATS) + ('.jsonl',)
+        elif file_format.lower() == const.API_JSON_FORMAT:
+            suffixes = ('.json', '.jsonl')
         else:
-            # TODO: Support merge_body for when all_fields is True
-            r_df['body'] = r_df['body'].astype(str)
+            suffixes = ("." + file_format.lower(),)
+        return [os.path.join(folderpath, filename) for filename in sorted(os.listdir(folderpath))
+                if filename.lower().endswith(suffixes)]
 
-        for field in const.TIMESTAMP_FIELDS:
-            if field in r_df.columns:
-                r_df[field] = r_df[field].astype('datetime64[ms]')
 
-        return r_df
+    def iter_folder(self, folderpath, file_format=None, chunksize=const.SNAPSHOT_FILES_CHUNKSIZE, stats_only=False,
+                    merge_body=False, all_fields=False, columns=None):
+        """Scans a folder and reads the content of all files matching the format (file_format) in chunks
+        Parameters
+        ----------
+        folderpath : str
+            Relative or absolute folder path
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. When not provided,
+            all supported files are read and the format of each file is detected.
+        chunksize : int, optional
+            Max number of rows per returned DataFrame. (default is ``const.SNAPSHOT_FILES_CHUNKSIZE``)
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+            (default is False)
+        all_fields : bool, optional
+            If set, all fields are loaded to the Pandas DataFrame.
+        columns : list, optional
+            List of fields to load. When set, parameters `stats_only` and `all_fields` are ignored.
+        Returns
+        -------
+        Iterator[pandas.DataFrame]
+            Pandas DataFrames with up to ``chunksize`` rows each
+        """
+        for filepath in self.list_folder_files(folderpath, file_format):
+            yield from self.iter_file(filepath, file_format, chunksize, stats_only, merge_body, all_fields, columns)
 
 
-    def read_avro_folder(self, folderpath, file_format='AVRO', only_stats=False, merge_body=False) -> pd.DataFrame:
+    def read_folder(self, folderpath, file_format=None, stats_only=False, merge_body=False, all_fields=False,
+                    columns=None) -> pd.DataFrame:
         """Scans a folder and reads the content of all files matching the format (file_format)
         Parameters
         ----------
         folderpath : str
             Relative or absolute folder path
         file_format : str, optional
-            Supported file format. Current options are AVRO, JSON or CSV. (default is AVRO)
+            Supported file format. Current options are AVRO, JSON or CSV. When not provided,
+            all supported files are read and the format of each file is detected.
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+            (default is False)
+        all_fields : bool, optional
+            If set, all fields are loaded to the Pandas DataFrame.
+        columns : list, optional
+            List of fields to load. When set, parameters `stats_only` and `all_fields` are ignored.
+        Returns
+        -------
+        pandas.DataFrame
+            A single Pandas Dataframe with the content from all read files.
+        """
+        df_list = [self.read_file(filepath, file_format, stats_only, merge_body, all_fields, columns)
+                   for filepath in self.list_folder_files(folderpath, file_format)]
+        if not df_list:
+            return pd.DataFrame()
+        return pd.concat(df_list, ignore_index=True)
+
+
+    def read_avro_folder(self, folderpath, file_format='AVRO', only_stats=False, merge_body=False, columns=None) -> pd.DataFrame:
+        """Scans a folder and reads the content of all files matching the format (file_format)
+        Parameters
+        ----------
+        folderpath : str
+            Relative or absolute folder path
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. If set to None,
+            the format of each file is detected. (default is AVRO)
         only_stats : bool, optional
             Specifies if only file metadata is loaded (True), or if the full article content is loaded (False). On average,
             only_stats loads about 1/10 and is recommended for quick metadata-based analysis. (Default is False)
         merge_body : bool, optional
             Specifies if the body field should be merged with the snippet and this last column being dropped.
             (default is False)
+        columns : list, optional
+            List of fields to load. When set, parameter `only_stats` is ignored.
         Returns
         -------
         pandas.DataFrame
             A single Pandas Dataframe with the content from all read files.
         """
-        format_suffix = file_format.lower()
-        r_df = pd.DataFrame()
-        for filename in os.listdir(folderpath):
-            if filename.lower().endswith("." + format_suffix):
-                t_df = self.read_avro_file(folderpath + "/" + filename, only_stats, merge_body)
-                r_df = pd.concat([r_df, t_df])
+        return self.read_folder(folderpath, file_format, stats_only=only_stats, merge_body=merge_body, columns=columns)
+
+
+    def _add_partition_fields(self, r_df, partition_by) -> pd.DataFrame:
+        # Date partitions like publication_date are derived from the matching
+        # datetime field, as the original date fields are deprecated.
+        for p_field in partition_by:
+            if p_field in r_df.columns:
+                continue
+            if p_field.endswith('_date') and f"{p_field}time" in r_df.columns:
+                r_df[p_field] = r_df[f"{p_field}time"].dt.strftime('%Y-%m-%d')
+            else:
+                raise ValueError(f"Partition field {p_field} is not available in the snapshot files")
         return r_df
 
+
+    def to_parquet_dataset(self, folderpath, out_dir, partition_by=const.SNAPSHOT_FILES_PARTITION_FIELDS,
+                           file_format=None, stats_only=False, merge_body=False, all_fields=False, columns=None,
+                           chunksize=const.SNAPSHOT_FILES_CHUNKSIZE, row_group_size=const.PARQUET_ROW_GROUP_SIZE,
+                           max_rows_per_file=const.PARQUET_MAX_ROWS_PER_FILE, compression='snappy',
+                           use_dictionary=True, basename=None, exclude_ans=None) -> int:
+        """Exports the content of a snapshot folder to a Hive-partitioned Parquet dataset
+        Parameters
+        ----------
+        folderpath : str
+            Relative or absolute folder path containing the extraction files
+        out_dir : str
+            Output folder. Files are written in subfolders like ``publication_date=2023-01-01/source_code=DJDN``.
+        partition_by : list, optional
+            Fields used to partition the dataset. Fields ending in ``_date`` are derived from the
+            corresponding ``_datetime`` field when not present. (default is ``['publication_date', 'source_code']``)
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. When not provided,
+            all supported files are read and the format of each file is detected.
+        stats_only : bool, optional
+            Specifies if only file metadata is exported (True), or if the full article content is exported (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+        all_fields : bool, optional
+            If set, all fields are exported.
+        columns : list, optional
+            List of fields to export. When set, parameters `stats_only` and `all_fields` are ignored.
+            The dataset schema is taken from the first file, so this parameter is needed when later
+            files contain additional fields.
+        chunksize : int, optional
+            Max number of rows decoded at once. Bounds memory usage while reading the source files.
+        row_group_size : int, optional
+            Max number of rows per Parquet row group
+        max_rows_per_file : int, optional
+            Max number of rows per Parquet file
+        compression : str, optional
+            Parquet compression codec, e.g. ``snappy`` (default), ``zstd``, ``gzip`` or ``none``.
+        use_dictionary : bool or list, optional
+            Enables dictionary encoding for all columns (True), or only the listed columns.
+        basename : str, optional
+            Prefix of the written file names. Existing files with this prefix in any
+            partition of ``out_dir`` are removed before writing. Default is derived from
+            ``folderpath``, so exporting the same folder again replaces its files.
+        exclude_ans : set, optional
+            ANs of documents that are not exported
+        Returns
+        -------
+        int
+            Number of exported rows
+        Raises
+        ------
+        ValueError
+            When a partition field is not available, or a file has fields not present in the first file
+        """
+        _import_pyarrow_parquet()
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partition_by = list(partition_by) if partition_by else []
+        if basename is None:
+            basename = f"part-{tools.md5hash(os.path.abspath(folderpath))[:8]}"
+        requested_columns = list(columns) if columns is not None else []
+        if (columns is not None) or stats_only:
+            # Datetime fields used to derive partitions must be decoded
+            columns = list(columns) if columns is not None else list(const.SNAPSHOT_FILE_STATS_FIELDS)
+            for p_field in partition_by:
+                if p_field.endswith('_date') and (f"{p_field}time" not in columns) and (p_field not in columns):
+                    columns.append(f"{p_field}time")
+            if exclude_ans and ('an' not in columns):
+                columns.append('an')
+        row_count = 0
+        schema = None
+
+        def table_iter():
+            nonlocal row_count
+            for r_df in self.iter_folder(folderpath, file_format, chunksize, stats_only, merge_body, all_fields, columns):
+                if exclude_ans:
+                    r_df = r_df[~r_df['an'].isin(exclude_ans)]
+                if r_df.empty:
+                    continue
+                # Requested fields missing in a file are exported as nulls
+                r_df = r_df.assign(**{col: None for col in requested_columns
+                                      if (col not in r_df.columns) and not (merge_body and col == 'snippet')})
+                r_df = self._add_partition_fields(r_df, partition_by)
+                if schema is not None:
+                    new_columns = [col for col in r_df.columns if col not in schema.names]
+                    if new_columns:
+                        raise ValueError(f"Columns {new_columns} are not present in the first exported file. "
+                                         "Use the columns parameter to export a fixed set of fields.")
+                    r_df = r_df.reindex(columns=schema.names)
+                r_table = pa.Table.from_pandas(r_df, schema=schema, preserve_index=False)
+                row_count += r_table.num_rows
+                yield r_table
+
+        tables = table_iter()
+        first_table = next(tables, None)
+        # Files from a previous export with the same basename are removed, as a smaller
+        # export doesn't overwrite all of them
+        _remove_dataset_files(out_dir, basename)
+        if first_table is None:
+            return 0
+        # Columns with no values in the first chunk are written as strings
+        schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                            for f in first_table.schema])
+
+        def batch_iter():
+            yield from first_table.cast(schema).to_batches()
+            for r_table in tables:
+                yield from r_table.to_batches()
+
+        file_options = ds.ParquetFileFormat().make_write_options(
+            compression=None if compression in [None, 'none'] else compression,
+            use_dictionary=use_dictionary)
+        tools.create_path_if_not_exist(out_dir)
+        ds.write_dataset(batch_iter(),
+                         out_dir,
+                         schema=schema,
+                         format='parquet',
+                         partitioning=partition_by if partition_by else None,
+                         partitioning_flavor='hive' if partition_by else None,
+                         file_options=file_options,
+                         basename_template=f"{basename}-{{i}}.parquet",
+                         max_rows_per_file=max_rows_per_file,
+                         max_rows_per_group=row_group_size,
+                         min_rows_per_group=min(row_group_size, max_rows_per_file),
+                         existing_data_behavior='overwrite_or_ignore')
+        return row_count
+
+
+    def _latest_mask(self, keys_df, order_fields) -> pd.Series:
+        # Boolean mask selecting the latest row per an. Only the key columns are
+        # sorted, so the full frame is never copied in a different order. Rows
+        # without an order value sort first, so any dated version wins.
+        keys_df = keys_df.sort_values(['an'] + order_fields, kind='stable', na_position='first')
+        latest_index = keys_df.index[~keys_df.duplicated(subset='an', keep='last').values]
+        mask = pd.Series(False, index=keys_df.index)
+        mask[latest_index] = True
+        return mask.sort_index()
+
+
+    def drop_duplicates(self, r_df, order_field=const.API_MODIFICATION_DATETIME_FIELD) -> pd.DataFrame:
+        """Removes duplicate documents keeping the latest version per AN
+        Parameters
+        ----------
+        r_df : pandas.DataFrame
+            DataFrame with snapshot documents. Usually the result of concatenating extraction
+            and update files.
+        order_field : str, optional
+            Field used to identify the latest version of a document. For documents with the same
+            value, the last row wins. (default is ``modification_datetime``)
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with one row per AN. Duplicate counts are stored in ``last_dedup_stats``.
+        """
+        order_fields = [order_field] if order_field in r_df.columns else []
+        keys_df = r_df[['an'] + order_fields].reset_index(drop=True)
+        keys_df['_seq'] = range(keys_df.shape[0])
+        mask = self._latest_mask(keys_df, order_fields + ['_seq'])
+        self.last_dedup_stats = {
+            'total_rows': int(r_df.shape[0]),
+            'unique_rows': int(mask.sum()),
+            'duplicate_rows': int(r_df.shape[0] - mask.sum()),
+            'duplicated_ans': int(keys_df['an'][keys_df['an'].duplicated(keep=False)].nunique())
+        }
+        return r_df[mask.values]
+
+
+    def iter_deduplicated(self, folderpaths, file_format=None, stats_only=False, merge_body=False, all_fields=False,
+                          columns=None, order_field=const.API_MODIFICATION_DATETIME_FIELD, num_buckets=None,
+                          spill_folder=None, chunksize=const.SNAPSHOT_FILES_CHUNKSIZE):
+        """Reads one or more snapshot folders and yields documents without duplicates, keeping
+        the latest version per AN. Data larger than memory is supported: rows are hash-partitioned
+        by AN into buckets spilled to disk, and each bucket is then de-duplicated in memory.
+        Parameters
+        ----------
+        folderpaths : str or list
+            Folder path or list of folder paths, e.g. an extraction folder followed by its update
+            folders. For documents with the same ``order_field`` value, rows from later folders win.
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. When not provided,
+            all supported files are read and the format of each file is detected.
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+        all_fields : bool, optional
+            If set, all fields are loaded.
+        columns : list, optional
+            List of fields to load. The fields ``an`` and ``order_field`` are always loaded.
+        order_field : str, optional
+            Field used to identify the latest version of a document. (default is ``modification_datetime``)
+        num_buckets : int, optional
+            Number of spill buckets. By default it is calculated from the size of the source files
+            and ``const.SNAPSHOT_FILES_DEDUP_BUCKET_SIZE``.
+        spill_folder : str, optional
+            Folder used for the spill files. A temporary folder is used by default. Spill files
+            are removed when the iteration ends.
+        chunksize : int, optional
+            Max number of rows decoded at once.
+        Returns
+        -------
+        Iterator[pandas.DataFrame]
+            DataFrames with unique documents. Duplicate counts are stored in ``last_dedup_stats``
+            once the iteration is completed.
+        """
+        if isinstance(folderpaths, str) or isinstance(folderpaths, os.PathLike):
+            folderpaths = [folderpaths]
+        if columns is not None:
+            columns = list(columns) + [field for field in ['an', order_field] if field not in columns]
+        file_paths = []
+        for folderpath in folderpaths:
+            file_paths.extend(self.list_folder_files(folderpath, file_format))
+
+        if num_buckets is None:
+            total_size = sum([os.path.getsize(file_path) for file_path in file_paths])
+            num_buckets = max(1, -(-total_size // const.SNAPSHOT_FILES_DEDUP_BUCKET_SIZE))
+
+        tmp_folder = tempfile.mkdtemp(prefix='factiva-dedup-', dir=spill_folder)
+        stats = {'total_rows': 0, 'unique_rows': 0, 'duplicate_rows': 0, 'duplicated_ans': 0}
+        try:
+            seq = 0
+            for file_path in file_paths:
+                for r_df in self.iter_file(file_path, file_format, chunksize, stats_only, merge_body, all_fields, columns):
+                    if r_df.empty:
+                        continue
+                    r_df = r_df.reset_index(drop=True)
+                    r_df['_seq'] = range(seq, seq + r_df.shape[0])
+                    seq += r_df.shape[0]
+                    buckets = pd.util.hash_pandas_object(r_df['an'], index=False).values % num_buckets
+                    # Chunks are appended to a single spill file per bucket
+                    for bucket, b_df in r_df.groupby(buckets, sort=False):
+                        with open(os.path.join(tmp_folder, f"{bucket:05d}.pkl"), 'ab') as spill_file:
+                            pickle.dump(b_df, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            for bucket in range(num_buckets):
+                spill_path = os.path.join(tmp_folder, f"{bucket:05d}.pkl")
+                if not os.path.exists(spill_path):
+                    continue
+                b_chunks = []
+                with open(spill_path, 'rb') as spill_file:
+                    while True:
+                        try:
+                            b_chunks.append(pickle.load(spill_file))
+                        except EOFError:
+                            break
+                os.remove(spill_path)
+                b_df = pd.concat(b_chunks, ignore_index=True)
+                del b_chunks
+                order_fields = [order_field] if order_field in b_df.columns else []
+                mask = self._latest_mask(b_df[['an'] + order_fields + ['_seq']], order_fields + ['_seq'])
+                stats['total_rows'] += int(b_df.shape[0])
+                stats['unique_rows'] += int(mask.sum())
+                stats['duplicated_ans'] += int(b_df['an'][b_df['an'].duplicated(keep=False)].nunique())
+                yield b_df[mask.values].sort_values('_seq').drop(columns='_seq').reset_index(drop=True)
+        finally:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+        stats['duplicate_rows'] = stats['total_rows'] - stats['unique_rows']
+        self.last_dedup_stats = stats
+        self.__log.info(f"De-duplication stats: {stats}")
+
+
     def read_raw_avro(self, filepath) -> pd.DataFrame:
         """Reads a generic AVRO file into a Pandas DataFrame
         Parameters
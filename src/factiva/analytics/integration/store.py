@@ -0,0 +1,337 @@
+"""
+  Local embedded store for Snapshot Extraction files
+"""
+import os
+import sqlite3
+import pandas as pd
+from .files import SnapshotFiles
+from ..common import const, log, tools
+
+
+class SnapshotStore():
+    """
+    Local analytical store backed by an embedded SQLite database. Extraction
+    and update files are bulk-loaded using batched transactions. Multivalue
+    code fields (e.g. ``company_codes``) are normalised into the child table
+    ``document_codes``, and indexes are created on ``an``,
+    ``publication_datetime``, ``source_code`` and the code values. Filters by
+    code and date range are resolved with index lookups instead of full
+    DataFrame scans.
+
+    Parameters
+    ----------
+    db_path : str
+        Path to the SQLite database file. It is created if it does not exist.
+        Use ``:memory:`` for a temporary in-memory store.
+    code_fields : list, optional
+        Multivalue fields normalised into the ``document_codes`` table.
+        (default is ``const.SNAPSHOT_STORE_CODE_FIELDS``)
+
+    Examples
+    --------
+    Load a downloaded extraction and get all documents for a company in March
+
+    .. code-block:: python
+
+        from factiva.analytics.integration import SnapshotStore
+        s = SnapshotStore('my_snapshot.db')
+        s.load_folder('/home/user/abcd1234xy')
+        march_docs = s.get_documents(codes=['mcrost'], code_field='company_codes',
+                                     start_date='2023-03-01', end_date='2023-04-01')
+
+    """
+
+    DOCUMENTS_TABLE = 'documents'
+    CODES_TABLE = 'document_codes'
+
+    db_path: str = None
+    code_fields: list = None
+    conn: sqlite3.Connection = None
+
+    def __init__(self, db_path, code_fields=const.SNAPSHOT_STORE_CODE_FIELDS) -> None:
+        self.__log = log.get_factiva_logger()
+        self.db_path = db_path
+        self.code_fields = list(code_fields)
+        if db_path != ':memory:':
+            db_folder = os.path.dirname(os.path.abspath(db_path))
+            tools.create_path_if_not_exist(db_folder)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.DOCUMENTS_TABLE} (an TEXT PRIMARY KEY)")
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.CODES_TABLE} (an TEXT NOT NULL, field TEXT NOT NULL, code TEXT NOT NULL)")
+        self.__columns = self._get_columns()
+
+
+    def _get_columns(self) -> list:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({self.DOCUMENTS_TABLE})")]
+
+
+    def _add_columns(self, r_df):
+        for column in r_df.columns:
+            if column in self.__columns:
+                continue
+            if pd.api.types.is_integer_dtype(r_df[column]) or pd.api.types.is_bool_dtype(r_df[column]):
+                col_type = 'INTEGER'
+            elif pd.api.types.is_float_dtype(r_df[column]):
+                col_type = 'REAL'
+            else:
+                col_type = 'TEXT'
+            self.conn.execute(f'ALTER TABLE {self.DOCUMENTS_TABLE} ADD COLUMN "{column}" {col_type}')
+            self.__columns.append(column)
+
+
+    def create_indexes(self) -> bool:
+        """
+        Creates the store indexes, if they don't exist. Called automatically
+        after each load operation.
+
+        Returns
+        -------
+        bool
+            True if the operation was successful.
+
+        """
+        with self.conn:
+            for column in ['publication_datetime', 'source_code']:
+                if column in self.__columns:
+                    self.conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{self.DOCUMENTS_TABLE}_{column} ON {self.DOCUMENTS_TABLE} ("{column}")')
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.CODES_TABLE}_field_code ON {self.CODES_TABLE} (field, code, an)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.CODES_TABLE}_an ON {self.CODES_TABLE} (an)")
+        return True
+
+
+    def _prepare_df(self, r_df) -> pd.DataFrame:
+        # Timestamps are stored as ISO-8601 text, which keeps lexical and
+        # chronological order aligned for range filters.
+        r_df = r_df.drop_duplicates(subset='an', keep='last').reset_index(drop=True)
+        for field in const.TIMESTAMP_FIELDS:
+            if (field in r_df.columns) and pd.api.types.is_datetime64_any_dtype(r_df[field]):
+                r_df[field] = r_df[field].dt.strftime('%Y-%m-%d %H:%M:%S')
+        r_df = r_df.astype(object).where(r_df.notna(), None)
+        return r_df
+
+
+    def _write_chunk(self, r_df) -> int:
+        r_df = self._prepare_df(r_df)
+        self._add_columns(r_df)
+        ans = [(an,) for an in r_df['an']]
+        col_names = ', '.join([f'"{column}"' for column in r_df.columns])
+        placeholders = ', '.join(['?'] * len(r_df.columns))
+
+        code_rows = []
+        for field in self.code_fields:
+            if field in r_df.columns:
+                sep = ' ' if field in const.MULTIVALUE_FIELDS_SPACE else ','
+                e_series = tools.explode_multivalue(r_df[field], sep=sep).str.lower()
+                code_rows.extend(zip(r_df.loc[e_series.index, 'an'], [field] * len(e_series), e_series))
+
+        with self.conn:
+            self.conn.executemany(f"DELETE FROM {self.CODES_TABLE} WHERE an = ?", ans)
+            self.conn.executemany(f"INSERT OR REPLACE INTO {self.DOCUMENTS_TABLE} ({col_names}) VALUES ({placeholders})",
+                                  r_df.itertuples(index=False, name=None))
+            self.conn.executemany(f"INSERT INTO {self.CODES_TABLE} (an, field, code) VALUES (?, ?, ?)", code_rows)
+        return r_df.shape[0]
+
+
+    @log.factiva_logger
+    def load_dataframe(self, r_df, batch_size=const.SNAPSHOT_STORE_BATCH_SIZE) -> int:
+        """
+        Inserts or replaces the documents in a DataFrame, using ``an`` as key.
+
+        Parameters
+        ----------
+        r_df : pandas.DataFrame
+            DataFrame with the format returned by ``SnapshotFiles`` read methods.
+        batch_size : int, optional
+            Number of documents written per transaction.
+
+        Returns
+        -------
+        int
+            Number of written documents
+
+        """
+        if 'an' not in r_df.columns:
+            raise ValueError('The DataFrame must contain the column an')
+        written = 0
+        for start in range(0, r_df.shape[0], batch_size):
+            written += self._write_chunk(r_df.iloc[start:start + batch_size].copy())
+        self.create_indexes()
+        return written
+
+
+    @log.factiva_logger
+    def load_folder(self, folderpath, file_format=None, stats_only=False, merge_body=False, all_fields=False,
+                    columns=None, batch_size=const.SNAPSHOT_STORE_BATCH_SIZE) -> int:
+        """
+        Bulk-loads all extraction files in a folder. Files are decoded in chunks
+        of ``batch_size`` rows, and each chunk is written in a single transaction.
+
+        Parameters
+        ----------
+        folderpath : str
+            Relative or absolute folder path
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. When not provided,
+            all supported files are read and the format of each file is detected.
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        merge_body : bool, optional
+            Specifies if the body field should be merged with the snippet and this last column being dropped.
+        all_fields : bool, optional
+            If set, all fields are loaded.
+        columns : list, optional
+            List of fields to load. The field ``an`` is always loaded.
+        batch_size : int, optional
+            Number of documents written per transaction.
+
+        Returns
+        -------
+        int
+            Number of written documents
+
+        """
+        if (columns is not None) and ('an' not in columns):
+            columns = ['an'] + list(columns)
+        written = 0
+        s_files = SnapshotFiles()
+        for r_df in s_files.iter_folder(folderpath, file_format, batch_size, stats_only, merge_body, all_fields, columns):
+            if not r_df.empty:
+                written += self._write_chunk(r_df)
+        self.create_indexes()
+        self.__log.info(f"{written} documents loaded from {folderpath}")
+        return written
+
+
+    @log.factiva_logger
+    def delete_documents(self, ans, batch_size=const.SNAPSHOT_STORE_BATCH_SIZE) -> int:
+        """
+        Deletes documents by ``an``.
+
+        Parameters
+        ----------
+        ans : list
+            List of document ``an`` values
+        batch_size : int, optional
+            Number of documents deleted per transaction.
+
+        Returns
+        -------
+        int
+            Number of deleted documents
+
+        """
+        deleted = 0
+        ans = list(ans)
+        for start in range(0, len(ans), batch_size):
+            an_batch = [(an,) for an in ans[start:start + batch_size]]
+            with self.conn:
+                self.conn.executemany(f"DELETE FROM {self.CODES_TABLE} WHERE an = ?", an_batch)
+                cursor = self.conn.executemany(f"DELETE FROM {self.DOCUMENTS_TABLE} WHERE an = ?", an_batch)
+                deleted += cursor.rowcount
+        return deleted
+
+
+    def query(self, sql, params=None) -> pd.DataFrame:
+        """
+        Runs a SQL query against the store. Tables are ``documents``, with one
+        row per document, and ``document_codes`` with the columns ``an``,
+        ``field`` and ``code`` (lowercase).
+
+        Parameters
+        ----------
+        sql : str
+            SQL statement
+        params : list or dict, optional
+            Query parameters
+
+        Returns
+        -------
+        pandas.DataFrame
+            Query results
+
+        """
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+
+    def get_documents(self, codes=None, code_field='company_codes', start_date=None, end_date=None,
+                      source_codes=None, columns=None) -> pd.DataFrame:
+        """
+        Gets documents filtered by codes, publication date range and source codes.
+
+        Parameters
+        ----------
+        codes : list, optional
+            Codes to filter by. A document is returned if it contains any of them.
+        code_field : str, optional
+            Multivalue field where ``codes`` are searched. (default is ``company_codes``)
+        start_date : str, optional
+            Inclusive lower bound for ``publication_datetime``, e.g. ``2023-03-01``.
+        end_date : str, optional
+            Exclusive upper bound for ``publication_datetime``, e.g. ``2023-04-01``.
+        source_codes : list, optional
+            Source codes to filter by.
+        columns : list, optional
+            Columns to return. All columns are returned by default.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Matching documents
+
+        """
+        select_cols = ', '.join([f'd."{column}"' for column in columns]) if columns else 'd.*'
+        sql = f"SELECT {select_cols} FROM {self.DOCUMENTS_TABLE} d"
+        conditions = []
+        params = []
+        if codes:
+            tools.validate_field_options(code_field, self.code_fields)
+            codes = [codes] if isinstance(codes, str) else list(codes)
+            sql += (f" WHERE d.an IN (SELECT c.an FROM {self.CODES_TABLE} c WHERE c.field = ? "
+                    f"AND c.code IN ({', '.join(['?'] * len(codes))}))")
+            params.extend([code_field] + [code.lower() for code in codes])
+        if start_date:
+            conditions.append('d.publication_datetime >= ?')
+            params.append(str(pd.Timestamp(start_date)))
+        if end_date:
+            conditions.append('d.publication_datetime < ?')
+            params.append(str(pd.Timestamp(end_date)))
+        if source_codes:
+            source_codes = [source_codes] if isinstance(source_codes, str) else list(source_codes)
+            conditions.append(f"d.source_code IN ({', '.join(['?'] * len(source_codes))})")
+            params.extend(source_codes)
+        if conditions:
+            sql += (' AND ' if codes else ' WHERE ') + ' AND '.join(conditions)
+        r_df = self.query(sql, params)
+        for field in const.TIMESTAMP_FIELDS:
+            if field in r_df.columns:
+                r_df[field] = pd.to_datetime(r_df[field]).astype('datetime64[ms]')
+        return r_df
+
+
+    def count_documents(self) -> int:
+        """
+        Returns the number of documents in the store.
+        """
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self.DOCUMENTS_TABLE}").fetchone()[0]
+
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        self.conn.close()
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}db_path: {tools.print_property(self.db_path)}\n"
+        ret_val += f"{prefix}code_fields: {tools.print_property(self.code_fields)}\n"
+        ret_val += f"{prefix[0:-2]}└─documents: {tools.print_property(self.count_documents())}"
+        return ret_val
@@ -0,0 +1,196 @@
+"""
+  Local time-series calculation over Snapshot extraction files
+"""
+from typing import Optional
+import pandas as pd
+from .files import SnapshotFiles
+from ..common import const, tools
+
+
+class LocalTimeSeries(object):
+    """
+    Calculates time-series datasets locally from downloaded Snapshot data,
+    with the same semantics as ``SnapshotTimeSeriesQuery``. Avoids submitting
+    a TimeSeries job for data that is already available, and returns a
+    DataFrame with the same columns and types as ``SnapshotTimeSeries``
+    results.
+
+    The ``where`` clause of a query is not evaluated. Data passed to this
+    class is expected to be already filtered, e.g. the files of an extraction
+    using the same criteria.
+
+    Parameters
+    ----------
+    query : SnapshotTimeSeriesQuery, optional
+        If provided, ``frequency``, ``date_field``, ``group_dimension`` and
+        ``top`` are taken from this query.
+    frequency : str, optional
+        Date part used to group subtotals. ``DAY``, ``MONTH`` (default) or ``YEAR``.
+    date_field : str, optional
+        Timestamp column used to calculate the periods. Default is ``publication_datetime``.
+    group_dimension : str, optional
+        Field used to break-down subtotals for each period. Multivalue code fields
+        like ``subject_codes`` are counted once per code.
+    top : int, optional
+        Max number of group dimension values per period, ranked by count within
+        each period as in ``SnapshotTimeSeriesQuery``. Default 10. Can be set to
+        -1 to return all values.
+
+    Examples
+    --------
+    Monthly subject counts from an extraction folder
+
+    .. code-block:: python
+
+        from factiva.analytics.integration import LocalTimeSeries
+        lts = LocalTimeSeries(group_dimension='subject_codes', top=20)
+        ts_df = lts.from_folder('/home/user/abcd1234xy')
+
+    """
+
+    frequency: str = const.API_MONTH_PERIOD
+    date_field: str = const.API_PUBLICATION_DATETIME_FIELD
+    group_dimension: Optional[str] = None
+    top: int = 10
+
+    def __init__(self, query=None, frequency=const.API_MONTH_PERIOD, date_field=const.API_PUBLICATION_DATETIME_FIELD,
+                 group_dimension=None, top=10):
+        if query is not None:
+            frequency = query.frequency
+            date_field = query.date_field
+            group_dimension = query.group_dimension
+            top = query.top
+        tools.validate_type(frequency, str, 'Unexpected value for frequency')
+        frequency = frequency.upper().strip()
+        tools.validate_field_options(frequency, const.API_DATETIME_PERIODS)
+        tools.validate_type(date_field, str, 'Unexpected value for date_field')
+        date_field = date_field.lower().strip()
+        tools.validate_field_options(date_field, const.API_DATETIME_FIELDS)
+        tools.validate_top(top)
+        self.frequency = frequency
+        self.date_field = date_field
+        self.group_dimension = group_dimension if group_dimension else None
+        self.top = top
+
+
+    def _periods(self, dates: pd.Series) -> pd.Series:
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        if self.frequency == const.API_DAY_PERIOD:
+            return dates.dt.floor('D')
+        if self.frequency == const.API_MONTH_PERIOD:
+            return dates.dt.to_period('M').dt.to_timestamp()
+        return dates.dt.to_period('Y').dt.to_timestamp()
+
+
+    def aggregate(self, r_df) -> pd.DataFrame:
+        """Calculates partial counts for a DataFrame, without applying ``top``
+        Parameters
+        ----------
+        r_df : pandas.DataFrame
+            Articles as returned by ``SnapshotFiles``
+        Returns
+        -------
+        pandas.DataFrame
+            Counts per period and group dimension value
+        """
+        r_df = r_df.reset_index(drop=True)
+        periods = self._periods(r_df[self.date_field])
+        if not self.group_dimension:
+            return periods.value_counts(sort=False).rename('count').rename_axis(self.date_field).reset_index()
+
+        if self.group_dimension in const.MULTIVALUE_FIELDS_COMMA:
+            codes = tools.explode_multivalue(r_df[self.group_dimension])
+        elif self.group_dimension in const.MULTIVALUE_FIELDS_SPACE:
+            codes = tools.explode_multivalue(r_df[self.group_dimension], sep=' ')
+        else:
+            codes = r_df[self.group_dimension].dropna()
+        pairs = pd.DataFrame({self.date_field: periods.to_numpy()[codes.index.to_numpy()],
+                              self.group_dimension: codes.to_numpy()})
+        return pairs.groupby([self.date_field, self.group_dimension], sort=False).size().rename('count').reset_index()
+
+
+    def _combine(self, partials) -> pd.DataFrame:
+        group_fields = [self.date_field] + ([self.group_dimension] if self.group_dimension else [])
+        partials = [p_df for p_df in partials if not p_df.empty]
+        if not partials:
+            ts_df = pd.DataFrame({field: pd.Series(dtype='object') for field in group_fields})
+            ts_df[self.date_field] = ts_df[self.date_field].astype('datetime64[ns]')
+            ts_df['count'] = pd.Series(dtype='int64')
+            return ts_df
+        return pd.concat(partials, ignore_index=True).groupby(group_fields, sort=False)['count'].sum().reset_index()
+
+
+    def finalize(self, partials) -> pd.DataFrame:
+        """Combines partial counts and applies ``top``
+        Parameters
+        ----------
+        partials : list
+            DataFrames returned by ``aggregate``
+        Returns
+        -------
+        pandas.DataFrame
+            Time-series dataset with the date field as datetime, ``count`` as int
+            and the group dimension as category
+        """
+        group_fields = [self.date_field] + ([self.group_dimension] if self.group_dimension else [])
+        ts_df = self._combine(partials)
+        if self.group_dimension:
+            ts_df = tools.top_per_period(ts_df, self.date_field, self.group_dimension, self.top)
+            ts_df[self.group_dimension] = ts_df[self.group_dimension].astype(str).astype('category')
+        ts_df['count'] = ts_df['count'].astype('int64')
+        return ts_df.sort_values(group_fields, ignore_index=True)
+
+
+    def from_dataframe(self, r_df) -> pd.DataFrame:
+        """Calculates the time-series dataset for a DataFrame
+        Parameters
+        ----------
+        r_df : pandas.DataFrame
+            Articles as returned by ``SnapshotFiles``
+        Returns
+        -------
+        pandas.DataFrame
+            Time-series dataset. See ``finalize``.
+        """
+        return self.finalize([self.aggregate(r_df)])
+
+
+    def from_folder(self, folderpath, file_format=None, chunksize=const.SNAPSHOT_FILES_CHUNKSIZE) -> pd.DataFrame:
+        """Calculates the time-series dataset for all files in a folder
+        Files are read in chunks, loading only the date field and the group dimension.
+        Parameters
+        ----------
+        folderpath : str
+            Relative or absolute folder path
+        file_format : str, optional
+            Supported file format. Current options are AVRO, JSON or CSV. When not provided,
+            all supported files are read.
+        chunksize : int, optional
+            Max number of rows per chunk.
+        Returns
+        -------
+        pandas.DataFrame
+            Time-series dataset. See ``finalize``.
+        """
+        columns = [self.date_field] + ([self.group_dimension] if self.group_dimension else [])
+        partials = []
+        for r_df in SnapshotFiles().iter_folder(folderpath, file_format=file_format, chunksize=chunksize, columns=columns):
+            partials.append(self.aggregate(r_df))
+            # Partial counts are combined periodically to keep memory bounded
+            if len(partials) >= const.LOCAL_TIMESERIES_COMBINE_EVERY:
+                partials = [self._combine(partials)]
+        return self.finalize(partials)
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}frequency: {tools.print_property(self.frequency)}\n"
+        ret_val += f"{prefix}date_field: {tools.print_property(self.date_field)}\n"
+        ret_val += f"{prefix}group_dimension: {tools.print_property(self.group_dimension)}\n"
+        ret_val += f"{prefix[0:-2]}└─top: {tools.print_property(self.top)}"
+        return ret_val
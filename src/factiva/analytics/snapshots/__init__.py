@@ -6,6 +6,7 @@ __all__ = [
     'SnapshotExplain', 'SnapshotExplainQuery', 'SnapshotExplainJobResponse', 'SnapshotExplainSamplesResponse',
     'SnapshotTimeSeries', 'SnapshotTimeSeriesQuery', 'SnapshotTimeSeriesJobReponse',
     'SnapshotExtraction', 'SnapshotExtractionQuery', 'SnapshotExtractionJobReponse', 'SnapshotExtractionListItem', 'SnapshotExtractionList',
+    'SnapshotUpdate', 'SnapshotUpdateJobReponse', 'SnapshotExtractionPlanner'
     ]
 
 from .query import SnapshotQuery
@@ -15,3 +16,5 @@ from .snapshot import Snapshot
 from .explain import SnapshotExplain, SnapshotExplainQuery, SnapshotExplainJobResponse, SnapshotExplainSamplesResponse
 from .time_series import SnapshotTimeSeries, SnapshotTimeSeriesQuery, SnapshotTimeSeriesJobReponse
 from .extraction import SnapshotExtraction, SnapshotExtractionQuery, SnapshotExtractionJobReponse, SnapshotExtractionListItem, SnapshotExtractionList
+from .update import SnapshotUpdate, SnapshotUpdateJobReponse
+from .planner import SnapshotExtractionPlanner
@@ -3,6 +3,7 @@
 """
 from .base import SnapshotBase, SnapshotBaseQuery, SnapshotBaseJobResponse
 from ..common import log, const, req, tools
+from ..common.cache import ResultCache
 import time
 import pandas as pd
 from typing import Optional
@@ -389,11 +390,19 @@ class SnapshotExplain(SnapshotBase): # TODO: Refactor when repeating code across
         return True
 
 
-    def process_job(self):  # TODO: Implement Retries if a 500 or timeout is returned during the active wait
+    def process_job(self, use_cache=False):  # TODO: Implement Retries if a 500 or timeout is returned during the active wait
         """
         Submits a new job to be processed, wait until the job is completed
         and then retrieves the job results.
 
+        Parameters
+        ----------
+        use_cache : bool or ResultCache, optional
+            If True, the volume is taken from the local result cache when an
+            identical query was processed before with the same user key, and
+            no job is submitted. New results are stored in the cache. A
+            ``ResultCache`` instance can be provided to use custom settings.
+
         Returns
         -------
         bool
@@ -402,6 +411,17 @@ class SnapshotExplain(SnapshotBase): # TODO: Refactor when repeating code across
 
         """
         self.__log.info('process_job Start')
+        if use_cache:
+            r_cache = use_cache if isinstance(use_cache, ResultCache) else ResultCache()
+            cache_key = r_cache.make_key(self.query.get_payload(), self.user_key)
+            cached = r_cache.get(const.RESULT_CACHE_EXPLAIN, cache_key)
+            if cached:
+                self.__log.info(f"Explain volume retrieved from cache for Job ID {cached['job_id']}")
+                self.job_response = SnapshotExplainJobResponse(cached['job_id'])
+                self.job_response.job_state = const.API_JOB_DONE_STATE
+                self.job_response.volume_estimate = cached['volume_estimate']
+                return True
+
         self.submit_job()
         self.get_job_response()
 
@@ -415,7 +435,12 @@ class SnapshotExplain(SnapshotBase): # TODO: Refactor when repeating code across
             #     raise Exception('Job failed')
             time.sleep(const.API_JOB_ACTIVE_WAIT_SPACING)
             self.get_job_response()
-        
+
+        if use_cache and (self.job_response.job_state == const.API_JOB_DONE_STATE):
+            r_cache.set(const.RESULT_CACHE_EXPLAIN, cache_key, {
+                'job_id': self.job_response.job_id,
+                'volume_estimate': self.job_response.volume_estimate
+            })
         self.__log.info('process_job End')
         return True
 
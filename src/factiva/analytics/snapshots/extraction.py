@@ -2,8 +2,9 @@
   Module containing all clases that interact with the Snapshot Extraction service
 """
 
-import time, os
+import time, os, json
 from .base import SnapshotBase, SnapshotBaseQuery, SnapshotBaseJobResponse
+from .explain import SnapshotExplain, SnapshotExplainQuery
 from ..common import log, const, req, tools
 from ..auth import UserKey
 from pathlib import Path
@@ -91,12 +92,21 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
         Chosen file fomat for extraction files
     limit : int
         Max number of articles to extract
+    shards : int or str
+        Number of files to generate, or ``'auto'`` to calculate it from the
+        Explain volume at submission time
+    resolved_shards : int
+        Number of shards used in the payload when ``shards`` is ``'auto'``. It's
+        None when the query criteria, ``limit`` or ``file_format`` changed after
+        ``resolve_shards`` was called.
 
     """
 
     file_format: str
     limit: int
     shards: int
+    _resolved_shards: int = None
+    _resolved_shards_key: str = None
 
     def __init__(self,
                 where:str = None,
@@ -106,7 +116,7 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
                 exclude_lists: dict = None,
                 file_format: str = const.API_AVRO_FORMAT,
                 limit: int = 0,
-                shards: int = 25) -> None:
+                shards: int | str = const.API_EXTRACTION_MIN_SHARDS) -> None:
         """
         Creates a new SnapshotExtractionQuery instance.
 
@@ -136,6 +146,10 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
         limit : int, optional
             Max article limit for the extraction operation. Recommended for test only.
             Full extractions and updates will be affected by this parameter.
+        shards : int or str, optional
+            Number of files to generate, between 25 (default) and 10000. If set to
+            ``'auto'``, the number is calculated from the Explain volume so each
+            file is close to ``const.EXTRACTION_TARGET_FILE_BYTES``.
         """
 
         super().__init__(where, includes, include_lists, excludes, exclude_lists)
@@ -145,11 +159,14 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
         else:
             raise ValueError("Limit value is not valid or not positive")
 
-        tools.validate_type(shards, int, "Unexpected value for limit")
-        if shards >= 25 and shards <= 10000:
-            self.shards = shards
+        if isinstance(shards, str) and (shards.lower().strip() == const.API_EXTRACTION_AUTO_SHARDS):
+            self.shards = const.API_EXTRACTION_AUTO_SHARDS
         else:
-            raise ValueError("Shards value is not valid")
+            tools.validate_type(shards, int, "Unexpected value for shards")
+            if shards >= const.API_EXTRACTION_MIN_SHARDS and shards <= const.API_EXTRACTION_MAX_SHARDS:
+                self.shards = shards
+            else:
+                raise ValueError("Shards value is not valid")
         
         # tools.validate_type(file_format, str, "Unexpected value for file_format")
         # file_format = file_format.lower().strip()
@@ -169,6 +186,55 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
         self._file_format = value
 
 
+    @property
+    def resolved_shards(self):
+        # Shards resolved for other criteria are not reused
+        if self._resolved_shards_key != self._shards_key():
+            return None
+        return self._resolved_shards
+
+    @resolved_shards.setter
+    def resolved_shards(self, value):
+        self._resolved_shards = value
+        self._resolved_shards_key = self._shards_key() if value is not None else None
+
+
+    def _shards_key(self) -> str:
+        # Fingerprint of the values used to resolve auto shards
+        return tools.md5hash(json.dumps([SnapshotBaseQuery.get_payload(self), self.limit, self.file_format],
+                                        sort_keys=True))
+
+
+    def resolve_shards(self, volume_estimate: int, target_file_bytes: int = const.EXTRACTION_TARGET_FILE_BYTES) -> int:
+        """
+        Calculates the number of shards for an estimated document volume, so
+        that each generated file is close to ``target_file_bytes``. The result
+        is bounded to the values accepted by the API and stored in
+        ``resolved_shards``.
+
+        Parameters
+        ----------
+        volume_estimate : int
+            Number of documents matching the query, usually obtained from
+            a Snapshot Explain job.
+        target_file_bytes : int, optional
+            Desired size in bytes for each extraction file.
+
+        Returns
+        -------
+        int
+            Number of shards to use in the extraction request
+
+        """
+        tools.validate_type(volume_estimate, int, "Unexpected value for volume_estimate")
+        if self.limit > 0:
+            volume_estimate = min(volume_estimate, self.limit)
+        total_bytes = volume_estimate * const.EXTRACTION_AVG_DOCUMENT_BYTES[self.file_format]
+        shards = -(-total_bytes // target_file_bytes)
+        self.resolved_shards = int(min(max(shards, const.API_EXTRACTION_MIN_SHARDS), const.API_EXTRACTION_MAX_SHARDS))
+        return self.resolved_shards
+
+
     def get_payload(self) -> dict:
         """
         Create the basic request payload to be used within a Snapshots Extraction API
@@ -179,14 +245,26 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
         dict
             Dictionary containing non-null query attributes.
 
+        Raises
+        ------
+        ValueError
+            When ``shards`` is ``'auto'`` and ``resolve_shards`` has not been called.
+
         """
         query_dict = super().get_payload()
 
         if self.limit > 0:
             query_dict["query"].update({"limit": self.limit})
 
+        if self.shards == const.API_EXTRACTION_AUTO_SHARDS:
+            if self.resolved_shards is None:
+                raise ValueError("Shards set to auto. Call resolve_shards() or submit through SnapshotExtraction.")
+            shards = self.resolved_shards
+        else:
+            shards = self.shards
+
         query_dict["query"].update({"format": self.file_format})
-        query_dict["query"].update({"shards": self.shards})
+        query_dict["query"].update({"shards": shards})
 
         return query_dict
 
@@ -199,7 +277,10 @@ class SnapshotExtractionQuery(SnapshotBaseQuery):
         ret_val = super().__str__(detailed, prefix, root_prefix)
         ret_val = ret_val.replace('└─', '├─')
         ret_val += f"\n{prefix}file_format: {tools.print_property(self.file_format)}"
-        ret_val += f"\n{prefix}shards: {tools.print_property(self.shards)}"
+        if (self.shards == const.API_EXTRACTION_AUTO_SHARDS) and self.resolved_shards:
+            ret_val += f"\n{prefix}shards: auto ({self.resolved_shards:,d})"
+        else:
+            ret_val += f"\n{prefix}shards: {tools.print_property(self.shards)}"
         ret_val += f"\n{prefix[0:-2]}└─limit: {tools.print_property(self.limit)}"
         return ret_val
 
@@ -294,6 +375,10 @@ class SnapshotExtraction(SnapshotBase):
                 'Content-Type': 'application/json'
             }
         
+        if (self.query.shards == const.API_EXTRACTION_AUTO_SHARDS) and (self.query.resolved_shards is None):
+            self.query.resolve_shards(self.get_volume_estimate())
+            self.__log.info(f"Auto shards resolved to {self.query.resolved_shards}")
+
         submit_url = f"{self.__JOB_BASE_URL}"
         submit_payload = self.query.get_payload()
 
@@ -313,6 +398,43 @@ class SnapshotExtraction(SnapshotBase):
         return True
 
 
+    @log.factiva_logger
+    def get_volume_estimate(self, use_cache=True) -> int:
+        """
+        Obtains the number of documents matching the assigned query by running
+        a Snapshot Explain job.
+
+        Parameters
+        ----------
+        use_cache : bool or ResultCache, optional
+            If True (default), volumes are stored in the local result cache by
+            user key and query criteria, and reused until the ``explain`` TTL
+            in ``const.RESULT_CACHE_TTL`` expires, so repeated calls don't run
+            new Explain jobs. A ``ResultCache`` instance can be provided to use
+            custom settings.
+
+        Returns
+        -------
+        int
+            Estimated volume of documents matching the query
+
+        Raises
+        ------
+        RuntimeError
+            When the Explain job fails.
+        """
+        s_explain = SnapshotExplain(user_key=self.user_key,
+                                    query=SnapshotExplainQuery(where=self.query.where,
+                                                               includes=self.query.includes,
+                                                               include_lists=self.query.include_lists,
+                                                               excludes=self.query.excludes,
+                                                               exclude_lists=self.query.exclude_lists))
+        s_explain.process_job(use_cache=use_cache)
+        if s_explain.job_response.job_state != const.API_JOB_DONE_STATE:
+            raise RuntimeError(f"Explain job failed: {s_explain.job_response.errors}")
+        return s_explain.job_response.volume_estimate
+
+
     @log.factiva_logger
     def get_job_response(self) -> bool:
         """
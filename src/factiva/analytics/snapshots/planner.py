@@ -0,0 +1,293 @@
+"""
+  Module with a planner that splits large Snapshot Extractions into
+  several date-sliced jobs, based on Snapshot Explain volumes
+"""
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import pandas as pd
+from .explain import SnapshotExplain, SnapshotExplainQuery
+from .extraction import SnapshotExtraction, SnapshotExtractionQuery
+from ..common import log, const, tools
+from ..auth import UserKey
+
+
+class SnapshotExtractionPlanner():
+    """
+    Planner class that splits a large extraction into date-sliced jobs.
+
+    The ``where`` clause is bisected by ``publication_datetime`` ranges,
+    running Snapshot Explain jobs until every slice is under the target
+    document volume. Slices are then submitted as concurrent extractions
+    and the downloaded files are merged into a single folder. Several
+    medium-size jobs complete faster than a single large one.
+
+    Attributes
+    ----------
+    user_key : UserKey
+        User representation for service authentication
+    query : SnapshotExtractionQuery
+        Base query. Its ``where`` clause is combined with each slice date range.
+    start_date : pandas.Timestamp
+        Lower bound (inclusive) of the ``publication_datetime`` range
+    end_date : pandas.Timestamp
+        Upper bound (exclusive) of the ``publication_datetime`` range
+    max_volume : int
+        Max number of documents per slice
+    max_concurrent_jobs : int
+        Max number of jobs running simultaneously
+    slices : pandas.DataFrame
+        Planned slices with the columns ``start_date``, ``end_date``,
+        ``volume_estimate``, ``short_id``, ``job_state`` and ``files``
+
+    Examples
+    --------
+    Planning and running an extraction for a full year
+
+    .. code-block:: python
+
+        from factiva.analytics import SnapshotExtractionPlanner
+        planner = SnapshotExtractionPlanner(
+            query="LOWER(language_code) = 'en' AND REGEXP_CONTAINS(subject_codes, r'(?i)(^|,)c1521(,|$)')",
+            start_date='2022-01-01', end_date='2023-01-01', max_volume=2000000)
+        planner.plan()
+        planner.process_jobs(path='/home/user/c1521-2022')
+
+    """
+
+    __log = None
+
+    user_key: Optional[UserKey] = None
+    query: Optional[SnapshotExtractionQuery] = None
+    start_date: Optional[pd.Timestamp] = None
+    end_date: Optional[pd.Timestamp] = None
+    max_volume: Optional[int] = None
+    max_concurrent_jobs: Optional[int] = None
+    min_slice_seconds: Optional[int] = None
+    slices: Optional[pd.DataFrame] = None
+
+
+    def __init__(self, query, start_date, end_date, user_key=None,
+                 max_volume=const.PLANNER_MAX_SLICE_VOLUME,
+                 max_concurrent_jobs=const.API_MAX_CONCURRENT_EXTRACTIONS,
+                 min_slice_seconds=const.PLANNER_MIN_SLICE_SECONDS) -> None:
+        """
+        Creates a SnapshotExtractionPlanner instance.
+
+        Parameters
+        ----------
+        query : str or SnapshotExtractionQuery
+            Base query. Must not contain conditions on ``publication_datetime``
+            outside the provided date range, nor a ``limit``, as it can't be
+            split across slices.
+        start_date : str or datetime
+            Lower bound (inclusive) of the ``publication_datetime`` range.
+        end_date : str or datetime
+            Upper bound (exclusive) of the ``publication_datetime`` range.
+        user_key : str or UserKey
+            String containing the 32-character long APi Key. If not provided, the
+            constructor will try to obtain its value from the FACTIVA_USERKEY
+            environment variable.
+        max_volume : int, optional
+            Max number of documents per slice.
+        max_concurrent_jobs : int, optional
+            Max number of Explain or Extraction jobs running simultaneously. Must not
+            exceed the concurrent extraction limit of the account.
+        min_slice_seconds : int, optional
+            Slices are not split below this duration, even when above ``max_volume``.
+        """
+        self.__log = log.get_factiva_logger()
+        if isinstance(user_key, UserKey):
+            self.user_key = user_key
+        else:
+            self.user_key = UserKey(user_key)
+
+        if isinstance(query, SnapshotExtractionQuery):
+            self.query = query
+        elif isinstance(query, str):
+            self.query = SnapshotExtractionQuery(query)
+        else:
+            raise ValueError('Unexpected query type')
+        if self.query.limit > 0:
+            raise ValueError('Queries with a limit cannot be split into slices')
+
+        self.start_date = pd.Timestamp(start_date)
+        self.end_date = pd.Timestamp(end_date)
+        if self.start_date >= self.end_date:
+            raise ValueError('start_date must be earlier than end_date')
+
+        tools.validate_type(max_volume, int, 'Unexpected value for max_volume')
+        tools.validate_type(max_concurrent_jobs, int, 'Unexpected value for max_concurrent_jobs')
+        if (max_volume < 1) or (max_concurrent_jobs < 1):
+            raise ValueError('max_volume and max_concurrent_jobs must be positive')
+        self.max_volume = max_volume
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.min_slice_seconds = min_slice_seconds
+        self.__slices_lock = threading.Lock()
+        self.__log.info('SnapshotExtractionPlanner created OK')
+
+
+    def _slice_where(self, start_date, end_date) -> str:
+        date_where = (f"publication_datetime >= '{start_date.strftime('%Y-%m-%d %H:%M:%S')}' "
+                      f"AND publication_datetime < '{end_date.strftime('%Y-%m-%d %H:%M:%S')}'")
+        if not (self.query.where or '').strip():
+            return date_where
+        return f"({self.query.where}) AND {date_where}"
+
+
+    def _slice_query(self, query_class, start_date, end_date, **kwargs):
+        return query_class(where=self._slice_where(start_date, end_date),
+                           includes=self.query.includes,
+                           include_lists=self.query.include_lists,
+                           excludes=self.query.excludes,
+                           exclude_lists=self.query.exclude_lists,
+                           **kwargs)
+
+
+    def _explain_volume(self, date_range) -> int:
+        start_date, end_date = date_range
+        s_explain = SnapshotExplain(user_key=self.user_key,
+                                    query=self._slice_query(SnapshotExplainQuery, start_date, end_date))
+        s_explain.process_job()
+        if s_explain.job_response.job_state != const.API_JOB_DONE_STATE:
+            raise RuntimeError(f"Explain job failed for slice {start_date} - {end_date}: {s_explain.job_response.errors}")
+        return s_explain.job_response.volume_estimate
+
+
+    @staticmethod
+    def split_range(start_date, end_date) -> list:
+        """
+        Splits a date range into two halves, rounded to whole seconds.
+
+        Parameters
+        ----------
+        start_date : pandas.Timestamp
+            Lower bound of the range
+        end_date : pandas.Timestamp
+            Upper bound of the range
+
+        Returns
+        -------
+        list
+            Two ``(start_date, end_date)`` tuples
+
+        """
+        mid_date = (start_date + (end_date - start_date) / 2).floor('s')
+        return [(start_date, mid_date), (mid_date, end_date)]
+
+
+    @log.factiva_logger
+    def plan(self) -> pd.DataFrame:
+        """
+        Runs Explain jobs bisecting the date range until every slice is under
+        ``max_volume`` documents. Explains for slices at the same depth run
+        concurrently. Slices with no documents are discarded.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Planned slices. Also assigned to the ``slices`` attribute.
+
+        """
+        self.__log.info('plan Start')
+        pending = [(self.start_date, self.end_date)]
+        planned = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_jobs) as executor:
+            while pending:
+                volumes = list(executor.map(self._explain_volume, pending))
+                next_pending = []
+                for (start_date, end_date), volume in zip(pending, volumes):
+                    too_short = (end_date - start_date).total_seconds() < 2 * self.min_slice_seconds
+                    if (volume > self.max_volume) and not too_short:
+                        next_pending.extend(self.split_range(start_date, end_date))
+                    elif volume > 0:
+                        planned.append((start_date, end_date, volume))
+                self.__log.info(f"Planned {len(planned)} slices, {len(next_pending)} to split")
+                pending = next_pending
+
+        self.slices = pd.DataFrame(planned, columns=['start_date', 'end_date', 'volume_estimate'])
+        self.slices = self.slices.sort_values('start_date', ignore_index=True)
+        self.slices['short_id'] = None
+        self.slices['job_state'] = None
+        self.slices['files'] = 0
+        self.__log.info('plan End')
+        return self.slices
+
+
+    def _process_slice(self, slice_index, path) -> bool:
+        slice_row = self.slices.loc[slice_index]
+        slice_path = os.path.join(path, f".slice-{slice_index:04d}")
+        slice_query = self._slice_query(SnapshotExtractionQuery,
+                                        slice_row['start_date'],
+                                        slice_row['end_date'],
+                                        file_format=self.query.file_format,
+                                        shards=self.query.shards)
+        if slice_query.shards == const.API_EXTRACTION_AUTO_SHARDS:
+            # The planned volume avoids a new Explain job per slice
+            slice_query.resolve_shards(int(slice_row['volume_estimate']))
+        s_extraction = SnapshotExtraction(user_key=self.user_key, query=slice_query)
+        ret_val = s_extraction.process_job(path=slice_path)
+        short_id = s_extraction.job_response.short_id
+        files = 0
+        if os.path.isdir(slice_path):
+            # Files are prefixed with the slice short_id to avoid name collisions
+            for file_name in sorted(os.listdir(slice_path)):
+                os.replace(os.path.join(slice_path, file_name), os.path.join(path, f"{short_id}-{file_name}"))
+                files += 1
+            shutil.rmtree(slice_path)
+        with self.__slices_lock:
+            self.slices.loc[slice_index, ['short_id', 'job_state', 'files']] = [short_id, s_extraction.job_response.job_state, files]
+        return ret_val
+
+
+    @log.factiva_logger
+    def process_jobs(self, path=None) -> bool:
+        """
+        Submits one extraction per planned slice, with at most ``max_concurrent_jobs``
+        running simultaneously, and merges all files into a single folder. File names
+        are prefixed with the ``short_id`` of their slice. Runs ``plan()`` if slices
+        have not been planned yet.
+
+        Parameters
+        ----------
+        path : str, optional
+            Folder where files are stored. Default is a folder named ``extraction-plan``
+            in the current working directory.
+
+        Returns
+        -------
+        bool
+            True if all slice extractions were successful. False otherwise.
+
+        """
+        self.__log.info('process_jobs Start')
+        if self.slices is None:
+            self.plan()
+        if path is None:
+            path = os.path.join(os.getcwd(), 'extraction-plan')
+        os.makedirs(path, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_jobs) as executor:
+            results = list(executor.map(lambda s_idx: self._process_slice(s_idx, path), self.slices.index))
+        self.__log.info('process_jobs End')
+        return all(results)
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}user_key: {str(self.user_key)}\n"
+        ret_val += f"{prefix}query: {self.query.__str__(detailed=False, prefix='  │  ├─')}\n"
+        ret_val += f"{prefix}start_date: {self.start_date}\n"
+        ret_val += f"{prefix}end_date: {self.end_date}\n"
+        ret_val += f"{prefix}max_volume: {tools.print_property(self.max_volume)}\n"
+        ret_val += f"{prefix}max_concurrent_jobs: {tools.print_property(self.max_concurrent_jobs)}\n"
+        if self.slices is not None:
+            ret_val += f"{prefix[0:-2]}└─slices: {len(self.slices)} [{self.slices['volume_estimate'].sum():,d} documents]"
+        else:
+            ret_val += f"{prefix[0:-2]}└─slices: <NotPlanned>"
+        return ret_val
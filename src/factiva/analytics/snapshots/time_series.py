@@ -1,12 +1,17 @@
 """
   Classes to interact with the Snapshot Analytics (TimeSeries) endpoint
 """
-from io import StringIO
+import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
 import pandas as pd
+from pandas.api.types import union_categoricals
 from typing import Any, Optional
 from .base import SnapshotBase, SnapshotBaseQuery, SnapshotBaseJobResponse
 from ..common import log, const, tools, req
+from ..common.cache import ResultCache
+from ..auth import UserKey
 
 
 class SnapshotTimeSeriesJobReponse(SnapshotBaseJobResponse):
@@ -369,11 +374,8 @@ class SnapshotTimeSeriesQuery(SnapshotBaseQuery):
     @top.setter
     def top(self, value: int) -> None:
         """Set the top value with validation."""
-        tools.validate_type(value, int, "Unexpected value for top")
-        if value >= -1:
-            self._top = value
-        else:
-            raise ValueError('Top value must be an ingeger greater than or equal to -1')
+        tools.validate_top(value)
+        self._top = value
 
 
 
@@ -472,11 +474,19 @@ class SnapshotTimeSeries(SnapshotBase):
 
 
     @log.factiva_logger
-    def get_job_response(self) -> bool:
+    def get_job_response(self, download_data=True) -> bool:
         """
         Performs a request to the API using the job ID to get its status.
 
         If the job has been completed, results are assigned to the ``job_response`` object.
+        Results files are streamed and parsed line by line into typed columns: the
+        date field as datetime, ``count`` as int and the group dimension as category.
+
+        Parameters
+        ----------
+        download_data : bool, optional
+            If False, the results file is not downloaded into ``job_response.data``.
+            Useful for large results that are later processed with ``iter_results``.
 
         Returns
         -------
@@ -515,7 +525,8 @@ class SnapshotTimeSeries(SnapshotBase):
             self.job_response.job_link = response_data['links']['self']
             if self.job_response.job_state == const.API_JOB_DONE_STATE:
                 if 'results' in response_data['data']['attributes'].keys():
-                    self.job_response.data = pd.DataFrame(response_data['data']['attributes']['results'])
+                    self.job_response.data = next(_iter_timeseries_records(
+                        response_data['data']['attributes']['results'], *self._result_fields()))
                 else:
                     self.job_response.download_link = response_data['data']['attributes']['download_link']
             if 'errors' in response_data.keys():
@@ -527,24 +538,84 @@ class SnapshotTimeSeries(SnapshotBase):
             raise ValueError(f"Bad Request: {detail}")
         else:
             raise RuntimeError(f"API request returned an unexpected HTTP status, with content [{response.text}]")
-        if self.job_response.download_link:
-            self.__log.info(f"Downloading TimeSeries response file from {self.job_response.download_link.split('/')[-1]}")
-            response = req.api_send_request(method='GET', endpoint_url=self.job_response.download_link, headers=headers_dict)
-            if response.status_code == 200:
-                decoded_response = response.content.decode('utf-8')
-                jsonl_io = StringIO(decoded_response)
-                self.job_response.data = pd.read_json(jsonl_io, lines=True)
-            else:
-                raise RuntimeError(f"TimeSeries results file download error: [{response.text}]")
+        if self.job_response.download_link and download_data:
+            self.job_response.data = next(self.iter_results(chunksize=None))
         self.__log.info('get_job_response End')
         return True
 
 
-    def process_job(self):  # TODO: Implement Retries if a 500 or timeout is returned during the active wait
+    def _result_fields(self):
+        # Query is not available when the instance is created from a job_id
+        if self.query:
+            return self.query.date_field, self.query.group_dimension
+        return const.API_PUBLICATION_DATETIME_FIELD, None
+
+
+    def iter_results(self, chunksize=const.TIMESERIES_RESULTS_CHUNKSIZE):
+        """
+        Iterates over the job results in typed DataFrame chunks. When results
+        are provided as a file, it is streamed and parsed line by line, so
+        high-cardinality results (e.g. ``top=-1``) don't need to fit in memory
+        at once.
+
+        Parameters
+        ----------
+        chunksize : int, optional
+            Number of rows per yielded DataFrame. If None, a single DataFrame
+            is yielded, concatenating typed chunks of
+            ``const.TIMESERIES_RESULTS_CHUNKSIZE`` rows.
+
+        Yields
+        ------
+        pandas.DataFrame
+            Time-series rows with the date field as datetime, ``count`` as int
+            and the group dimension as category
+
+        """
+        if (not self.job_response) or (self.job_response.job_state != const.API_JOB_DONE_STATE):
+            raise RuntimeError('Job has not yet been completed')
+        date_field, group_dimension = self._result_fields()
+
+        if not self.job_response.download_link:
+            r_df = self.job_response.data if self.job_response.data is not None else pd.DataFrame()
+            step = chunksize or max(len(r_df), 1)
+            for start in range(0, max(len(r_df), 1), step):
+                yield r_df.iloc[start:start + step]
+            return
+
+        headers_dict = {
+            'user-key': self.user_key.key
+        }
+        self.__log.info(f"Downloading TimeSeries response file from {self.job_response.download_link.split('/')[-1]}")
+        response = req.api_send_request(method='GET', endpoint_url=self.job_response.download_link,
+                                        headers=headers_dict, stream=True)
+        if response.status_code != 200:
+            raise RuntimeError(f"TimeSeries results file download error: [{response.text}]")
+        try:
+            records = (json.loads(line) for line in response.iter_lines(chunk_size=const.DOWNLOAD_CHUNK_SIZE) if line)
+            r_chunks = _iter_timeseries_records(records, date_field, group_dimension,
+                                                chunksize or const.TIMESERIES_RESULTS_CHUNKSIZE)
+            if chunksize:
+                yield from r_chunks
+            else:
+                yield _concat_timeseries_frames(list(r_chunks), group_dimension)
+        finally:
+            response.close()
+
+
+    def process_job(self, use_cache=False):  # TODO: Implement Retries if a 500 or timeout is returned during the active wait
         """
         Submit a new job to be processed, wait until the job is completed
         and then retrieves the job results.
 
+        Parameters
+        ----------
+        use_cache : bool or ResultCache, optional
+            If True, the dataset is taken from the local result cache when an
+            identical query was processed before with the same user key, and
+            no job is submitted. New results are stored in the cache. A
+            ``ResultCache`` instance can be provided to use custom settings.
+
         Returns
         -------
         bool
@@ -553,6 +624,17 @@ class SnapshotTimeSeries(SnapshotBase):
 
         """
         self.__log.info('process_job Start')
+        if use_cache:
+            r_cache = use_cache if isinstance(use_cache, ResultCache) else ResultCache()
+            cache_key = r_cache.make_key(self.query.get_payload(), self.user_key)
+            cached = r_cache.get(const.RESULT_CACHE_TIMESERIES, cache_key)
+            if cached:
+                self.__log.info(f"TimeSeries data retrieved from cache for Job ID {cached['job_id']}")
+                self.job_response = SnapshotTimeSeriesJobReponse(cached['job_id'])
+                self.job_response.job_state = const.API_JOB_DONE_STATE
+                self.job_response.data = cached['data']
+                return True
+
         self.submit_job()
         self.get_job_response()
 
@@ -569,11 +651,180 @@ class SnapshotTimeSeries(SnapshotBase):
             #     raise Exception('Job failed')
             time.sleep(const.API_JOB_ACTIVE_WAIT_SPACING)
             self.get_job_response()
-        
+
+        if use_cache and (self.job_response.job_state == const.API_JOB_DONE_STATE):
+            r_cache.set(const.RESULT_CACHE_TIMESERIES, cache_key, {
+                'job_id': self.job_response.job_id,
+                'data': self.job_response.data
+            })
         self.__log.info('process_job End')
         return True
 
 
+    @log.factiva_logger
+    def process_job_incremental(self, overlap_periods=1, use_cache=True):
+        """
+        Refreshes a previously processed time-series by only recomputing the
+        most recent periods. Results from prior runs are stored locally. The
+        ``where`` clause is narrowed to the periods starting at the last
+        ``overlap_periods`` stored periods, and the delta job results replace
+        those periods in the stored series. If no prior results exist, the
+        full time-series is processed. With a ``group_dimension``, the delta
+        is requested with all values (``top=-1``) and ``top`` is applied
+        locally to each recomputed period.
+
+        Parameters
+        ----------
+        overlap_periods : int, optional
+            Number of trailing stored periods that are recomputed. Default 1,
+            as the latest period is usually incomplete.
+        use_cache : bool or ResultCache, optional
+            Local cache used to store the series between runs. A ``ResultCache``
+            instance can be provided to use custom settings.
+
+        Returns
+        -------
+        bool
+            True if the processing was successful. An Exception otherwise.
+
+        """
+        tools.validate_type(overlap_periods, int, 'Unexpected value for overlap_periods')
+        if overlap_periods < 1:
+            raise ValueError('overlap_periods must be a positive integer')
+        r_cache = use_cache if isinstance(use_cache, ResultCache) else ResultCache()
+        cache_key = r_cache.make_key(self.query.get_payload(), self.user_key)
+        cached = r_cache.get(const.RESULT_CACHE_TIMESERIES_HISTORY, cache_key)
+
+        period_field = self.query.date_field
+        if (cached is None) or (period_field not in cached['data'].columns):
+            self.__log.info('No prior time-series results. Processing the full series.')
+            self.process_job()
+        else:
+            prior_df = cached['data']
+            prior_periods = _period_to_timestamp(prior_df[period_field])
+            periods = prior_periods.drop_duplicates().sort_values()
+            if len(periods) <= overlap_periods:
+                self.process_job()
+            else:
+                delta_start = periods.iloc[-overlap_periods]
+                delta_query = SnapshotTimeSeriesQuery(
+                    where=f"({self.query.where}) AND {period_field} >= '{delta_start.strftime('%Y-%m-%d %H:%M:%S')}'",
+                    includes=self.query.includes,
+                    include_lists=self.query.include_lists,
+                    excludes=self.query.excludes,
+                    exclude_lists=self.query.exclude_lists,
+                    group_dimension=self.query.group_dimension,
+                    frequency=self.query.frequency,
+                    date_field=period_field,
+                    top=-1 if self.query.group_dimension else self.query.top)
+                self.__log.info(f"Requesting time-series delta from {delta_start}")
+                delta_ts = SnapshotTimeSeries(user_key=self.user_key, query=delta_query)
+                delta_ts.process_job()
+                self.job_response = delta_ts.job_response
+                if self.job_response.job_state == const.API_JOB_DONE_STATE:
+                    delta_df = self.job_response.data
+                    if delta_df is None:
+                        delta_df = prior_df.iloc[0:0]
+                    elif self.query.group_dimension:
+                        delta_df = tools.top_per_period(delta_df, period_field, self.query.group_dimension,
+                                                        self.query.top)
+                    self.job_response.data = _concat_timeseries_frames(
+                        [prior_df[(prior_periods < delta_start).values], delta_df], self.query.group_dimension)
+
+        if self.job_response.job_state == const.API_JOB_DONE_STATE:
+            r_cache.set(const.RESULT_CACHE_TIMESERIES_HISTORY, cache_key, {
+                'job_id': self.job_response.job_id,
+                'data': self.job_response.data
+            })
+        return True
+
+
+    @classmethod
+    def multi(cls, query, group_dimensions=None, date_ranges=None, user_key=None,
+              max_workers=const.TIMESERIES_MAX_CONCURRENT_JOBS) -> pd.DataFrame:
+        """
+        Runs one TimeSeries job per group dimension and date range concurrently,
+        polls them together and stitches the results in a long-format DataFrame.
+        Wall-clock time is close to the slowest job instead of the sum of all jobs.
+
+        Parameters
+        ----------
+        query : str or SnapshotTimeSeriesQuery
+            Base query. Its ``group_dimension`` is used when ``group_dimensions``
+            is not provided.
+        group_dimensions : list, optional
+            Fields used to break-down subtotals, one job per field.
+        date_ranges : list, optional
+            List of ``(start_date, end_date)`` tuples. Each range adds a
+            ``date_field >= start_date AND date_field < end_date`` condition to
+            the ``where`` clause. Use ranges aligned to the query frequency, as
+            counts for periods split across ranges are added, and ``top``
+            applies to each range separately.
+        user_key : str or UserKey, optional
+            User key used for all jobs. Default is the FACTIVA_USERKEY
+            environment variable.
+        max_workers : int, optional
+            Max number of concurrent requests.
+
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with the columns ``<date_field>``, ``dimension``, ``code``
+            and ``count``. ``dimension`` and ``code`` are empty when no group
+            dimension is used.
+
+        Raises
+        ------
+        RuntimeError
+            When any of the jobs fails.
+
+        """
+        if isinstance(query, str):
+            query = SnapshotTimeSeriesQuery(query)
+        if not isinstance(query, SnapshotTimeSeriesQuery):
+            raise ValueError('Unexpected query type')
+        if not isinstance(user_key, UserKey):
+            user_key = UserKey(user_key)
+
+        group_dimensions = group_dimensions or [query.group_dimension or None]
+        date_ranges = date_ranges or [None]
+        ts_jobs = []
+        for group_dimension, date_range in product(group_dimensions, date_ranges):
+            where = query.where
+            if date_range:
+                start_date, end_date = [pd.Timestamp(r_date).strftime('%Y-%m-%d %H:%M:%S') for r_date in date_range]
+                where = f"({where}) AND {query.date_field} >= '{start_date}' AND {query.date_field} < '{end_date}'"
+            ts_jobs.append(cls(user_key=user_key, query=SnapshotTimeSeriesQuery(
+                where=where,
+                includes=query.includes,
+                include_lists=query.include_lists,
+                excludes=query.excludes,
+                exclude_lists=query.exclude_lists,
+                group_dimension=group_dimension,
+                frequency=query.frequency,
+                date_field=query.date_field,
+                top=query.top)))
+
+        final_states = [const.API_JOB_DONE_STATE, const.API_JOB_FAILED_STATE]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda ts_job: ts_job.submit_job(), ts_jobs))
+            pending = ts_jobs
+            while pending:
+                list(executor.map(lambda ts_job: ts_job.get_job_response(), pending))
+                for ts_job in pending:
+                    if ts_job.job_response.job_state not in const.API_JOB_EXPECTED_STATES:
+                        raise RuntimeError('Unexpected job state')
+                pending = [ts_job for ts_job in pending if ts_job.job_response.job_state not in final_states]
+                if pending:
+                    time.sleep(const.API_JOB_ACTIVE_WAIT_SPACING)
+
+        failed = [ts_job.job_response.job_id for ts_job in ts_jobs if ts_job.job_response.job_state != const.API_JOB_DONE_STATE]
+        if failed:
+            raise RuntimeError(f"TimeSeries jobs failed: {failed}")
+        return stitch_time_series([(ts_job.query.group_dimension, ts_job.job_response.data) for ts_job in ts_jobs],
+                                  query.date_field)
+
+
     def __repr__(self):
         return super().__repr__()
 
@@ -582,3 +833,101 @@ class SnapshotTimeSeries(SnapshotBase):
         ret_val = super().__str__(detailed, prefix, root_prefix)
         ret_val = ret_val.replace('├─job_response', '└─job_response')
         return ret_val
+
+
+
+def stitch_time_series(results, date_field=const.API_PUBLICATION_DATETIME_FIELD) -> pd.DataFrame:
+    """
+    Combines time-series results for several group dimensions or date ranges in
+    a single long-format DataFrame. Counts for the same period, dimension and
+    code are added.
+
+    Parameters
+    ----------
+    results : list
+        List of ``(group_dimension, data)`` tuples, where ``data`` is a DataFrame
+        as returned in ``SnapshotTimeSeriesJobReponse.data``.
+    date_field : str, optional
+        Name of the period column.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with the columns ``<date_field>``, ``dimension``, ``code``
+        and ``count``.
+
+    """
+    long_frames = []
+    for group_dimension, r_df in results:
+        if r_df is None or r_df.empty:
+            continue
+        long_frames.append(pd.DataFrame({
+            date_field: _period_to_timestamp(r_df[date_field]),
+            'dimension': group_dimension if group_dimension else None,
+            'code': r_df[group_dimension].astype(str) if group_dimension else None,
+            'count': r_df['count'].astype('int64')
+        }))
+    if not long_frames:
+        return pd.DataFrame({date_field: pd.Series(dtype='datetime64[ns]'), 'dimension': pd.Series(dtype='category'),
+                             'code': pd.Series(dtype='category'), 'count': pd.Series(dtype='int64')})
+    long_df = pd.concat(long_frames, ignore_index=True)
+    long_df = long_df.groupby([date_field, 'dimension', 'code'], dropna=False, sort=True)['count'].sum().reset_index()
+    long_df['dimension'] = long_df['dimension'].astype('category')
+    long_df['code'] = long_df['code'].astype('category')
+    return long_df
+
+
+
+def _iter_timeseries_records(records, date_field, group_dimension=None, chunksize=None):
+    # Builds typed DataFrames from time-series records, holding only one chunk of values at a time
+    columns = {}
+    n_rows = 0
+    yielded = False
+    for record in records:
+        for field, value in record.items():
+            if field not in columns:
+                columns[field] = [None] * n_rows
+            columns[field].append(value)
+        n_rows += 1
+        for values in columns.values():
+            if len(values) < n_rows:
+                values.append(None)
+        if chunksize and (n_rows == chunksize):
+            yield _timeseries_frame(columns, date_field, group_dimension)
+            yielded = True
+            columns = {field: [] for field in columns}
+            n_rows = 0
+    if n_rows or not yielded:
+        yield _timeseries_frame(columns, date_field, group_dimension)
+
+
+def _timeseries_frame(columns, date_field, group_dimension=None) -> pd.DataFrame:
+    r_df = pd.DataFrame(columns)
+    if date_field in r_df.columns:
+        r_df[date_field] = _period_to_timestamp(r_df[date_field])
+    if 'count' in r_df.columns:
+        r_df['count'] = r_df['count'].astype('int64')
+    if group_dimension and (group_dimension in r_df.columns):
+        r_df[group_dimension] = r_df[group_dimension].astype('category')
+    return r_df
+
+
+def _concat_timeseries_frames(frames, group_dimension=None) -> pd.DataFrame:
+    # Categories are merged directly, instead of going through an object column
+    if len(frames) == 1:
+        return frames[0]
+    if not (group_dimension and all((group_dimension in r_df.columns) and
+                                    isinstance(r_df[group_dimension].dtype, pd.CategoricalDtype) for r_df in frames)):
+        return pd.concat(frames, ignore_index=True)
+    group_pos = frames[0].columns.get_loc(group_dimension)
+    group_values = union_categoricals([r_df[group_dimension] for r_df in frames])
+    r_df = pd.concat([r_df.drop(columns=group_dimension) for r_df in frames], ignore_index=True)
+    r_df.insert(group_pos, group_dimension, group_values)
+    return r_df
+
+
+def _period_to_timestamp(periods: pd.Series) -> pd.Series:
+    # Period values are returned as YYYY, YYYY-MM or YYYY-MM-DD depending on the frequency
+    if pd.api.types.is_datetime64_any_dtype(periods):
+        return periods
+    return pd.to_datetime(periods.astype(str), format='mixed')
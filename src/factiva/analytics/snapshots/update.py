@@ -1,11 +1,490 @@
 """
-  Classes to interact with the Snapshot Explain endpoint
+  Classes to interact with the Snapshot Updates endpoint, and apply update
+  files to a local dataset.
 """
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+from .base import SnapshotBase, SnapshotBaseJobResponse
+from ..common import log, const, req, tools
+from ..auth import UserKey
 
-class SnapshotUpdate():
-    pass
 
-class SnapshotUpdateJobReponse():
-    pass
+class SnapshotUpdateJobReponse(SnapshotBaseJobResponse):
+    """
+    Snapshot Update Job Response class. Contains the status and files of a
+    single update job (additions, replacements or deletes).
 
+    Attributes
+    ----------
+    job_id : str
+        Job ID returned by Factiva Analytics at submission time, with a format like
+        ``dj-synhub-extraction-<user_key>-<snapshot_id>-<update_type>-<datetime>``
+    update_id : str
+        Short update ID with the format ``<snapshot_id>-<update_type>-<datetime>``
+    update_type : str
+        Update type. One of ``additions``, ``replacements`` or ``deletes``
+    job_link : str
+        Job unique URI
+    job_state : str
+        Job status value
+    errors : list
+        If not empty, a list of errors during the job execution
+    files : list
+        If the job is successful, the list of files that can be downloaded
 
+    """
+
+    update_id: Optional[str] = None
+    update_type: Optional[str] = None
+    errors: Optional[list[dict]] = None
+    files: Optional[list[str]] = None
+
+
+    def __init__(self, job_id: str = None, user_key: UserKey = None) -> None:
+        # UPDATE_ID FORMAT: {SNAPSHOT_ID}-{UPDATE_TYPE}-{DATETIME}
+        if job_id.startswith('dj-synhub-extraction-'):
+            self.job_id = job_id
+            self.update_id = '-'.join(job_id.split('-')[-3:])
+        elif (job_id.count('-') == 2) and (user_key):
+            self.job_id = f"dj-synhub-extraction-{user_key.key.lower()}-{job_id}"
+            self.update_id = job_id
+        else:
+            raise ValueError('Unexpected value for job_id. If an update_id is provided, a user_key instance is needed.')
+        self.update_type = self.update_id.split('-')[1]
+        self.files = []
+
+
+    def __repr__(self):
+        return super().__repr__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = super().__str__(detailed, prefix, root_prefix)
+        ret_val += f"{prefix}update_type: {tools.print_property(self.update_type)}"
+        ret_val += f"\n{prefix}files: {tools.print_property(self.files)}"
+        if self.errors:
+            ret_val += f"\n{prefix[0:-2]}└─errors: [{len(self.errors)}]"
+        else:
+            ret_val += f"\n{prefix[0:-2]}└─errors: <NoErrors>"
+        return ret_val
+
+
+
+class SnapshotUpdate(SnapshotBase):
+    """
+    Main class to request Snapshot Updates, and apply them to a local copy
+    of the extraction. The three update types (additions, replacements and
+    deletes) are submitted and downloaded concurrently, and then merged into
+    a ``SnapshotStore`` or a Parquet dataset using ``an`` as key. Avoids
+    re-extracting the full snapshot to get the latest changes.
+
+    Attributes
+    ----------
+    user_key : UserKey
+        User representation for service authentication
+    snapshot_id : str
+        Short ID of the original extraction (10 characters)
+    job_responses : dict
+        Dictionary with a ``SnapshotUpdateJobReponse`` per update type
+
+    Examples
+    --------
+    Requesting the latest updates and applying them to a local store
+
+    .. code-block:: python
+
+        from factiva.analytics import SnapshotUpdate
+        from factiva.analytics.integration import SnapshotStore
+        su = SnapshotUpdate(snapshot_id='abcd1234xy')
+        su.process_jobs(path='/home/user/updates')
+        su.apply_to_store(SnapshotStore('/home/user/abcd1234xy.db'))
+
+    """
+
+    snapshot_id: Optional[str] = None
+    update_types: Optional[list[str]] = None
+    job_responses: Optional[dict] = None
+    download_path: Optional[str] = None
+
+    def __init__(self, snapshot_id=None, update_ids=None, user_key=None,
+                 update_types=const.API_UPDATE_TYPES) -> None:
+        """
+        Creates a SnapshotUpdate instance.
+
+        Parameters
+        ----------
+        snapshot_id : str
+            Short ID of the extraction to update. Not compatible with ``update_ids``.
+        update_ids : list, optional
+            List of existing update IDs with the format ``<snapshot_id>-<update_type>-<datetime>``,
+            or full job IDs. Not compatible with ``snapshot_id``.
+        user_key : str or UserKey
+            String containing the 32-character long APi Key. If not provided, the
+            constructor will try to obtain its value from the FACTIVA_USERKEY
+            environment variable.
+        update_types : list, optional
+            Update types to request. Default is ``['additions', 'replacements', 'deletes']``.
+        """
+        super().__init__(user_key=user_key)
+        self.__log = log.get_factiva_logger()
+        self.__JOB_BASE_URL = f"{const.API_HOST}{const.API_SNAPSHOTS_BASEPATH}"
+        self.__UPDATE_BASE_URL = f"{const.API_HOST}{const.API_EXTRACTIONS_BASEPATH}"
+        self.job_responses = {}
+
+        if snapshot_id and update_ids:
+            raise ValueError('The snapshot_id and update_ids parameters cannot be assigned simultaneously')
+
+        for update_type in update_types:
+            tools.validate_field_options(update_type, const.API_UPDATE_TYPES)
+        self.update_types = list(update_types)
+
+        if update_ids:
+            for update_id in update_ids:
+                job_response = SnapshotUpdateJobReponse(update_id, self.user_key)
+                self.job_responses[job_response.update_type] = job_response
+            # update_ids can also contain full job IDs, which start with the user key
+            self.snapshot_id = next(iter(self.job_responses.values())).update_id.split('-')[0]
+            self.update_types = list(self.job_responses.keys())
+            self.get_job_responses()
+        elif snapshot_id:
+            self.snapshot_id = snapshot_id
+        else:
+            raise ValueError('Parameters snapshot_id or update_ids are required')
+        self.__log.info('SnapshotUpdate created OK')
+
+
+    def _submit_update_job(self, update_type) -> SnapshotUpdateJobReponse:
+        headers_dict = {
+                'user-key': self.user_key.key,
+                'Content-Type': 'application/json'
+            }
+        submit_url = f"{self.__UPDATE_BASE_URL}/dj-synhub-extraction-{self.user_key.key.lower()}-{self.snapshot_id}/{update_type}"
+        response = req.api_send_request(method='POST', endpoint_url=submit_url, headers=headers_dict)
+
+        if response.status_code == 201:
+            response_data = response.json()
+            job_response = SnapshotUpdateJobReponse(response_data['data']['id'])
+            job_response.job_state = response_data['data']['attributes']['current_state']
+            job_response.job_link = response_data['links']['self']
+        elif response.status_code == 400:
+            raise ValueError(f"Invalid Update Request [{response.text}]")
+        else:
+            raise RuntimeError(f"API request returned an unexpected HTTP status, with content [{response.text}]")
+        return job_response
+
+
+    @log.factiva_logger
+    def submit_jobs(self) -> bool:
+        """
+        Submits one update job per update type. Requests are sent concurrently.
+
+        Returns
+        -------
+        bool
+            True if all submissions were successful. An Exception otherwise.
+
+        """
+        self.__log.info('submit_jobs Start')
+        with ThreadPoolExecutor(max_workers=len(self.update_types)) as executor:
+            job_responses = list(executor.map(self._submit_update_job, self.update_types))
+        self.job_responses = {job_response.update_type: job_response for job_response in job_responses}
+        self.__log.info('submit_jobs End')
+        return True
+
+
+    def _get_update_job_response(self, job_response) -> bool:
+        headers_dict = {
+            'user-key': self.user_key.key,
+            'Content-Type': 'application/json'
+        }
+        getinfo_url = job_response.job_link or f"{self.__JOB_BASE_URL}/{job_response.job_id}"
+        response = req.api_send_request(method='GET', endpoint_url=getinfo_url, headers=headers_dict)
+
+        if response.status_code == 200:
+            response_data = response.json()
+            job_response.job_state = response_data['data']['attributes']['current_state']
+            job_response.job_link = response_data['links']['self']
+            if job_response.job_state == const.API_JOB_DONE_STATE:
+                files_obj_list = response_data['data']['attributes']['files']
+                job_response.files = [obj['uri'] for obj in files_obj_list]
+            if 'errors' in response_data.keys():
+                job_response.files = []
+                job_response.errors = response_data['errors']
+                for err in job_response.errors:
+                    self.__log.error(f"JobError: [{err['title']}] {err['detail']}")
+                return False
+        elif response.status_code == 404:
+            raise ValueError('Update ID does not exist for the provided user key.')
+        else:
+            raise RuntimeError(f"API request returned an unexpected HTTP status, with content [{response.text}]")
+        return True
+
+
+    @log.factiva_logger
+    def get_job_responses(self) -> bool:
+        """
+        Requests the status of all update jobs concurrently. If a job has been
+        completed, its file list is assigned to the matching job response.
+
+        Returns
+        -------
+        bool
+            True if all requests were successful. False if any job reported
+            errors. An Exception for unexpected HTTP codes.
+
+        """
+        if not self.job_responses:
+            raise RuntimeError('Update jobs have not yet been submitted')
+        with ThreadPoolExecutor(max_workers=len(self.job_responses)) as executor:
+            results = list(executor.map(self._get_update_job_response, self.job_responses.values()))
+        return all(results)
+
+
+    def _download_file(self, file_uri, download_path) -> str:
+        headers_dict = {
+                'user-key': self.user_key.key
+            }
+        response = req.api_send_request(method='GET', endpoint_url=file_uri, headers=headers_dict, stream=True)
+        if response.status_code == 200:
+            with open(download_path, 'wb') as download_file:
+                for chunk in response.iter_content(chunk_size=const.DOWNLOAD_CHUNK_SIZE):
+                    download_file.write(chunk)
+        else:
+            raise RuntimeError(f"API request returned an unexpected HTTP status, with content [{response.text}]")
+        return download_path
+
+
+    @log.factiva_logger
+    def download_files(self, path=None, max_workers=const.API_MAX_CONCURRENT_DOWNLOADS) -> bool:
+        """
+        Downloads the files of all completed update jobs in parallel. Files are
+        stored in one subfolder per update type, e.g. ``<path>/additions``.
+        Files from previous updates in these subfolders are removed first, so
+        they are not applied again.
+
+        Parameters
+        ----------
+        path : str, optional
+            Folder where files are stored. Default is a folder named after the
+            ``snapshot_id`` in the current working directory.
+        max_workers : int, optional
+            Max number of concurrent downloads.
+
+        Returns
+        -------
+        bool
+            True if files were downloaded. False if no files are available.
+
+        """
+        if path is None:
+            path = os.path.join(os.getcwd(), self.snapshot_id)
+        self.download_path = path
+        downloads = []
+        for update_type in self.update_types:
+            type_path = os.path.join(path, update_type)
+            Path(type_path).mkdir(parents=True, exist_ok=True)
+            for file_name in os.listdir(type_path):
+                if os.path.isfile(os.path.join(type_path, file_name)):
+                    os.remove(os.path.join(type_path, file_name))
+        for update_type, job_response in self.job_responses.items():
+            type_path = os.path.join(path, update_type)
+            Path(type_path).mkdir(parents=True, exist_ok=True)
+            for file_uri in (job_response.files or []):
+                downloads.append((file_uri, os.path.join(type_path, file_uri.split('/')[-1])))
+        if not downloads:
+            return False
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda d_item: self._download_file(*d_item), downloads))
+        self.__log.info(f"{len(downloads)} update files downloaded to {path}")
+        return True
+
+
+    @log.factiva_logger
+    def process_jobs(self, path=None, max_workers=const.API_MAX_CONCURRENT_DOWNLOADS) -> bool:
+        """
+        Submits all update jobs, waits until they are completed and downloads
+        the generated files in parallel.
+
+        Parameters
+        ----------
+        path : str, optional
+            Folder where files are stored. See ``download_files``.
+        max_workers : int, optional
+            Max number of concurrent downloads.
+
+        Returns
+        -------
+        bool
+            True if all jobs were successful. False if any job failed.
+            An Exception otherwise.
+
+        """
+        self.__log.info('process_jobs Start')
+        self.submit_jobs()
+        ret_val = self.get_job_responses()
+        final_states = [const.API_JOB_DONE_STATE, const.API_JOB_FAILED_STATE]
+        while not all([j_resp.job_state in final_states for j_resp in self.job_responses.values()]):
+            for j_resp in self.job_responses.values():
+                if j_resp.job_state not in const.API_JOB_EXPECTED_STATES:
+                    raise RuntimeError('Unexpected job state')
+            time.sleep(const.API_JOB_ACTIVE_WAIT_SPACING)
+            if not self.get_job_responses():
+                ret_val = False
+        self.download_files(path=path, max_workers=max_workers)
+        self.__log.info('process_jobs End')
+        return ret_val
+
+
+    def _update_folders(self, path=None) -> dict:
+        path = path or self.download_path
+        if path is None:
+            raise RuntimeError('Update files have not been downloaded and path was not provided')
+        folders = {}
+        for update_type in self.update_types:
+            type_path = os.path.join(path, update_type)
+            if os.path.isdir(type_path) and os.listdir(type_path):
+                folders[update_type] = type_path
+        return folders
+
+
+    def _folder_ans(self, folderpath) -> set:
+        from ..integration import SnapshotFiles
+        s_files = SnapshotFiles()
+        deleted = set()
+        for r_df in s_files.iter_folder(folderpath, columns=['an']):
+            deleted.update(r_df['an'].dropna().tolist())
+        return deleted
+
+
+    @log.factiva_logger
+    def apply_to_store(self, store, path=None, stats_only=False) -> dict:
+        """
+        Applies downloaded update files to a ``SnapshotStore``. Additions and
+        replacements are upserted by ``an``, and deletes are removed afterwards.
+
+        Parameters
+        ----------
+        store : SnapshotStore
+            Store containing the original extraction.
+        path : str, optional
+            Folder with the update files. Default is the folder used by ``download_files``.
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+
+        Returns
+        -------
+        dict
+            Number of applied documents per update type
+
+        """
+        folders = self._update_folders(path)
+        applied = {}
+        for update_type in [const.API_UPDATE_ADDITIONS, const.API_UPDATE_REPLACEMENTS]:
+            if update_type in folders:
+                applied[update_type] = store.load_folder(folders[update_type], stats_only=stats_only)
+        if const.API_UPDATE_DELETES in folders:
+            applied[const.API_UPDATE_DELETES] = store.delete_documents(self._folder_ans(folders[const.API_UPDATE_DELETES]))
+        self.__log.info(f"Updates applied to store: {applied}")
+        return applied
+
+
+    @log.factiva_logger
+    def apply_to_parquet(self, dataset_dir, path=None, stats_only=False, compression='snappy') -> dict:
+        """
+        Applies downloaded update files to a Parquet dataset, e.g. created with
+        ``SnapshotFiles.to_parquet_dataset``. Only the existing files containing
+        replaced or deleted documents are rewritten. New and replaced documents
+        are written to new files with a unique name per call, partitioned like
+        the existing dataset. As in ``apply_to_store``, replacements win over
+        additions, and deletes win over both.
+
+        Parameters
+        ----------
+        dataset_dir : str
+            Folder containing the Parquet dataset
+        path : str, optional
+            Folder with the update files. Default is the folder used by ``download_files``.
+        stats_only : bool, optional
+            Specifies if only file metadata is loaded (True), or if the full article content is loaded (False).
+        compression : str, optional
+            Parquet compression codec for new and rewritten files.
+
+        Returns
+        -------
+        dict
+            Number of applied documents per update type, and number of rewritten files
+
+        """
+        from ..integration import SnapshotFiles
+        from ..integration.files import _import_pyarrow_parquet
+        pq = _import_pyarrow_parquet()
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        folders = self._update_folders(path)
+        s_files = SnapshotFiles()
+        upsert_types = [u_type for u_type in [const.API_UPDATE_ADDITIONS, const.API_UPDATE_REPLACEMENTS] if u_type in folders]
+        type_ans = {u_type: self._folder_ans(folders[u_type]) for u_type in upsert_types}
+        deleted_ans = self._folder_ans(folders[const.API_UPDATE_DELETES]) if const.API_UPDATE_DELETES in folders else set()
+        removed_ans = deleted_ans.union(*type_ans.values())
+
+        # Rewrite only existing files that contain any of the affected documents
+        partition_by = []
+        rewritten = 0
+        removed_values = pa.array(sorted(removed_ans), type=pa.string()) if removed_ans else None
+        for root, _, file_names in os.walk(dataset_dir):
+            for file_name in file_names:
+                if not file_name.endswith('.parquet'):
+                    continue
+                if not partition_by:
+                    rel_parts = os.path.relpath(root, dataset_dir).split(os.sep)
+                    partition_by = [part.split('=')[0] for part in rel_parts if '=' in part]
+                if removed_values is None:
+                    continue
+                file_path = os.path.join(root, file_name)
+                an_table = pq.read_table(file_path, columns=['an'], memory_map=True)
+                affected = pc.is_in(an_table['an'], value_set=removed_values)
+                if not pc.any(affected).as_py():
+                    continue
+                p_table = pq.read_table(file_path, memory_map=True, partitioning=None)
+                p_table = p_table.filter(pc.invert(affected))
+                tmp_path = f"{file_path}.tmp"
+                pq.write_table(p_table, tmp_path, compression=compression)
+                os.replace(tmp_path, file_path)
+                rewritten += 1
+
+        applied = {}
+        apply_id = uuid.uuid4().hex[:12]
+        for update_type in upsert_types:
+            exclude_ans = set(deleted_ans)
+            if update_type == const.API_UPDATE_ADDITIONS:
+                exclude_ans |= type_ans.get(const.API_UPDATE_REPLACEMENTS, set())
+            u_rows = s_files.to_parquet_dataset(folders[update_type], dataset_dir, partition_by=partition_by,
+                                                stats_only=stats_only, compression=compression,
+                                                basename=f"update-{apply_id}-{update_type}", exclude_ans=exclude_ans)
+            applied[update_type] = u_rows
+        applied[const.API_UPDATE_DELETES] = len(deleted_ans)
+        applied['rewritten_files'] = rewritten
+        self.__log.info(f"Updates applied to Parquet dataset: {applied}")
+        return applied
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}user_key: {str(self.user_key)}\n"
+        ret_val += f"{prefix}snapshot_id: {tools.print_property(self.snapshot_id)}\n"
+        if self.job_responses:
+            ret_val += f"{prefix[0:-2]}└─job_responses:"
+            for update_type, job_response in self.job_responses.items():
+                ret_val += f"\n     ├─{update_type}: {tools.print_property(job_response.job_state)} [{len(job_response.files or [])} files]"
+        else:
+            ret_val += f"{prefix[0:-2]}└─job_responses: <NotSubmitted>"
+        return ret_val
@@ -2,7 +2,11 @@
     Define methods and properties for the taxonomy module.
 """
 
-__all__ = ['FactivaTaxonomy', 'FactivaTaxonomyCategories']
+__all__ = ['FactivaTaxonomy', 'FactivaTaxonomyCategories', 'TaxonomyCache', 'TaxonomySearchIndex', 'CompanyNameResolver', 'PointInTimeIndex']
 
 from .factiva_taxonomies import FactivaTaxonomy, FactivaTaxonomyCategories
+from .cache import TaxonomyCache
+from .search import TaxonomySearchIndex
+from .resolver import CompanyNameResolver
+from .pit import PointInTimeIndex
 # from .company_identifiers import Company
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+  Persistent, versioned on-disk cache for taxonomy datasets
+"""
+import os
+import json
+import time
+import pandas as pd
+from ..common import config, const, tools
+
+
+class TaxonomyCache(object):
+    """
+    Stores taxonomy category datasets in Parquet files shared by all processes
+    using the same cache folder. Each entry records its download timestamp and
+    version (the HTTP ``ETag`` or ``Last-Modified`` value when available, or a
+    content hash otherwise). Entries older than ``revalidate_after`` seconds
+    are revalidated against the API, and only downloaded again when the
+    version changed. Files are loaded using memory-mapping.
+
+    Requires the ``pyarrow`` package (``pip install factiva-analytics[parquet]``).
+
+    Parameters
+    ----------
+    cache_folder : str, optional
+        Folder where entries are stored. Default is the ``taxonomy`` subfolder
+        of ``config.CACHE_DEFAULT_FOLDER``.
+    revalidate_after : int, optional
+        Seconds after which an entry is revalidated. Default is
+        ``config.TAXONOMY_CACHE_REVALIDATE_AFTER``.
+
+    """
+
+    cache_folder = None
+    revalidate_after = None
+
+    def __init__(self, cache_folder=None, revalidate_after=None):
+        if cache_folder is None:
+            cache_folder = os.path.join(config.CACHE_DEFAULT_FOLDER, const.TAXONOMY_CACHE_SUBFOLDER)
+        if revalidate_after is None:
+            revalidate_after = int(config.TAXONOMY_CACHE_REVALIDATE_AFTER)
+        self.cache_folder = cache_folder
+        self.revalidate_after = revalidate_after
+
+
+    def _entry_paths(self, name, user_key):
+        # Taxonomies can differ between accounts (e.g. enabled company identifiers)
+        key = user_key.key if hasattr(user_key, 'key') else str(user_key)
+        entry_name = f"{name}-{tools.md5hash(key)[:12]}"
+        return (os.path.join(self.cache_folder, f"{entry_name}.parquet"),
+                os.path.join(self.cache_folder, f"{entry_name}.json"))
+
+
+    def get_artifact_path(self, name, user_key, artifact) -> str:
+        """Returns the path for a file derived from an entry, e.g. a prebuilt index
+        Parameters
+        ----------
+        name : str
+            Entry name, usually the taxonomy category value
+        user_key : UserKey or str
+            User key used to download the entry
+        artifact : str
+            Artifact name, used as file name suffix
+        Returns
+        -------
+        str
+            Path of a ``.npz`` file in the cache folder. The file may not exist.
+        """
+        data_path, _ = self._entry_paths(name, user_key)
+        return f"{data_path[:-len('.parquet')]}-{artifact}.npz"
+
+
+    def get_metadata(self, name, user_key) -> dict:
+        """Returns the metadata of an entry, or None if it doesn't exist
+        Parameters
+        ----------
+        name : str
+            Entry name, usually the taxonomy category value
+        user_key : UserKey or str
+            User key used to download the entry
+        Returns
+        -------
+        dict
+            Dictionary with the keys ``version``, ``etag``, ``last_modified``,
+            ``downloaded_at`` and ``validated_at``
+        """
+        data_path, meta_path = self._entry_paths(name, user_key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+
+    def needs_revalidation(self, metadata) -> bool:
+        """Checks if an entry is older than ``revalidate_after``"""
+        return (time.time() - metadata['validated_at']) > self.revalidate_after
+
+
+    def read(self, name, user_key, usecols=None) -> pd.DataFrame:
+        """Loads an entry with memory-mapping
+        Parameters
+        ----------
+        name : str
+            Entry name, usually the taxonomy category value
+        user_key : UserKey or str
+            User key used to download the entry
+        usecols : callable, optional
+            Function that receives a column name and returns True if the
+            column must be loaded. Other columns are not read from disk.
+        Returns
+        -------
+        pandas.DataFrame
+            Cached dataset
+        """
+        from ..integration.files import _import_pyarrow_parquet
+        pq = _import_pyarrow_parquet()
+        data_path, _ = self._entry_paths(name, user_key)
+        columns = None
+        if usecols is not None:
+            columns = [col for col in pq.read_schema(data_path, memory_map=True).names if usecols(col)]
+        return pq.read_table(data_path, columns=columns, memory_map=True).to_pandas()
+
+
+    def write(self, name, user_key, r_df, version, etag=None, last_modified=None) -> None:
+        """Stores an entry, replacing any previous version
+        Parameters
+        ----------
+        name : str
+            Entry name, usually the taxonomy category value
+        user_key : UserKey or str
+            User key used to download the entry
+        r_df : pandas.DataFrame
+            Dataset to store
+        version : str
+            Version identifier of the dataset
+        etag : str, optional
+            ``ETag`` header returned by the API, used for conditional revalidation
+        last_modified : str, optional
+            ``Last-Modified`` header returned by the API, used for conditional revalidation
+        """
+        from ..integration.files import _import_pyarrow_parquet
+        pq = _import_pyarrow_parquet()
+        import pyarrow as pa
+        tools.create_path_if_not_exist(self.cache_folder)
+        data_path, meta_path = self._entry_paths(name, user_key)
+        tmp_suffix = f".{os.getpid()}.tmp"
+        pq.write_table(pa.Table.from_pandas(r_df, preserve_index=False), data_path + tmp_suffix)
+        os.replace(data_path + tmp_suffix, data_path)
+        now = time.time()
+        self._write_metadata(meta_path, {'version': version, 'etag': etag, 'last_modified': last_modified,
+                                         'downloaded_at': now, 'validated_at': now})
+
+
+    def touch(self, name, user_key) -> None:
+        """Marks an entry as validated, after confirming its version is current"""
+        metadata = self.get_metadata(name, user_key)
+        if metadata:
+            metadata['validated_at'] = time.time()
+            self._write_metadata(self._entry_paths(name, user_key)[1], metadata)
+
+
+    def _write_metadata(self, meta_path, metadata):
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as meta_file:
+            json.dump(metadata, meta_file)
+        os.replace(tmp_path, meta_path)
+
+
+    def clear(self) -> int:
+        """Removes all entries from the cache folder
+        Returns
+        -------
+        int
+            Number of removed entries
+        """
+        if not os.path.exists(self.cache_folder):
+            return 0
+        removed = 0
+        for file_name in os.listdir(self.cache_folder):
+            if file_name.endswith(('.parquet', '.json', '.npz')):
+                os.remove(os.path.join(self.cache_folder, file_name))
+                removed += file_name.endswith('.parquet')
+        return removed
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}cache_folder: {tools.print_property(self.cache_folder)}\n"
+        ret_val += f"{prefix[0:-2]}└─revalidate_after: {tools.print_property(self.revalidate_after)}"
+        return ret_val
@@ -1,9 +1,15 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from ..common import tools
 from ..common import req
 from ..common import log
 from ..common import tools
 from ..common import const
+from ..common import config
+from ..common.cache import ResultCache
 from ..auth import UserKey
+from .pit import PointInTimeIndex
 import pandas as pd
 
 
@@ -32,12 +38,19 @@ class FactivaCompany():
     __TICKER_COMPANY_IDENTIFIER_NAME = 'ticker_exchange'
 
     user_key=None
+    failures=None
     
     def __init__(self, user_key=None):
         """Class initializar"""
-        self.user_key = UserKey(user_key, True)
+        if isinstance(user_key, UserKey):
+            self.user_key = user_key
+        else:
+            self.user_key = UserKey(user_key)
         # self.log = log.get_factiva_logger()
         self.__log = log.get_factiva_logger()
+        self.failures = None
+        self.__resolved = {}
+        self.__pit_index = {}
 
 
     @log.factiva_logger
@@ -126,7 +139,7 @@ class FactivaCompany():
         file_format : str
             Format of the file
         to_save_path : str, optional
-            Path to be used to store the file
+            Path to be used to store the file. Default is ``config.DOWNLOAD_DEFAULT_FOLDER``.
         add_timestamp : bool, optional
             Flag to determine if include timestamp info at the filename
 
@@ -144,9 +157,7 @@ class FactivaCompany():
 
         self.validate_point_time_request(identifier)
         if (to_save_path is None):
-            # TODO: Fix this!
-            DOWNLOAD_DEFAULT_FOLDER = 'fix this'
-            to_save_path = DOWNLOAD_DEFAULT_FOLDER
+            to_save_path = config.DOWNLOAD_DEFAULT_FOLDER
 
         headers_dict = {'user-key': self.user_key.key}
         endpoint = f"{self.__API_ENDPOINT_TAXONOMY}{const.API_SNAPSHOTS_COMPANIES_PIT}/{identifier}/{file_format}"
@@ -156,6 +167,84 @@ class FactivaCompany():
                                             add_timestamp)
         return local_file_name
 
+    @log.factiva_logger
+    def get_point_in_time_index(self, identifier, to_save_path=None, refresh=False) -> PointInTimeIndex:
+        """Returns a local index built from the point-in-time file of an identifier type.
+
+        The file is downloaded with ``point_in_time_download_all`` when it doesn't
+        exist in ``to_save_path`` or ``refresh`` is True. The built index is saved
+        next to it as a ``.npz`` file, and loaded from there while the CSV file
+        doesn't change.
+
+        Parameters
+        ----------
+        identifier : str
+            A company identifier type
+        to_save_path : str, optional
+            Folder for the PIT and index files. Default is ``config.DOWNLOAD_DEFAULT_FOLDER``.
+        refresh : bool, optional
+            If True, the PIT file is downloaded again
+
+        Returns
+        -------
+        PointInTimeIndex:
+            Index over the PIT file
+
+        Raises
+        ------
+        ValueError: When the user is not allowed to permorm this operation
+        ValueError: When the identifier requested is not valid
+        """
+        if (identifier in self.__pit_index) and (not refresh):
+            return self.__pit_index[identifier]
+        if (to_save_path is None):
+            to_save_path = config.DOWNLOAD_DEFAULT_FOLDER
+        file_name = f"pit-{identifier}"
+        csv_path = os.path.join(to_save_path, f"{file_name}.csv")
+        index_path = os.path.join(to_save_path, f"{file_name}.npz")
+        if refresh or (not os.path.exists(csv_path)):
+            self.point_in_time_download_all(identifier, file_name, 'csv', to_save_path=to_save_path)
+        if os.path.exists(index_path) and (os.path.getmtime(index_path) >= os.path.getmtime(csv_path)):
+            pit_index = PointInTimeIndex.load(index_path)
+        else:
+            self.__log.info(f"Building point-in-time index for {identifier}")
+            pit_index = PointInTimeIndex.from_file(csv_path)
+            pit_index.save(index_path)
+        self.__pit_index[identifier] = pit_index
+        return pit_index
+
+
+    @log.factiva_logger
+    def point_in_time_lookup(self, identifier, values, dates) -> pd.Series:
+        """Resolves identifier values to Factiva codes on the given dates, locally.
+
+        Uses the index returned by ``get_point_in_time_index``, so millions of
+        (value, date) pairs are resolved without API requests. Pairs not found
+        can be checked individually with ``point_in_time_query``.
+
+        Parameters
+        ----------
+        identifier : str
+            A company identifier type
+        values : list or pandas.Series
+            Identifier values
+        dates : list, pandas.Series or str
+            Date for each value, or a single date for all of them
+
+        Returns
+        -------
+        pandas.Series:
+            Factiva code for each pair. Pairs not covered by the PIT file are NaN.
+
+        Examples
+        --------
+        Resolving ISINs on the publication date of each article
+            >>> c = FactivaCompany()
+            >>> articles['fcode'] = c.point_in_time_lookup('isin', articles['isin'], articles['publication_datetime']).values
+        """
+        return self.get_point_in_time_index(identifier).lookup(values, dates)
+
+
     @log.factiva_logger
     def point_in_time_query(self, identifier, value) -> dict:
         """Returns the resolved Factiva code and date ranges when the instrument from the identifier, was valid.
@@ -239,17 +328,59 @@ class FactivaCompany():
         raise RuntimeError('API Request returned an unexpected HTTP status')
 
 
+    def _post_companies_chunk(self, code_type, company_codes) -> tuple:
+        headers_dict = {
+            'user-key': self.user_key.key
+        }
+        payload_dict = {
+            "data": {
+                "attributes": {
+                    "ids": company_codes
+                }
+            }
+        }
+        endpoint = f"{const.API_HOST}{const.API_SNAPSHOTS_COMPANIES_BASEPATH}/{code_type}"
+        response = req.api_send_request(method='POST', endpoint_url=endpoint, headers=headers_dict, payload=payload_dict)
+        if response.status_code == 200 or response.status_code == 207:
+            attributes = response.json()['data']['attributes']
+            return attributes.get('successes', []), attributes.get('failures', [])
+        raise RuntimeError(f"API Request returned an unexpected HTTP status with message: {response.text}")
+
+
+    def _load_resolved(self, code_type, r_cache) -> dict:
+        # Resolved identifiers per code type, loaded from disk once and then kept in memory
+        if code_type not in self.__resolved:
+            cache_key = r_cache.make_key({'code_type': code_type}, self.user_key)
+            self.__resolved[code_type] = r_cache.get(const.RESULT_CACHE_COMPANY_IDENTIFIERS, cache_key) or {}
+        return self.__resolved[code_type]
+
+
     @log.factiva_logger
-    def get_multiple_companies(self, code_type, company_codes) -> pd.DataFrame:
+    def get_multiple_companies(self, code_type, company_codes, use_cache=False,
+                               max_workers=const.API_COMPANIES_MAX_CONCURRENT_REQUESTS,
+                               chunksize=const.API_COMPANIES_MAX_BATCH_SIZE) -> pd.DataFrame:
         """
         Request information about a list of companies.
 
+        Lists longer than ``chunksize`` are split and the chunks are requested
+        concurrently. Identifiers that could not be resolved are stored in
+        the ``failures`` attribute as a DataFrame.
+
         Parameters
         ----------
         code_type : str
             String describing the code type used to request the information about the company. E.g. isin, ticker.
         companies_codes : list
             List containing the company codes to request information about
+        use_cache : bool or ResultCache, optional
+            If True, resolved identifiers are stored in the local result cache
+            and reused for ``const.COMPANY_IDENTIFIERS_CACHE_TTL`` seconds, also
+            by other processes. A ``ResultCache`` instance can be provided to use
+            custom settings. Failures are not cached.
+        max_workers : int, optional
+            Max number of concurrent requests
+        chunksize : int, optional
+            Max number of identifiers per request
 
         Returns
         -------
@@ -276,30 +407,55 @@ class FactivaCompany():
         for single_company_code in company_codes:
             tools.validate_type(single_company_code, str, 'Unexpected value: each company in companies must be str')
 
-        headers_dict = {
-            'user-key': self.user_key.key
-        }
-
-        payload_dict = {
-            "data": {
-                "attributes": {
-                    "ids": company_codes
-                }
-            }
-        }
-
-        endpoint = f"{const.API_HOST}{const.API_SNAPSHOTS_COMPANIES_BASEPATH}/{code_type}"
-
-        response = req.api_send_request(method='POST', endpoint_url=endpoint, headers=headers_dict, payload=payload_dict)
-
-        if response.status_code == 200 or response.status_code == 207:
-            response_data = response.json()
-            return pd.DataFrame.from_records(response_data['data']['attributes']['successes'])
-        raise RuntimeError(f"API Request returned an unexpected HTTP status with message: {response.text}")
+        r_cache = None
+        resolved = {}
+        if use_cache:
+            r_cache = use_cache if isinstance(use_cache, ResultCache) else ResultCache()
+            resolved = self._load_resolved(code_type, r_cache)
+
+        now = time.time()
+        successes = []
+        pending = []
+        for company_code in dict.fromkeys(company_codes):
+            entry = resolved.get(company_code.upper())
+            if use_cache and entry and (now - entry['resolved_at'] <= const.COMPANY_IDENTIFIERS_CACHE_TTL):
+                successes.append(entry['record'])
+            else:
+                pending.append(company_code)
+        if use_cache:
+            self.__log.info(f"{len(successes)} identifiers found in cache, {len(pending)} to request")
+
+        chunks = [pending[i:i + chunksize] for i in range(0, len(pending), chunksize)]
+        failures = []
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(chunks)), 1)) as executor:
+            for chunk_successes, chunk_failures in executor.map(
+                    lambda chunk: self._post_companies_chunk(code_type, chunk), chunks):
+                successes += chunk_successes
+                failures += chunk_failures
+                for record in chunk_successes:
+                    if 'id' in record:
+                        resolved[str(record['id']).upper()] = {'resolved_at': now, 'record': record}
+
+        if r_cache and chunks:
+            # Entries stored by other processes in the meantime are kept, and expired entries are dropped
+            cache_key = r_cache.make_key({'code_type': code_type}, self.user_key)
+            stored = r_cache.get(const.RESULT_CACHE_COMPANY_IDENTIFIERS, cache_key) or {}
+            for code, entry in resolved.items():
+                if (code not in stored) or (stored[code]['resolved_at'] < entry['resolved_at']):
+                    stored[code] = entry
+            stored = {code: entry for code, entry in stored.items()
+                      if now - entry['resolved_at'] <= const.COMPANY_IDENTIFIERS_CACHE_TTL}
+            resolved.clear()
+            resolved.update(stored)
+            r_cache.set(const.RESULT_CACHE_COMPANY_IDENTIFIERS, cache_key, stored)
+        self.failures = pd.DataFrame.from_records(failures)
+        if failures:
+            self.__log.warning(f"{len(failures)} identifiers could not be resolved. See the failures attribute.")
+        return pd.DataFrame.from_records(successes)
 
 
     @log.factiva_logger
-    def get_company(self, code_type, company_codes) -> pd.DataFrame:
+    def get_company(self, code_type, company_codes, use_cache=False) -> pd.DataFrame:
         """Request information about either a single company or a list of companies.
 
         Parameters
@@ -308,6 +464,8 @@ class FactivaCompany():
             String describing the code type used to request the information about the company. E.g. isin, ticker.
         company_code: str or list
             Single company code (str) or list of company codes to translate.
+        use_cache : bool or ResultCache, optional
+            Used when a list is provided. See ``get_multiple_companies``.
 
         Returns
         -------
@@ -342,6 +500,6 @@ class FactivaCompany():
         if type(company_codes) is str:
             return self.get_single_company(code_type, company_codes)
         elif type(company_codes) is list:
-            return self.get_multiple_companies(code_type, company_codes)
+            return self.get_multiple_companies(code_type, company_codes, use_cache=use_cache)
         else:
             raise ValueError('company_codes must be a string or a list')
\ No newline at end of file
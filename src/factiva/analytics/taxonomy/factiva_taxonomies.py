@@ -1,13 +1,20 @@
 """FactivaTaxonomy Module."""
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from io import StringIO
 from enum import Enum
 from ..common import req
 from ..common import log
 from ..common import tools
 from ..common import const
-from ..auth import UserKey
+from ..common import config
+from ..common.hierarchy import HierarchyIndex
+from ..auth import UserKey, AccountInfo
+from .cache import TaxonomyCache
+from .search import TaxonomySearchIndex
+from .resolver import CompanyNameResolver
 
 
 class FactivaTaxonomyCategories(Enum):
@@ -64,6 +71,16 @@ class FactivaTaxonomy():
         that represents an existing user. If not provided, the
         constructor will try to obtain its value from the ``FACTIVA_USERKEY``
         environment variable.
+    use_cache : bool or TaxonomyCache, optional
+        If True, category datasets are stored in a shared on-disk cache and
+        loaded from it in later executions. Cached datasets are revalidated
+        against the API after ``TAXONOMY_CACHE_REVALIDATE_AFTER`` seconds. A
+        ``TaxonomyCache`` instance can be provided to use custom settings.
+        Requires the ``pyarrow`` package.
+    prefetch : bool, optional
+        If True, the categories listed in the ``TAXONOMY_PREFETCH_CATEGORIES``
+        environment variable are downloaded in background threads when the
+        instance is created. See ``prefetch()``.
 
     Examples
     --------
@@ -90,6 +107,14 @@ class FactivaTaxonomy():
         u = UserKey('abcd1234abcd1234abcd1234abcd1234')
         t = FactivaTaxonomy(user_key=u)
 
+    Creating a taxonomy instance that reuses datasets downloaded by other
+    processes
+
+    .. code-block:: python
+
+        from factiva.analytics import FactivaTaxonomy
+        t = FactivaTaxonomy(use_cache=True)
+
     With the ``FactivaTaxonomy`` instance ``t``, it's now possible to call any
     method. Please see below.
 
@@ -101,8 +126,17 @@ class FactivaTaxonomy():
     all_regions = None
     all_industries = None
     all_companies = None
+    taxonomy_cache = None
+    prefetch_futures = None
+
+    __CATEGORY_ATTRIBUTES = {
+        FactivaTaxonomyCategories.SUBJECTS: 'all_subjects',
+        FactivaTaxonomyCategories.REGIONS: 'all_regions',
+        FactivaTaxonomyCategories.INDUSTRIES: 'all_industries',
+        FactivaTaxonomyCategories.COMPANIES: 'all_companies'
+    }
 
-    def __init__(self, user_key=None):
+    def __init__(self, user_key=None, use_cache=False, prefetch=False):
         """Class initializer."""
         if isinstance(user_key, UserKey):
             self.user_key = user_key
@@ -114,12 +148,178 @@ class FactivaTaxonomy():
         self.all_regions = None
         self.all_industries = None
         self.all_companies = None
+        self.__lookup_index = {}
+        self.__hierarchy_edges = {}
+        self.__hierarchy_index = {}
+        self.__search_index = {}
+        self.__company_resolver = None
+        self.__prefetch_threads = {}
+        # Guards the datasets and derived indexes, shared with prefetch threads
+        self.__state_lock = threading.RLock()
+        self.prefetch_futures = {}
+        if use_cache:
+            self.taxonomy_cache = use_cache if isinstance(use_cache, TaxonomyCache) else TaxonomyCache()
+        else:
+            self.taxonomy_cache = None
+        if prefetch:
+            self.prefetch()
+
+
+    def prefetch(self, categories=None, account_info=False, build_indexes=True,
+                 max_workers=const.TAXONOMY_PREFETCH_MAX_WORKERS) -> dict:
+        """
+        Downloads taxonomy categories in background threads, so later calls
+        to methods like ``lookup_code`` or ``enrich`` don't wait for a full
+        download. Methods that need a category being prefetched wait for it
+        instead of starting a second download.
+
+        Parameters
+        ----------
+        categories : list, optional
+            ``FactivaTaxonomyCategories`` entries to download. Default is the
+            list in the ``TAXONOMY_PREFETCH_CATEGORIES`` environment variable,
+            or ``SUBJECTS``, ``REGIONS`` and ``INDUSTRIES`` if not set.
+        account_info : bool, optional
+            If True, an ``AccountInfo`` instance is also created in the
+            background, which requests the account stats, extractions,
+            streams and time-series jobs.
+        build_indexes : bool, optional
+            If True (default), the lookup index used by ``lookup_code``,
+            ``lookup_codes`` and ``enrich`` is also built.
+        max_workers : int, optional
+            Max number of concurrent downloads
+
+        Returns
+        -------
+        dict:
+            ``concurrent.futures.Future`` objects keyed by category value, and
+            by ``account`` when ``account_info`` is True. Category futures
+            return True, and the account future returns the ``AccountInfo``
+            instance. Futures are also kept in the ``prefetch_futures``
+            attribute.
+
+        Examples
+        --------
+        Warming the taxonomy at service start, and waiting for it when ready
+
+        .. code-block:: python
+
+            from concurrent.futures import wait
+            from factiva.analytics import FactivaTaxonomy, FactivaTaxonomyCategories
+            t = FactivaTaxonomy()
+            futures = t.prefetch([FactivaTaxonomyCategories.SUBJECTS,
+                                  FactivaTaxonomyCategories.COMPANIES], account_info=True)
+            wait(futures.values(), timeout=120)
+            account = futures['account'].result()
+
+        """
+        if categories is None:
+            categories = [FactivaTaxonomyCategories(c.strip())
+                          for c in config.TAXONOMY_PREFETCH_CATEGORIES.split(',') if c.strip()]
+        for category in categories:
+            if category not in self.__CATEGORY_ATTRIBUTES:
+                raise ValueError(f"The category {category.name} is not currently supported for this operation")
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='factiva-prefetch')
+        futures = {}
+        for category in categories:
+            if (category.value in self.prefetch_futures) and not self.prefetch_futures[category.value].done():
+                futures[category.value] = self.prefetch_futures[category.value]
+            else:
+                futures[category.value] = executor.submit(self._prefetch_category, category, build_indexes)
+        if account_info:
+            futures['account'] = executor.submit(AccountInfo, self.user_key.key)
+        # Pending tasks keep running, and threads are released when they finish
+        executor.shutdown(wait=False)
+        self.prefetch_futures.update(futures)
+        return futures
+
+
+    def _prefetch_category(self, category, build_indexes) -> bool:
+        self.__prefetch_threads[category] = threading.get_ident()
+        self.__log.info(f"Prefetching taxonomy {category.value}")
+        self.get_category_codes(category=category)
+        if build_indexes:
+            self._get_lookup_index(category)
+        return True
+
+
+    def _wait_prefetch(self, category) -> bool:
+        # Waits for an active prefetch of the category, unless called from the prefetch task itself.
+        # Returns True if the prefetch was active and completed. Prefetch errors are not raised here,
+        # the caller downloads the category as usual.
+        future = self.prefetch_futures.get(category.value)
+        if (future is None) or future.done() or (self.__prefetch_threads.get(category) == threading.get_ident()):
+            return False
+        return future.exception() is None
+
+
+    def _request_category(self, category, extra_headers=None):
+        headers_dict = {
+            'user-key': self.user_key.key
+        }
+        if extra_headers:
+            headers_dict.update(extra_headers)
+        endpoint = f"{self.__TAXONOMY_BASEURL}/{category.value}/csv"
+        response = req.api_send_request(method='GET', endpoint_url=endpoint, headers=headers_dict, stream=True)
+        if response.status_code not in [200, 304]:
+            raise RuntimeError('API Request returned an unexpected HTTP Status')
+        return response
+
+
+    @staticmethod
+    def _read_category_stream(response, usecols=None) -> pd.DataFrame:
+        # The body is parsed while it's downloaded, without keeping a full copy
+        # of the raw or decoded text. All columns are read as strings, so codes
+        # are never converted to numbers.
+        response.raw.decode_content = True
+        return pd.read_csv(response.raw, dtype=str, usecols=usecols, encoding='utf-8')
+
+
+    def _download_category_df(self, category, usecols=None) -> pd.DataFrame:
+        # Returns the dataset as published by the API, using the cache when enabled
+        if not self.taxonomy_cache:
+            response = self._request_category(category)
+            return self._read_category_stream(response, usecols)
+
+        t_cache = self.taxonomy_cache
+        metadata = t_cache.get_metadata(category.value, self.user_key)
+        if metadata and not t_cache.needs_revalidation(metadata):
+            return t_cache.read(category.value, self.user_key, usecols=usecols)
+
+        validators = {}
+        if metadata and metadata.get('etag'):
+            validators['If-None-Match'] = metadata['etag']
+        if metadata and metadata.get('last_modified'):
+            validators['If-Modified-Since'] = metadata['last_modified']
+        response = self._request_category(category, validators)
+        if response.status_code == 304:
+            self.__log.info(f"Taxonomy {category.value} not modified since last validation")
+            t_cache.touch(category.value, self.user_key)
+            return t_cache.read(category.value, self.user_key, usecols=usecols)
+
+        # The cache always stores all columns
+        r_df = self._read_category_stream(response)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        version = etag or last_modified or tools.md5hash(
+            pd.util.hash_pandas_object(r_df, index=False).values.tobytes().hex())
+        if metadata and (metadata['version'] == version):
+            t_cache.touch(category.value, self.user_key)
+        else:
+            self.__log.info(f"Storing taxonomy {category.value} version {version} in cache")
+            t_cache.write(category.value, self.user_key, r_df, version,
+                          etag=etag, last_modified=last_modified)
+        if usecols is not None:
+            r_df = r_df[[col for col in r_df.columns if usecols(col)]]
+        return r_df
 
 
     @log.factiva_logger
-    def get_category_codes(self, category:FactivaTaxonomyCategories) -> pd.DataFrame:
+    def get_category_codes(self, category:FactivaTaxonomyCategories, columns=None, copy=False) -> pd.DataFrame:
         """
         Request for available codes in the taxonomy for the specified category.
+        If the category is being prefetched, the call waits for it and returns
+        the prefetched dataset instead of downloading it again.
 
         .. important::
 
@@ -132,6 +332,17 @@ class FactivaTaxonomy():
         category : FactivaTaxonomyCategories
             Enumerator entry that specifies the taxonomy category for which the
             codes will be retrieved. 
+        columns : list, optional
+            Columns to load, using the names of the returned DataFrame (e.g.
+            ``descriptor``). The ``code`` column is always loaded. Other columns
+            are skipped while parsing, which reduces memory usage for large
+            categories like ``COMPANIES``. The partial dataset is not kept in
+            the ``all_*`` attributes, so other methods still load all columns.
+            Default is all columns.
+        copy : bool, optional
+            If True, a copy of the dataset is returned. By default, the returned
+            DataFrame is the same instance stored in the ``all_*`` attributes
+            and used by other methods, so it should not be modified.
 
         Returns
         -------
@@ -170,46 +381,61 @@ class FactivaTaxonomy():
         if category == FactivaTaxonomyCategories.EXECUTIVES:
             raise ValueError('The category EXECUTIVES is not currently supported for this operation')
 
-        response_format = 'csv'
-        headers_dict = {
-            'user-key': self.user_key.key
-        }
-        endpoint = f"{self.__TAXONOMY_BASEURL}/{category.value}/{response_format}"
-
-        response = req.api_send_request(method='GET', endpoint_url=endpoint, headers=headers_dict, stream=True)
-        if response.status_code == 200:
-            r_df = pd.read_csv(StringIO(response.content.decode()))
-
-            if 'Code' in r_df.columns:
-                r_df.rename(columns = {'Code':'code'}, inplace = True)
-            r_df['code'] = r_df['code'].str.upper()
-            r_df.set_index('code', inplace=True, drop=False)
-
-            if category == FactivaTaxonomyCategories.SUBJECTS:
-                for column in const.TAXONOMY_H_FIELDS_REMOVE:
-                    if column in r_df.columns:
-                        r_df.drop(column, axis=1, inplace=True)
-                r_df.rename(columns = const.TAXONOMY_H_FIELDS_RENAME_DICT, inplace = True)
-                self.all_subjects = r_df
-            elif category == FactivaTaxonomyCategories.REGIONS:
-                for column in const.TAXONOMY_H_FIELDS_REMOVE:
-                    if column in r_df.columns:
-                        r_df.drop(column, axis=1, inplace=True)
-                r_df.rename(columns = const.TAXONOMY_H_FIELDS_RENAME_DICT, inplace = True)
-                self.all_regions = r_df
-            elif category == FactivaTaxonomyCategories.INDUSTRIES:
-                for column in const.TAXONOMY_H_FIELDS_REMOVE:
-                    if column in r_df.columns:
-                        r_df.drop(column, axis=1, inplace=True)
-                r_df.rename(columns = const.TAXONOMY_H_FIELDS_RENAME_DICT, inplace = True)
-                self.all_industries = r_df
-            elif category == FactivaTaxonomyCategories.COMPANIES:
-                r_df.rename(columns = {'description':'descriptor'}, inplace = True)
-                self.all_companies = r_df
-
-            return r_df.copy()
+        attr_name = self.__CATEGORY_ATTRIBUTES.get(category)
+        if attr_name and self._wait_prefetch(category):
+            with self.__state_lock:
+                r_df = getattr(self, attr_name)
         else:
-            raise RuntimeError('API Request returned an unexpected HTTP Status')
+            r_df = None
+        if isinstance(r_df, pd.DataFrame):
+            if columns is not None:
+                wanted = {'code'} | {col.lower() for col in columns}
+                r_df = r_df[[col for col in r_df.columns if col.lower() in wanted]]
+            return r_df.copy() if copy else r_df
+
+        usecols = None
+        if columns is not None:
+            usecols = _category_usecols(category, columns)
+        r_df = self._download_category_df(category, usecols=usecols)
+
+        if 'Code' in r_df.columns:
+            r_df.rename(columns = {'Code':'code'}, inplace = True)
+        r_df['code'] = r_df['code'].str.upper()
+        r_df.set_index('code', inplace=True, drop=False)
+
+        edges = None
+        if (columns is None) and (category in [FactivaTaxonomyCategories.SUBJECTS, FactivaTaxonomyCategories.REGIONS,
+                                               FactivaTaxonomyCategories.INDUSTRIES]):
+            # All parent relations are kept apart before the extra columns are removed
+            edges = _parent_edges(r_df)
+
+        if category in [FactivaTaxonomyCategories.SUBJECTS, FactivaTaxonomyCategories.REGIONS,
+                        FactivaTaxonomyCategories.INDUSTRIES]:
+            for column in const.TAXONOMY_H_FIELDS_REMOVE:
+                if column in r_df.columns:
+                    r_df.drop(column, axis=1, inplace=True)
+            r_df.rename(columns = const.TAXONOMY_H_FIELDS_RENAME_DICT, inplace = True)
+        elif category == FactivaTaxonomyCategories.COMPANIES:
+            r_df.rename(columns = {'description':'descriptor'}, inplace = True)
+
+        if columns is not None:
+            # Partial datasets are only returned, as other methods need all columns
+            return r_df
+
+        # The dataset and its derived indexes are replaced at once, so other
+        # threads never see indexes built from a previous dataset
+        with self.__state_lock:
+            if edges is not None:
+                self.__hierarchy_edges[category] = edges
+                self.__hierarchy_index.pop((category, True), None)
+                self.__hierarchy_index.pop((category, False), None)
+            if attr_name:
+                setattr(self, attr_name, r_df)
+            if category == FactivaTaxonomyCategories.COMPANIES:
+                self.__company_resolver = None
+            self.__lookup_index.pop(category, None)
+            self.__search_index.pop(category, None)
+        return r_df.copy() if copy else r_df
 
 
     @log.factiva_logger
@@ -321,44 +547,406 @@ class FactivaTaxonomy():
             raise ValueError('Parameter code is not a string')
         code = code.upper()
 
-        if category == FactivaTaxonomyCategories.SUBJECTS:
-            if not isinstance(self.all_subjects, pd.DataFrame):
-                self.get_category_codes(category=category)
-            if code in self.all_subjects.index:
-                return self.all_subjects.loc[code].to_dict()
+        if category in self.__CATEGORY_ATTRIBUTES:
+            l_index = self._get_lookup_index(category)
+            if code in l_index.index:
+                return l_index.loc[code].to_dict()
 
-        elif category == FactivaTaxonomyCategories.REGIONS:
-            if not isinstance(self.all_regions, pd.DataFrame):
-                self.get_category_codes(category=category)
-            if code in self.all_regions.index:
-                return self.all_regions.loc[code].to_dict()
+        # When code is not found
+        return {'error': f"Code {code} not found in {category.value}",
+                'code': 'UNKNOWN',
+                'descriptor': f"ERR: Code {code} not found in {category.value}"}
 
-        elif category == FactivaTaxonomyCategories.INDUSTRIES:
-            if not isinstance(self.all_industries, pd.DataFrame):
-                self.get_category_codes(category=category)
-            if code in self.all_industries.index:
-                return self.all_industries.loc[code].to_dict()
 
-        elif category == FactivaTaxonomyCategories.COMPANIES:
-            # Requires handling duplicates as some companies have
-            # multiple entries because of ticker values
+    @log.factiva_logger
+    def get_category_hierarchy(self, category:FactivaTaxonomyCategories, include_indirect=True) -> HierarchyIndex:
+        """
+        Builds a hierarchy index for the specified category using all parent
+        relations published by the API, including alternative hierarchies.
+        Unlike ``get_category_codes``, which keeps the first direct parent
+        only, every ``direct_parents_N`` column is used, and optionally the
+        ``indirect_parents_N`` columns. Ancestor and descendant closures are
+        precomputed, so expanding a code to its descendants or checking if a
+        code is an ancestor of another do not traverse the hierarchy.
+
+        The index is built once per downloaded dataset and reused in later calls.
+
+        Parameters
+        ----------
+        category : FactivaTaxonomyCategories
+            Enumerator entry that specifies the taxonomy category. Only ``SUBJECTS``,
+            ``REGIONS`` and ``INDUSTRIES`` are supported.
+        include_indirect : bool, optional
+            If True (default), indirect parents are also used as parent links.
+
+        Returns
+        -------
+        HierarchyIndex:
+            Immutable index with upper-case codes
+
+        Raises
+        ------
+        ValueError: When the category is not supported or the hierarchy contains a cycle
+
+        Examples
+        --------
+        Expanding industry codes to all their descendants
+
+        .. code-block:: python
+
+            from factiva.analytics import FactivaTaxonomy, FactivaTaxonomyCategories
+            t = FactivaTaxonomy()
+            ind_hrchy = t.get_category_hierarchy(FactivaTaxonomyCategories.INDUSTRIES)
+            ind_codes = ind_hrchy.expand(['I16', 'IUTIL'])
+            ind_hrchy.is_ancestor('IUTIL', 'IDESAL')
+
+        """
+        if category not in [FactivaTaxonomyCategories.SUBJECTS, FactivaTaxonomyCategories.REGIONS,
+                            FactivaTaxonomyCategories.INDUSTRIES]:
+            raise ValueError(f"The category {category.name} is not currently supported for this operation")
+        self._wait_prefetch(category)
+        with self.__state_lock:
+            h_index = self.__hierarchy_index.get((category, include_indirect))
+            all_edges = self.__hierarchy_edges.get(category)
+        if h_index is not None:
+            return h_index
+        if all_edges is None:
+            self.get_category_codes(category=category)
+            with self.__state_lock:
+                all_edges = self.__hierarchy_edges[category]
+        edges = all_edges
+        if not include_indirect:
+            edges = edges[edges['relation'] != 'indirect']
+        h_index = HierarchyIndex.from_edges(edges['code'], edges['parent'])
+        with self.__state_lock:
+            # Not kept if the dataset was replaced while the index was built
+            if self.__hierarchy_edges.get(category) is all_edges:
+                h_index = self.__hierarchy_index.setdefault((category, include_indirect), h_index)
+        return h_index
+
+
+    @log.factiva_logger
+    def enrich(self, r_df, columns=None, output='list') -> pd.DataFrame:
+        """
+        Adds the descriptors of the codes listed in multivalue fields like
+        ``subject_codes`` or ``company_codes``. Codes are split, resolved and
+        aggregated back per row with vectorised operations, and each category
+        dataset is downloaded once per ``FactivaTaxonomy`` instance.
+
+        Parameters
+        ----------
+        r_df : pandas.DataFrame
+            Articles as returned by ``SnapshotFiles`` or stream listeners
+        columns : list or dict, optional
+            Code fields to enrich. A list must contain fields in
+            ``const.TAXONOMY_ENRICH_FIELDS``. A dict maps each field to a
+            ``FactivaTaxonomyCategories`` value. By default, all known code
+            fields present in ``r_df`` are enriched.
+        output : str {list, parallel}, optional
+            With ``list`` (default), a ``<field>_descriptors`` column is added
+            with the list of descriptors. With ``parallel``, a ``<field>_list``
+            column with the list of codes is added too, where each position
+            matches the descriptors list. Unknown codes have ``None`` as descriptor.
+
+        Returns
+        -------
+        pandas.DataFrame:
+            Copy of ``r_df`` with the new columns
+
+        Raises
+        ------
+        ValueError: When a field or the output value is not supported
+
+        Examples
+        --------
+        Adding subject and region descriptors to extraction files
+
+        .. code-block:: python
+
+            from factiva.analytics import FactivaTaxonomy
+            from factiva.analytics.integration import SnapshotFiles
+            t = FactivaTaxonomy()
+            articles = SnapshotFiles().read_avro_folder('/home/user/abcd1234xy')
+            articles = t.enrich(articles, columns=['subject_codes', 'region_codes'])
+
+        """
+        tools.validate_field_options(output, const.TAXONOMY_ENRICH_OUTPUTS)
+        columns = self._enrich_columns(r_df, columns)
+        r_df = r_df.copy()
+        for column, category in columns.items():
+            sep = ' ' if column in const.MULTIVALUE_FIELDS_SPACE else ','
+            descriptors = self._get_lookup_index(category)['descriptor']
+            codes = tools.explode_multivalue(r_df[column].reset_index(drop=True), sep=sep).str.upper()
+            found = codes.map(descriptors)
+            found = found.astype(object).where(found.notna(), None)
+            if output == 'parallel':
+                r_df[f"{column}_list"] = _aggregate_lists(codes, len(r_df))
+            r_df[f"{column}_descriptors"] = _aggregate_lists(found, len(r_df))
+        return r_df
+
+
+    def iter_enrich(self, chunks, columns=None, output='list'):
+        """
+        Enriches DataFrame chunks one at a time, for datasets that don't fit
+        in memory. See ``enrich`` for details.
+
+        Parameters
+        ----------
+        chunks : iterable
+            DataFrames, e.g. as yielded by ``SnapshotFiles.iter_folder``
+        columns : list or dict, optional
+            Code fields to enrich
+        output : str {list, parallel}, optional
+            Output columns layout
+
+        Yields
+        ------
+        pandas.DataFrame:
+            Enriched chunk
+        """
+        for r_df in chunks:
+            yield self.enrich(r_df, columns=columns, output=output)
+
+
+    def _enrich_columns(self, r_df, columns) -> dict:
+        if columns is None:
+            columns = [col for col in const.TAXONOMY_ENRICH_FIELDS if col in r_df.columns]
+        if not isinstance(columns, dict):
+            unknown = [col for col in columns if col not in const.TAXONOMY_ENRICH_FIELDS]
+            if unknown:
+                raise ValueError(f"No taxonomy category known for fields {unknown}. Use a dict to set it.")
+            columns = {col: const.TAXONOMY_ENRICH_FIELDS[col] for col in columns}
+        ret_val = {}
+        for column, category in columns.items():
+            if column not in r_df.columns:
+                raise ValueError(f"Field {column} not found in the DataFrame")
+            category = FactivaTaxonomyCategories(category)
+            if category not in self.__CATEGORY_ATTRIBUTES:
+                raise ValueError(f"The category {category.name} is not currently supported for this operation")
+            ret_val[column] = category
+        return ret_val
+
+
+    def get_search_index(self, category:FactivaTaxonomyCategories) -> TaxonomySearchIndex:
+        """
+        Returns the search index for the specified category. The index is
+        built once per downloaded dataset, and reused in later calls.
+
+        Parameters
+        ----------
+        category : FactivaTaxonomyCategories
+            Enumerator entry that specifies the taxonomy category. Only ``SUBJECTS``,
+            ``REGIONS``, ``INDUSTRIES`` and ``COMPANIES`` are supported.
+
+        Returns
+        -------
+        TaxonomySearchIndex:
+            Search index over the category descriptors
+
+        Raises
+        ------
+        ValueError: When the category is not supported
+        """
+        if category not in self.__CATEGORY_ATTRIBUTES:
+            raise ValueError(f"The category {category.name} is not currently supported for this operation")
+        self._wait_prefetch(category)
+        with self.__state_lock:
+            s_index = self.__search_index.get(category)
+        if s_index is None:
+            l_index = self._get_lookup_index(category)
+            s_index = TaxonomySearchIndex(l_index['code'], l_index['descriptor'])
+            with self.__state_lock:
+                if self.__lookup_index.get(category) is l_index:
+                    s_index = self.__search_index.setdefault(category, s_index)
+        return s_index
+
+
+    def search(self, text:str, category:FactivaTaxonomyCategories, limit=10) -> list:
+        """
+        Finds codes by descriptor prefix, word prefix or substring, or by
+        exact code. Intended for type-ahead searches, where the first call
+        builds an in-memory index and later calls take well under a
+        millisecond.
+
+        Parameters
+        ----------
+        text : str
+            Text to search. Case and extra spaces are ignored.
+        category : FactivaTaxonomyCategories
+            Enumerator entry that specifies the taxonomy category
+        limit : int, optional
+            Max number of results. Default 10.
+
+        Returns
+        -------
+        list:
+            List of dicts with the keys ``code`` and ``descriptor``, best matches first
+
+        Examples
+        --------
+        Searching subjects while the user types
+
+        .. code-block:: python
+
+            from factiva.analytics import FactivaTaxonomy, FactivaTaxonomyCategories
+            t = FactivaTaxonomy()
+            t.search('divers', FactivaTaxonomyCategories.SUBJECTS, limit=3)
+
+        .. code-block:: python
+
+            [{'code': 'CWKDIV', 'descriptor': 'Workplace Diversity'}, ...]
+
+        """
+        return self.get_search_index(category).search(text, limit=limit)
+
+
+    @log.factiva_logger
+    def get_company_resolver(self, path=None) -> CompanyNameResolver:
+        """
+        Returns a resolver that maps free-text company names to Factiva
+        company codes. The resolver index is built once per downloaded
+        companies dataset and reused in later calls.
+
+        When the instance uses a taxonomy cache, the index is also stored
+        next to the cached companies dataset, and loaded from there by other
+        processes while the dataset version doesn't change.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path to a ``.npz`` file. If it exists, the resolver is loaded from
+            it, otherwise the built resolver is saved to it.
+
+        Returns
+        -------
+        CompanyNameResolver:
+            Resolver over the companies taxonomy
+
+        Examples
+        --------
+        Mapping names from an upstream system to codes
+
+        .. code-block:: python
+
+            from factiva.analytics import FactivaTaxonomy
+            t = FactivaTaxonomy(use_cache=True)
+            resolver = t.get_company_resolver()
+            matches = resolver.resolve(names_list, top_k=3, min_score=0.6)
+
+        """
+        self._wait_prefetch(FactivaTaxonomyCategories.COMPANIES)
+        with self.__state_lock:
+            if self.__company_resolver is not None:
+                return self.__company_resolver
+        version = None
+        if (path is None) and self.taxonomy_cache:
+            category = FactivaTaxonomyCategories.COMPANIES
             if not isinstance(self.all_companies, pd.DataFrame):
                 self.get_category_codes(category=category)
-            if code in self.all_companies.index:
-                f_df = self.all_companies[self.all_companies.code == code]
-                if f_df.shape[0] == 1:
-                    return self.all_companies.loc[code].to_dict()
-                else:
-                    f_df = f_df[f_df.exchange == f_df.primary_exchange]
-                    if f_df.shape[0] == 1:
-                        return f_df.loc[code].to_dict()
-                    else:
-                        return f_df.iloc[0].to_dict()
+            path = self.taxonomy_cache.get_artifact_path(category.value, self.user_key, 'resolver')
+            version = self.taxonomy_cache.get_metadata(category.value, self.user_key)['version']
+        if path and os.path.exists(path):
+            with np.load(path, allow_pickle=False) as npz_file:
+                saved_version = str(npz_file['source_version']) if 'source_version' in npz_file else None
+            if (version is None) or (saved_version == version):
+                self.__log.info(f"Loading company resolver from {path}")
+                return self._set_company_resolver(CompanyNameResolver.load(path))
+        l_index = self._get_lookup_index(FactivaTaxonomyCategories.COMPANIES)
+        resolver = CompanyNameResolver.from_names(l_index['code'], l_index['descriptor'])
+        if path:
+            tools.create_path_if_not_exist(os.path.dirname(os.path.abspath(path)))
+            resolver.save(path, source_version=np.array(version or ''))
+        return self._set_company_resolver(resolver)
+
+
+    def _set_company_resolver(self, resolver) -> CompanyNameResolver:
+        # Keeps the first resolver stored by concurrent callers
+        with self.__state_lock:
+            if self.__company_resolver is None:
+                self.__company_resolver = resolver
+            return self.__company_resolver
+
+
+    def _get_lookup_index(self, category) -> pd.DataFrame:
+        # Category dataset with exactly one row per code, built once per download.
+        # Some companies have multiple entries because of ticker values, and
+        # the row listed in the primary exchange is preferred.
+        self._wait_prefetch(category)
+        attr_name = self.__CATEGORY_ATTRIBUTES[category]
+        with self.__state_lock:
+            l_index = self.__lookup_index.get(category)
+            all_df = getattr(self, attr_name)
+        if l_index is not None:
+            return l_index
+        if not isinstance(all_df, pd.DataFrame):
+            all_df = self.get_category_codes(category=category)
+        r_df = all_df
+        if (category == FactivaTaxonomyCategories.COMPANIES) and {'exchange', 'primary_exchange'}.issubset(r_df.columns):
+            is_primary = (r_df['exchange'] == r_df['primary_exchange']).to_numpy()
+            r_df = pd.concat([r_df[is_primary], r_df[~is_primary]])
+        l_index = r_df[~r_df.index.duplicated(keep='first')]
+        with self.__state_lock:
+            # Not kept if the dataset was replaced while the index was built
+            if getattr(self, attr_name) is all_df:
+                l_index = self.__lookup_index.setdefault(category, l_index)
+        return l_index
 
-        # When code is not found
-        return {'error': f"Code {code} not found in {category.value}",
-                'code': 'UNKNOWN',
-                'descriptor': f"ERR: Code {code} not found in {category.value}"}
+
+    @log.factiva_logger
+    def lookup_codes(self, codes, category:FactivaTaxonomyCategories) -> pd.DataFrame:
+        """
+        Finds the descriptor and other details for multiple codes in a single
+        operation. Equivalent to calling ``lookup_code`` for each code, but
+        resolved with a single index join.
+
+        Parameters
+        ----------
+        codes : list or pandas.Series
+            Factiva codes for lookup. Duplicates are allowed.
+        category : FactivaTaxonomyCategories
+            Enumerator entry that specifies the taxonomy category for which the
+            codes will be retrieved.
+
+        Returns
+        -------
+        pandas.DataFrame:
+            DataFrame with one row per requested code, in the same order. Codes
+            not found in the category have empty values in all columns except
+            ``code``.
+
+        Raises
+        ------
+        ValueError: When the category is not supported or codes contain non-string values
+
+        Examples
+        --------
+        Lookup several codes in the 'regions' category
+
+        .. code-block:: python
+
+            from factiva.analytics import FactivaTaxonomy, FactivaTaxonomyCategories
+            f = FactivaTaxonomy()
+            f.lookup_codes(['usa', 'FRA', 'XXXX'], category=FactivaTaxonomyCategories.REGIONS)
+
+        .. code-block::
+
+                  code     descriptor  ...
+            code
+            USA    USA  United States  ...
+            FRA    FRA         France  ...
+            XXXX  XXXX            NaN  ...
+
+        """
+        if category not in self.__CATEGORY_ATTRIBUTES:
+            raise ValueError(f"The category {category.name} is not currently supported for this operation")
+        codes = pd.Series(codes, dtype=object)
+        if not codes.map(lambda c: isinstance(c, str)).all():
+            raise ValueError('Parameter codes contains values that are not strings')
+        codes = codes.str.upper()
+        l_index = self._get_lookup_index(category)
+        r_df = l_index.reindex(codes.to_numpy())
+        r_df['code'] = r_df.index
+        return r_df
 
 
     def __repr__(self):
@@ -368,9 +956,8 @@ class FactivaTaxonomy():
 
     def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
         # TODO: Improve the output for enabled_company_identifiers
-        pprop = self.__dict__.copy()
+        pprop = {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
         del pprop['user_key']
-        del pprop['log']
         del pprop['all_companies']
         
         ret_val = f"{root_prefix}<factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
@@ -383,3 +970,38 @@ class FactivaTaxonomy():
             ret_val += f"\n{prefix[0:-2]}└─..."
         return ret_val
 
+
+
+def _category_usecols(category, columns):
+    # Column filter for the raw dataset, from the column names used after renaming
+    if category == FactivaTaxonomyCategories.COMPANIES:
+        renames = {'description': 'descriptor'}
+    else:
+        renames = dict(const.TAXONOMY_H_FIELDS_RENAME_DICT)
+    wanted = {'code'} | {col.lower() for col in columns}
+    wanted |= {raw.lower() for raw, new in renames.items() if new.lower() in wanted}
+
+    def usecols(col):
+        return col.lower() in wanted
+    return usecols
+
+
+def _parent_edges(r_df) -> pd.DataFrame:
+    # One row per code and parent, with the relation type (direct or indirect).
+    # Codes without parents are kept with an empty parent, as hierarchy roots.
+    parent_cols = [col for col in r_df.columns if col.startswith(('direct_parents_', 'indirect_parents_'))]
+    edges = r_df[['code'] + parent_cols].reset_index(drop=True).melt(
+        id_vars='code', var_name='relation', value_name='parent').dropna(subset=['parent'])
+    edges['parent'] = edges['parent'].astype(str).str.strip().str.upper()
+    edges['relation'] = edges['relation'].str.split('_').str[0]
+    edges = edges[edges['parent'] != '']
+    roots = r_df.loc[~r_df['code'].isin(edges['code']), ['code']].reset_index(drop=True)
+    roots['relation'] = 'direct'
+    roots['parent'] = ''
+    return pd.concat([edges[['code', 'relation', 'parent']], roots], ignore_index=True)
+
+
+def _aggregate_lists(values, n_rows) -> list:
+    # Groups exploded values back into one list per original row position
+    lists = values.groupby(level=0, sort=False).agg(list).reindex(range(n_rows))
+    return [v if isinstance(v, list) else [] for v in lists.tolist()]
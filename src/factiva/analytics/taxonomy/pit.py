@@ -0,0 +1,253 @@
+"""
+  Local index for point-in-time company identifier lookups
+"""
+import numpy as np
+import pandas as pd
+from ..common import const
+
+_DAY_OFFSET = 2 ** 31  # Days since epoch are shifted to be non-negative in the composite keys
+
+
+class PointInTimeIndex(object):
+    """
+    Index over a point-in-time (PIT) identifier file, as downloaded with
+    ``FactivaCompany.point_in_time_download_all``. It answers which Factiva
+    code an identifier value (e.g. an ISIN) was mapped to on a given date.
+
+    Intervals are stored sorted by identifier value and start date, as
+    integer arrays. Each interval gets a composite 64-bit key made of the
+    value id and the start day, so a whole batch of (value, date) pairs is
+    resolved with one hash lookup and one ``searchsorted`` call.
+
+    Dates have day precision and both interval ends are inclusive. Intervals
+    without an end date are open. When several intervals of the same value
+    contain a date, the one starting last is used. Overlapping intervals are
+    split into disjoint segments when the index is built, so each lookup
+    only checks one segment.
+
+    Instances are usually created with ``from_file``, ``from_dataframe`` or ``load``.
+
+    """
+
+    _ARRAYS = ['values', 'codes', 'interval_keys', 'interval_ends', 'interval_codes']
+
+    def __init__(self, **arrays):
+        for name in self._ARRAYS:
+            value = np.asarray(arrays[name])
+            value.flags.writeable = False
+            setattr(self, name, value)
+        self._value_index = pd.Index(self.values)
+
+
+    @classmethod
+    def from_dataframe(cls, r_df, value_field=None, code_field=None, start_field=None, end_field=None):
+        """Builds an index from a DataFrame with one row per interval
+        Parameters
+        ----------
+        r_df : pandas.DataFrame
+            PIT data
+        value_field, code_field, start_field, end_field : str, optional
+            Columns with the identifier value, the Factiva code, and the
+            interval start and end dates. When not provided, they are detected
+            using the candidate names in ``const.PIT_FIELD_CANDIDATES``.
+        Returns
+        -------
+        PointInTimeIndex
+            New index instance
+        Raises
+        ------
+        ValueError
+            When a column cannot be detected
+        """
+        fields = _detect_fields(r_df.columns, value_field=value_field, code_field=code_field,
+                                start_field=start_field, end_field=end_field)
+        values = r_df[fields['value']].astype(str).str.strip().str.upper().to_numpy()
+        codes = r_df[fields['code']].astype(str).str.strip().str.upper().to_numpy()
+        starts = _to_days(r_df[fields['start']]).fillna(-_DAY_OFFSET).to_numpy(np.int64)
+        ends = _to_days(r_df[fields['end']]).fillna(_DAY_OFFSET - 1).to_numpy(np.int64)
+        unique_values, value_ids = np.unique(values, return_inverse=True)
+        keys = (value_ids.astype(np.int64) << 32) | (starts + _DAY_OFFSET)
+        order = np.argsort(keys, kind='stable')
+        value_ids, starts, ends, i_codes = _disjoint_segments(value_ids[order].astype(np.int64), starts[order],
+                                                              ends[order], codes[order])
+        keys = (value_ids << 32) | (starts + _DAY_OFFSET)
+        return cls(values=unique_values.astype(str), codes=np.unique(codes).astype(str),
+                   interval_keys=keys, interval_ends=ends, interval_codes=i_codes.astype(str))
+
+
+    @classmethod
+    def from_file(cls, path, value_field=None, code_field=None, start_field=None, end_field=None):
+        """Builds an index from a downloaded PIT CSV file
+        Only the required columns are loaded.
+        Parameters
+        ----------
+        path : str
+            Path to the CSV file
+        value_field, code_field, start_field, end_field : str, optional
+            Column names. See ``from_dataframe``.
+        Returns
+        -------
+        PointInTimeIndex
+            New index instance
+        """
+        header = pd.read_csv(path, nrows=0).columns
+        fields = _detect_fields(header, value_field=value_field, code_field=code_field,
+                                start_field=start_field, end_field=end_field)
+        r_df = pd.read_csv(path, usecols=list(fields.values()), dtype=str)
+        return cls.from_dataframe(r_df, value_field=fields['value'], code_field=fields['code'],
+                                  start_field=fields['start'], end_field=fields['end'])
+
+
+    @classmethod
+    def load(cls, path):
+        """Loads an index saved with ``save``
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file
+        Returns
+        -------
+        PointInTimeIndex
+            Loaded index instance
+        """
+        with np.load(path, allow_pickle=False) as npz_file:
+            return cls(**{name: npz_file[name] for name in cls._ARRAYS})
+
+
+    def save(self, path):
+        """Saves the index arrays to a ``.npz`` file
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file
+        """
+        np.savez_compressed(path, **{name: getattr(self, name) for name in self._ARRAYS})
+
+
+    def __len__(self):
+        return len(self.interval_keys)
+
+
+    def __contains__(self, value):
+        return str(value).strip().upper() in self._value_index
+
+
+    def lookup(self, values, dates) -> pd.Series:
+        """Resolves identifier values to Factiva codes on the given dates
+        Parameters
+        ----------
+        values : array-like
+            Identifier values, e.g. ISINs. Case is ignored.
+        dates : array-like or str
+            Date for each value, or a single date for all of them. Any value
+            accepted by ``pandas.to_datetime``.
+        Returns
+        -------
+        pandas.Series
+            Factiva code for each pair, in the same order. Pairs not covered by
+            any interval are NaN.
+        """
+        values = pd.Series(values, dtype=object).astype(str).str.strip().str.upper()
+        if not pd.api.types.is_list_like(dates):
+            dates = pd.Series([dates] * len(values))
+        days = _to_days(pd.Series(dates).reset_index(drop=True))
+        value_ids = self._value_index.get_indexer(values.to_numpy())
+        valid = (value_ids >= 0) & days.notna().to_numpy()
+        days = days.fillna(0).to_numpy(np.int64)
+
+        query_keys = (value_ids.astype(np.int64) << 32) | (days + _DAY_OFFSET)
+        pos = np.searchsorted(self.interval_keys, query_keys, side='right') - 1
+        valid &= pos >= 0
+        pos = np.where(valid, pos, 0)
+        valid &= (self.interval_keys[pos] >> 32) == value_ids
+        valid &= self.interval_ends[pos] >= days
+        ret_val = np.full(len(values), np.nan, dtype=object)
+        ret_val[valid] = self.interval_codes[pos[valid]]
+        return pd.Series(ret_val, index=values.index, name='fcode')
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}values: {len(self.values):,d}\n"
+        ret_val += f"{prefix}codes: {len(self.codes):,d}\n"
+        ret_val += f"{prefix[0:-2]}└─intervals: {len(self.interval_keys):,d}"
+        return ret_val
+
+
+
+def _disjoint_segments(value_ids, starts, ends, codes):
+    # Intervals must be sorted by value and start. Values with overlapping
+    # intervals are rebuilt with a sweep, where the latest started interval
+    # still open covers each day. Other values are kept as they are.
+    prev_max_ends = pd.Series(ends).groupby(value_ids).cummax().groupby(value_ids).shift(1)
+    overlaps = (starts <= prev_max_ends.fillna(-_DAY_OFFSET - 1).to_numpy(np.int64))
+    if not overlaps.any():
+        return value_ids, starts, ends, codes
+    overlap_values = np.unique(value_ids[overlaps])
+    keep = ~np.isin(value_ids, overlap_values)
+    segments = []
+    lower = np.searchsorted(value_ids, overlap_values, side='left')
+    upper = np.searchsorted(value_ids, overlap_values, side='right')
+    for value_id, low, up in zip(overlap_values.tolist(), lower.tolist(), upper.tolist()):
+        segments += [(value_id, s_start, s_end, s_code)
+                     for s_start, s_end, s_code in _sweep_intervals(starts[low:up].tolist(), ends[low:up].tolist(),
+                                                                    codes[low:up].tolist())]
+    s_values, s_starts, s_ends, s_codes = zip(*segments)
+    value_ids = np.concatenate([value_ids[keep], np.array(s_values, dtype=np.int64)])
+    starts = np.concatenate([starts[keep], np.array(s_starts, dtype=np.int64)])
+    ends = np.concatenate([ends[keep], np.array(s_ends, dtype=np.int64)])
+    codes = np.concatenate([codes[keep], np.array(s_codes, dtype=codes.dtype)])
+    order = np.lexsort((starts, value_ids))
+    return value_ids[order], starts[order], ends[order], codes[order]
+
+
+def _sweep_intervals(starts, ends, codes) -> list:
+    # Splits intervals sorted by start into disjoint (start, end, code) segments
+    segments = []
+    stack = []
+    day = None
+
+    def emit_until(until):
+        nonlocal day
+        while stack and (day < until):
+            top_end, top_code = stack[-1]
+            if top_end < day:
+                stack.pop()
+                continue
+            seg_end = min(top_end, until - 1)
+            segments.append((day, seg_end, top_code))
+            day = seg_end + 1
+            if seg_end == top_end:
+                stack.pop()
+
+    for start, end, code in zip(starts, ends, codes):
+        if day is not None:
+            emit_until(start)
+        day = start
+        stack.append((end, code))
+    emit_until(max(ends) + 1)
+    return segments
+
+
+def _to_days(series) -> pd.Series:
+    # Days since epoch, as nullable integers
+    dates = pd.to_datetime(series, errors='coerce', utc=True, format='mixed')
+    days = (dates.dt.tz_localize(None).dt.floor('D') - pd.Timestamp('1970-01-01')).dt.days
+    return days.astype('Int64')
+
+
+def _detect_fields(columns, **fields) -> dict:
+    lower_columns = {str(col).lower(): col for col in columns}
+    ret_val = {}
+    for name, candidates in const.PIT_FIELD_CANDIDATES.items():
+        field = fields.get(f"{name}_field")
+        if field is None:
+            field = next((lower_columns[c] for c in candidates if c in lower_columns), None)
+        if (field is None) or (field not in columns):
+            raise ValueError(f"The {name} column could not be found. Use the {name}_field parameter to set it.")
+        ret_val[name] = field
+    return ret_val
@@ -0,0 +1,261 @@
+"""
+  Fuzzy resolution of company names to Factiva codes
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .search import trigram_pairs
+from ..common import const, tools
+
+
+class CompanyNameResolver(object):
+    """
+    Resolves free-text company names to Factiva company codes, using cosine
+    similarity between character trigram TF-IDF vectors. The index is built
+    once as an inverted index in CSR layout (one posting list of documents
+    and weights per trigram), so scoring a name only touches the companies
+    sharing at least one trigram with it.
+
+    Names are lower-cased, punctuation is removed and common legal suffixes
+    (``const.COMPANY_RESOLVER_STOPWORDS``) are ignored before calculating
+    trigrams.
+
+    Instances are usually obtained with ``FactivaTaxonomy.get_company_resolver``,
+    or created with ``from_names`` or ``load``.
+
+    Examples
+    --------
+    Resolving a batch of names
+
+    .. code-block:: python
+
+        from factiva.analytics import FactivaTaxonomy
+        t = FactivaTaxonomy()
+        resolver = t.get_company_resolver()
+        matches = resolver.resolve(['Microsoft Corporation', 'Intl Business Machines'], top_k=3)
+
+    .. code-block::
+
+              query_index                   name  rank    code                   descriptor     score
+            0           0  Microsoft Corporation     1  MCROST               Microsoft Corp  1.000000
+            ...
+
+    """
+
+    _ARRAYS = ['codes', 'descriptors', 'term_keys', 'term_idf', 'posting_indptr', 'posting_docs', 'posting_weights']
+
+    def __init__(self, **arrays):
+        for name in self._ARRAYS:
+            value = np.asarray(arrays[name])
+            value.flags.writeable = False
+            setattr(self, name, value)
+
+
+    @classmethod
+    def from_names(cls, codes, descriptors):
+        """Builds a resolver from company codes and names
+        Parameters
+        ----------
+        codes : array-like
+            Factiva company codes
+        descriptors : array-like
+            Company name for each code
+        Returns
+        -------
+        CompanyNameResolver
+            New resolver instance
+        """
+        codes = pd.Series(codes, dtype=object).astype(str).to_numpy()
+        descriptors = pd.Series(descriptors, dtype=object).fillna('').astype(str)
+        keys, docs = trigram_pairs(normalize_company_names(descriptors).tolist())
+
+        # Term frequency per document and trigram
+        pairs = pd.DataFrame({'key': keys, 'doc': docs}).value_counts(sort=False).reset_index(name='tf')
+        term_keys, term_ids = np.unique(pairs['key'].to_numpy(), return_inverse=True)
+        doc_freq = np.bincount(term_ids, minlength=len(term_keys))
+        term_idf = np.log((len(codes) + 1) / (doc_freq + 1)) + 1.0
+        weights = pairs['tf'].to_numpy(np.float64) * term_idf[term_ids]
+        doc_ids = pairs['doc'].to_numpy(np.int64)
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights ** 2, minlength=len(codes)))
+        weights = weights / norms[doc_ids]
+
+        order = np.lexsort((doc_ids, term_ids))
+        posting_indptr = np.concatenate([[0], np.cumsum(doc_freq)]).astype(np.int64)
+        return cls(codes=codes.astype(str), descriptors=descriptors.to_numpy().astype(str),
+                   term_keys=term_keys.astype(np.int64), term_idf=term_idf.astype(np.float32),
+                   posting_indptr=posting_indptr, posting_docs=doc_ids[order].astype(np.int32),
+                   posting_weights=weights[order].astype(np.float32))
+
+
+    @classmethod
+    def load(cls, path):
+        """Loads a resolver saved with ``save``
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file
+        Returns
+        -------
+        CompanyNameResolver
+            Loaded resolver instance
+        """
+        with np.load(path, allow_pickle=False) as npz_file:
+            return cls(**{name: npz_file[name] for name in cls._ARRAYS})
+
+
+    def save(self, path, **extra_arrays):
+        """Saves the resolver arrays to a ``.npz`` file
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file
+        extra_arrays : numpy.ndarray, optional
+            Additional arrays stored in the same file, e.g. a source version
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **{name: getattr(self, name) for name in self._ARRAYS}, **extra_arrays)
+        os.replace(tmp_path, path)
+
+
+    def __len__(self):
+        return len(self.codes)
+
+
+    def _query_vector(self, name):
+        keys, _ = trigram_pairs([name])
+        keys, counts = np.unique(keys, return_counts=True)
+        pos = np.searchsorted(self.term_keys, keys)
+        pos[pos == len(self.term_keys)] = 0
+        known = self.term_keys[pos] == keys
+        # Unknown trigrams have the max idf, and count in the query norm
+        idf = np.where(known, self.term_idf[pos], np.log(len(self.codes) + 1) + 1.0)
+        weights = counts * idf
+        weights = weights / np.sqrt((weights ** 2).sum())
+        return pos[known], weights[known]
+
+
+    def _top_matches(self, name, top_k, min_score):
+        if not name:
+            return [], []
+        term_pos, q_weights = self._query_vector(name)
+        if len(term_pos) == 0:
+            return [], []
+        starts = self.posting_indptr[term_pos]
+        ends = self.posting_indptr[term_pos + 1]
+        doc_ids = np.concatenate([self.posting_docs[s:e] for s, e in zip(starts, ends)])
+        weights = np.concatenate([self.posting_weights[s:e] * w for s, e, w in zip(starts, ends, q_weights)])
+        docs, inverse = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        best = best[scores[best] >= min_score]
+        return docs[best].tolist(), np.minimum(scores[best], 1.0).tolist()
+
+
+    def _resolve_chunk(self, names, offset, top_k, min_score) -> pd.DataFrame:
+        rows = {'query_index': [], 'rank': [], 'doc': [], 'score': []}
+        for i, name in enumerate(normalize_company_names(pd.Series(names, dtype=object)).tolist()):
+            docs, scores = self._top_matches(name, top_k, min_score)
+            rows['query_index'] += [offset + i] * len(docs)
+            rows['rank'] += list(range(1, len(docs) + 1))
+            rows['doc'] += docs
+            rows['score'] += scores
+        return pd.DataFrame(rows)
+
+
+    def resolve(self, names, top_k=5, min_score=0.0, max_workers=None,
+                chunksize=const.COMPANY_RESOLVER_CHUNKSIZE) -> pd.DataFrame:
+        """Finds the best matching companies for a batch of names
+        Parameters
+        ----------
+        names : list or pandas.Series
+            Company names to resolve
+        top_k : int, optional
+            Max number of candidates per name. Default 5.
+        min_score : float, optional
+            Min cosine similarity between 0 and 1 for a candidate to be returned.
+        max_workers : int, optional
+            Number of processes used to score the names. Default is the number
+            of CPUs. Batches smaller than ``chunksize`` are resolved in the
+            current process.
+        chunksize : int, optional
+            Number of names sent to each process at once.
+        Returns
+        -------
+        pandas.DataFrame
+            One row per candidate, with the columns ``query_index`` (position in
+            ``names``), ``name``, ``rank``, ``code``, ``descriptor`` and ``score``.
+            Names without candidates are not included.
+        """
+        tools.validate_type(top_k, int, 'Unexpected value for top_k')
+        if top_k < 1:
+            raise ValueError('The top_k value must be greater than zero')
+        names = pd.Series(names, dtype=object).fillna('').astype(str).reset_index(drop=True)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        offsets = range(0, len(names), chunksize)
+        if (max_workers <= 1) or (len(offsets) <= 1):
+            chunks = [self._resolve_chunk(names[o:o + chunksize].tolist(), o, top_k, min_score) for o in offsets]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+                chunks = list(executor.map(_resolve_in_worker,
+                                           [(names[o:o + chunksize].tolist(), o, top_k, min_score) for o in offsets]))
+        r_df = pd.concat(chunks, ignore_index=True) if chunks else self._resolve_chunk([], 0, top_k, min_score)
+        doc_ids = r_df['doc'].to_numpy(np.int64)
+        return pd.DataFrame({
+            'query_index': r_df['query_index'].to_numpy(np.int64),
+            'name': names.to_numpy()[r_df['query_index'].to_numpy(np.int64)],
+            'rank': r_df['rank'].to_numpy(np.int64),
+            'code': self.codes[doc_ids],
+            'descriptor': self.descriptors[doc_ids],
+            'score': r_df['score'].to_numpy(np.float64)
+        })
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}companies: {len(self.codes):,d}\n"
+        ret_val += f"{prefix[0:-2]}└─trigrams: {len(self.term_keys):,d}"
+        return ret_val
+
+
+
+def normalize_company_names(names) -> pd.Series:
+    """Prepares company names for trigram matching
+    Names are lower-cased, non-alphanumeric characters and legal suffixes
+    are removed, and the result is padded with spaces to emphasise word
+    boundaries.
+    Parameters
+    ----------
+    names : pandas.Series
+        Company names
+    Returns
+    -------
+    pandas.Series
+        Normalised names
+    """
+    names = names.astype(str).str.lower().str.replace(r'[^\w]+', ' ', regex=True)
+    stopwords = '|'.join(const.COMPANY_RESOLVER_STOPWORDS)
+    names = names.str.replace(rf"\b(?:{stopwords})\b", ' ', regex=True)
+    names = names.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return names.where(names == '', ' ' + names + ' ')
+
+
+_worker_resolver = None
+
+
+def _init_worker(resolver):
+    global _worker_resolver
+    _worker_resolver = resolver
+
+
+def _resolve_in_worker(args):
+    return _worker_resolver._resolve_chunk(*args)
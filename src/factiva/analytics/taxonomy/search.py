@@ -0,0 +1,179 @@
+"""
+  In-memory search index over taxonomy descriptors
+"""
+import bisect
+import numpy as np
+import pandas as pd
+from ..common import const, tools
+
+
+class TaxonomySearchIndex(object):
+    """
+    Search index over the descriptors of a taxonomy category, intended for
+    type-ahead lookups. Built once, it combines two structures:
+
+    * A sorted array of normalised descriptors, where prefix matches are
+      found with a binary search in O(log n).
+    * A character trigram inverted index in CSR layout, where substring
+      matches are found intersecting the posting lists of the query trigrams.
+
+    Results are ranked by match type (exact code, descriptor prefix, word
+    prefix and substring). Prefix matches are sorted alphabetically, and
+    other matches by descriptor length.
+
+    Parameters
+    ----------
+    codes : array-like
+        Factiva codes. Must be unique.
+    descriptors : array-like
+        Descriptor for each code
+
+    Examples
+    --------
+    Usually created through ``FactivaTaxonomy.search``
+
+    .. code-block:: python
+
+        from factiva.analytics import FactivaTaxonomy, FactivaTaxonomyCategories
+        t = FactivaTaxonomy()
+        t.search('micro', FactivaTaxonomyCategories.COMPANIES, limit=5)
+
+    """
+
+    def __init__(self, codes, descriptors):
+        n_df = pd.DataFrame({'code': pd.Series(codes, dtype=object).to_numpy(),
+                             'descriptor': pd.Series(descriptors, dtype=object).fillna('').astype(str).to_numpy()})
+        n_df['norm'] = normalize_text(n_df['descriptor'])
+        # Ids are assigned by descriptor length, so posting lists are already in rank order
+        n_df['length'] = n_df['norm'].str.len()
+        n_df = n_df.sort_values(['length', 'norm'], kind='stable', ignore_index=True)
+        self.codes = n_df['code'].tolist()
+        self.descriptors = n_df['descriptor'].tolist()
+        self.norms = n_df['norm'].tolist()
+        self._code_index = {str(code).upper(): i for i, code in enumerate(self.codes)}
+
+        prefix_order = sorted(range(len(self.norms)), key=self.norms.__getitem__)
+        self._prefix_keys = [self.norms[i] for i in prefix_order]
+        self._prefix_ids = prefix_order
+
+        keys, ids = trigram_pairs(self.norms)
+        order = np.lexsort((ids, keys))
+        keys, ids = keys[order], ids[order]
+        self._trigram_keys, starts = np.unique(keys, return_index=True)
+        self._trigram_indptr = np.append(starts, len(keys)).astype(np.int64)
+        self._trigram_ids = ids.astype(np.int32)
+
+
+    def __len__(self):
+        return len(self.codes)
+
+
+    def _postings(self, key) -> np.ndarray:
+        pos = np.searchsorted(self._trigram_keys, key)
+        if pos == len(self._trigram_keys) or self._trigram_keys[pos] != key:
+            return np.empty(0, dtype=np.int32)
+        return self._trigram_ids[self._trigram_indptr[pos]:self._trigram_indptr[pos + 1]]
+
+
+    def _prefix_ids_for(self, text, limit) -> list:
+        start = bisect.bisect_left(self._prefix_keys, text)
+        end = bisect.bisect_right(self._prefix_keys, text + '\U0010ffff', lo=start)
+        return self._prefix_ids[start:min(end, start + limit)]
+
+
+    def _substring_ids_for(self, text) -> np.ndarray:
+        keys, _ = trigram_pairs([text])
+        if len(keys) == 0:
+            return np.empty(0, dtype=np.int32)
+        candidates = None
+        # Rarest trigrams first, to keep intersections small
+        for key in sorted(set(keys.tolist()), key=lambda k: len(self._postings(k))):
+            postings = self._postings(key)
+            candidates = postings if candidates is None else np.intersect1d(candidates, postings, assume_unique=True)
+            if len(candidates) == 0:
+                break
+        return candidates
+
+
+    def search(self, text, limit=10) -> list:
+        """Finds codes whose descriptor or code matches the text
+        Parameters
+        ----------
+        text : str
+            Text typed by the user. Case and extra spaces are ignored.
+        limit : int, optional
+            Max number of results. Default 10.
+        Returns
+        -------
+        list
+            List of dicts with the keys ``code`` and ``descriptor``, best matches first
+        """
+        tools.validate_type(text, str, 'Unexpected value for text')
+        norm = ' '.join(text.lower().split())
+        if (not norm) or (limit < 1):
+            return []
+        found = []
+        code = text.strip().upper()
+        if code in self._code_index:
+            found.append(self._code_index[code])
+        found += self._prefix_ids_for(norm, limit)
+        needed = limit - len(found)
+        if (needed > 0) and (len(norm) >= 3):
+            seen = set(found)
+            word_ids, other_ids = [], []
+            for n_checked, row_id in enumerate(self._substring_ids_for(norm).tolist()):
+                if (row_id in seen) or (norm not in self.norms[row_id]):
+                    continue
+                if f" {norm}" in self.norms[row_id]:
+                    word_ids.append(row_id)
+                elif len(other_ids) < needed:
+                    other_ids.append(row_id)
+                # Word prefix matches rank before other substrings, but scans are bounded
+                if (len(word_ids) >= needed) or \
+                        ((len(other_ids) >= needed) and (n_checked >= const.TAXONOMY_SEARCH_MAX_CANDIDATES)):
+                    break
+            found += word_ids + other_ids
+        found = list(dict.fromkeys(found))
+        return [{'code': self.codes[row_id], 'descriptor': self.descriptors[row_id]} for row_id in found[:limit]]
+
+
+    def __repr__(self):
+        return self.__str__()
+
+
+    def __str__(self, detailed=True, prefix='  ├─', root_prefix=''):
+        ret_val = f"{root_prefix}<'factiva.analytics.{str(self.__class__).split('.')[-1]}\n"
+        ret_val += f"{prefix}codes: {len(self.codes):,d}\n"
+        ret_val += f"{prefix[0:-2]}└─trigrams: {len(self._trigram_keys):,d}"
+        return ret_val
+
+
+
+def normalize_text(series) -> pd.Series:
+    """Lower-cases text and collapses repeated whitespace"""
+    return series.astype(str).str.lower().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def trigram_pairs(texts):
+    """Calculates the character trigrams of multiple strings
+    Trigrams are encoded as 63-bit integers, with 21 bits per character.
+    Parameters
+    ----------
+    texts : list
+        Normalised strings. Must not contain null characters.
+    Returns
+    -------
+    tuple
+        Arrays with the trigram keys and the position of the source string
+    """
+    if len(texts) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    joined = np.frombuffer(('\x00'.join(texts) + '\x00').encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    lengths = np.fromiter((len(text) + 1 for text in texts), dtype=np.int64, count=len(texts))
+    row_ids = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    if len(joined) < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    first, second, third = joined[:-2], joined[1:-1], joined[2:]
+    valid = (first != 0) & (second != 0) & (third != 0)
+    keys = (first << 42) | (second << 21) | third
+    return keys[valid], row_ids[:-2][valid]
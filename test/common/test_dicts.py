@@ -0,0 +1,36 @@
+import pandas as pd
+from factiva.analytics.common import dicts
+
+
+def test_hierarchy_files_load():
+    assert dicts.industries_hierarchy().shape[0] > 0
+    assert dicts.regions_hierarchy().shape[0] > 0
+    assert 'usa' in dicts.countries_list().index
+
+
+def test_rollup_counts_multiple_parents():
+    ts_df = pd.DataFrame({'publication_datetime': ['2023-01', '2023-01'], 'region_codes': ['turk', 'usa'], 'count': [5, 3]})
+    r_df = dicts.rollup_counts(ts_df, hierarchy='regions').set_index('region_codes')
+    assert r_df.loc['world', 'count'] == 8
+    assert r_df.loc['world', 'level'] == 0
+    assert r_df.loc['balkz', 'count'] == 5
+    assert r_df.loc['wasiaz', 'count'] == 5
+
+
+def test_rollup_counts_industries():
+    r_df = dicts.rollup_counts(pd.DataFrame({'industry_codes': ['i01001', 'i0', 'xyz'], 'count': [1, 2, 4]}))
+    assert r_df.set_index('industry_codes')['count'].to_dict() == {'i0': 3, 'i01001': 1, 'indroot': 3, 'xyz': 4}
+
+
+def test_rollup_counts_dimension_code_pairs():
+    ts_df = pd.DataFrame({'publication_datetime': ['2023-01'] * 3,
+                          'dimension': pd.Categorical(['region_codes', 'region_codes', 'source_code']),
+                          'code': pd.Categorical(['turk', 'usa', 'djdn']), 'count': [5, 3, 7]})
+    r_df = dicts.rollup_counts(ts_df, hierarchy='regions')
+    assert r_df.columns.tolist() == ['publication_datetime', 'dimension', 'code', 'count', 'level']
+    regions = r_df[r_df['dimension'] == 'region_codes'].set_index('code')
+    assert regions.loc['world', 'count'] == 8
+    assert regions.loc['balkz', 'count'] == 5
+    others = r_df[r_df['dimension'] == 'source_code']
+    assert others[['code', 'count']].values.tolist() == [['djdn', 7]]
+    assert others['level'].isna().all()
@@ -0,0 +1,36 @@
+import pytest
+from factiva.analytics.common import dicts
+from factiva.analytics.common.hierarchy import HierarchyIndex
+
+
+def test_from_edges_multiple_parents():
+    h_index = HierarchyIndex.from_edges(['root', 'a', 'b', 'c', 'c'], ['', 'root', 'root', 'a', 'b'])
+    assert h_index.parents('c') == ['a', 'b']
+    assert h_index.ancestors('c') == ['a', 'b', 'root']
+    assert h_index.descendants('root') == ['a', 'b', 'c']
+    assert h_index.is_ancestor('root', 'c')
+    assert not h_index.is_ancestor('c', 'root')
+    assert h_index.level('c') == 2
+    with pytest.raises(AttributeError):
+        h_index.codes = None
+
+
+def test_cycle_detection():
+    with pytest.raises(ValueError, match='cycle'):
+        HierarchyIndex.from_edges(['a', 'b'], ['b', 'a'])
+
+
+def test_save_load_roundtrip(tmp_path):
+    h_index = dicts.industries_index()
+    h_index.save(tmp_path / 'ind.npz')
+    loaded = HierarchyIndex.load(tmp_path / 'ind.npz')
+    assert loaded.descendants('i0') == h_index.descendants('i0')
+    assert dicts.industries_index() is h_index
+
+
+def test_shipped_indexes_match_csv():
+    r_index = dicts.regions_index()
+    assert r_index.parents('turk') == ['balkz', 'wasiaz']
+    assert r_index.ancestors('usa')[-1] == 'world'
+    fresh = dicts._load_index(dicts.reg_hrchy_path, '/nonexistent.npz', 'reg_fcode')
+    assert fresh.codes.tolist() == r_index.codes.tolist()
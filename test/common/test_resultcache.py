@@ -0,0 +1,49 @@
+import os
+import pandas as pd
+from factiva.analytics.common import ResultCache, const
+
+PAYLOAD = {'query': {'where': "language_code = 'en'", 'frequency': 'MONTH', 'top': 10}}
+
+
+def test_make_key_is_canonical():
+    reordered = {'query': {'top': 10, 'frequency': 'MONTH', 'where': "language_code = 'en'"}}
+    assert ResultCache.make_key(PAYLOAD, 'a' * 32) == ResultCache.make_key(reordered, 'a' * 32)
+    assert ResultCache.make_key(PAYLOAD, 'a' * 32) != ResultCache.make_key(PAYLOAD, 'b' * 32)
+
+
+def test_get_set_ttl_and_eviction(tmp_path):
+    r_cache = ResultCache(cache_folder=str(tmp_path), ttl={const.RESULT_CACHE_EXPLAIN: 0}, max_entries=2)
+    key = r_cache.make_key(PAYLOAD, 'a' * 32)
+    ts_df = pd.DataFrame({'publication_datetime': ['2023-01'], 'count': [10]})
+    r_cache.set(const.RESULT_CACHE_TIMESERIES, key, {'job_id': 'abc', 'data': ts_df})
+    pd.testing.assert_frame_equal(r_cache.get(const.RESULT_CACHE_TIMESERIES, key)['data'], ts_df)
+    r_cache.set(const.RESULT_CACHE_EXPLAIN, key, {'job_id': 'abc', 'volume_estimate': 10})
+    assert r_cache.get(const.RESULT_CACHE_EXPLAIN, key) is None
+    os.utime(r_cache._entry_path(const.RESULT_CACHE_TIMESERIES, key), (0, 0))
+    r_cache.set(const.RESULT_CACHE_EXPLAIN, 'k2', 1)
+    r_cache.set(const.RESULT_CACHE_EXPLAIN, 'k3', 2)
+    assert r_cache.get(const.RESULT_CACHE_TIMESERIES, key) is None
+    assert r_cache.clear() == 2
+
+
+def test_entries_removed_concurrently(tmp_path, monkeypatch):
+    r_cache = ResultCache(cache_folder=str(tmp_path), ttl={const.RESULT_CACHE_EXPLAIN: -1}, max_entries=1)
+    real_remove, real_utime = os.remove, os.utime
+
+    def removed_before(function):
+        # Simulates another process removing the entry right before the call
+        def wrapper(f_path, *args, **kwargs):
+            if os.path.exists(f_path):
+                real_remove(f_path)
+            return function(f_path, *args, **kwargs)
+        return wrapper
+
+    r_cache.set(const.RESULT_CACHE_TIMESERIES, 'k1', 1)
+    r_cache.set(const.RESULT_CACHE_EXPLAIN, 'k2', 2)
+    monkeypatch.setattr(os, 'utime', removed_before(real_utime))
+    monkeypatch.setattr(os, 'remove', removed_before(real_remove))
+    assert r_cache.get(const.RESULT_CACHE_EXPLAIN, 'k2') is None
+    r_cache.set(const.RESULT_CACHE_TIMESERIES, 'k1', 1)
+    assert r_cache.get(const.RESULT_CACHE_TIMESERIES, 'k1') == 1
+    r_cache.set(const.RESULT_CACHE_TIMESERIES, 'k3', 3)
+    assert r_cache.clear() == 0
@@ -0,0 +1,12 @@
+import pytest
+from factiva.analytics import UserKey
+
+OFFLINE_USER_KEY = 'a' * 32
+
+
+@pytest.fixture
+def offline_user_key(monkeypatch):
+    # UserKey instance that doesn't validate the key against the API
+    monkeypatch.setattr(UserKey, 'is_active', lambda self: True)
+    monkeypatch.setattr(UserKey, 'get_cloud_token', lambda self: True)
+    return UserKey(OFFLINE_USER_KEY)
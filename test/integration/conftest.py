@@ -0,0 +1,49 @@
+import json
+import pytest
+import fastavro
+import pandas as pd
+
+TEST_AVRO_SCHEMA = {
+    'type': 'record',
+    'name': 'Article',
+    'fields': [
+        {'name': 'an', 'type': 'string'},
+        {'name': 'title', 'type': 'string'},
+        {'name': 'snippet', 'type': 'string'},
+        {'name': 'body', 'type': 'string'},
+        {'name': 'source_code', 'type': 'string'},
+        {'name': 'subject_codes', 'type': 'string'},
+        {'name': 'word_count', 'type': 'int'},
+        {'name': 'publication_datetime', 'type': 'long'},
+        {'name': 'modification_datetime', 'type': 'long'},
+        {'name': 'art', 'type': 'string'}
+    ]
+}
+TEST_RECORDS = [{
+    'an': f"DJDN000020230101ej1100{i:03d}",
+    'title': f"Title {i}",
+    'snippet': 'Snippet',
+    'body': 'Body',
+    'source_code': 'DJDN',
+    'subject_codes': ',c11,ccat,',
+    'word_count': 100 + i,
+    'publication_datetime': 1672531200000 + i * 3600000,
+    'modification_datetime': 1672531200000 + i * 3600000,
+    'art': ''
+} for i in range(10)]
+
+
+@pytest.fixture
+def snapshot_folder(tmp_path):
+    with open(tmp_path / 'part-000.avro', 'wb') as fp:
+        fastavro.writer(fp, TEST_AVRO_SCHEMA, TEST_RECORDS)
+    with open(tmp_path / 'part-001.json', 'w', encoding='utf-8') as fp:
+        for record in TEST_RECORDS:
+            fp.write(f"{json.dumps(record)}\n")
+    pd.DataFrame(TEST_RECORDS).to_csv(tmp_path / 'part-002.csv', index=False)
+    return tmp_path
+
+
+@pytest.fixture
+def test_records():
+    return TEST_RECORDS
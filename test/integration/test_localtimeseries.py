@@ -0,0 +1,32 @@
+import pytest
+import pandas as pd
+from factiva.analytics.integration import LocalTimeSeries, SnapshotFiles
+
+
+def test_month_subject_codes(snapshot_folder):
+    lts = LocalTimeSeries(group_dimension='subject_codes', top=-1)
+    ts_df = lts.from_folder(snapshot_folder, chunksize=4)
+    assert list(ts_df.columns) == ['publication_datetime', 'subject_codes', 'count']
+    assert ts_df['subject_codes'].dtype == 'category'
+    assert ts_df['count'].tolist() == [30, 30]
+    assert (ts_df['publication_datetime'] == pd.Timestamp('2023-01-01')).all()
+
+
+def test_day_top_and_dataframe(snapshot_folder):
+    r_df = SnapshotFiles().read_file(snapshot_folder / 'part-000.avro')
+    lts = LocalTimeSeries(frequency='day', group_dimension='source_code', top=1)
+    ts_df = lts.from_dataframe(r_df)
+    assert ts_df.shape[0] == 1
+    assert ts_df['count'].iloc[0] == 10
+    assert LocalTimeSeries(frequency='YEAR').from_dataframe(r_df)['count'].tolist() == [10]
+
+
+def test_top_per_period():
+    r_df = pd.DataFrame({
+        'publication_datetime': pd.to_datetime(['2023-01-01'] * 4 + ['2023-01-02'] * 3),
+        'source_code': ['A', 'A', 'A', 'B', 'B', 'B', 'A']})
+    ts_df = LocalTimeSeries(frequency='DAY', group_dimension='source_code', top=1).from_dataframe(r_df)
+    assert ts_df['source_code'].astype(str).tolist() == ['A', 'B']
+    assert ts_df['count'].tolist() == [3, 2]
+    with pytest.raises(ValueError, match='integer greater than or equal to -1'):
+        LocalTimeSeries(top=-2)
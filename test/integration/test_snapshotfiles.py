@@ -0,0 +1,147 @@
+import os
+import pytest
+import pandas as pd
+from factiva.analytics import SnapshotFiles
+from factiva.analytics.common import const
+
+def test_detect_file_format(snapshot_folder):
+    sf = SnapshotFiles()
+    assert sf.detect_file_format(snapshot_folder / 'part-000.avro') == const.API_AVRO_FORMAT
+    assert sf.detect_file_format(snapshot_folder / 'part-001.json') == const.API_JSON_FORMAT
+    assert sf.detect_file_format(snapshot_folder / 'part-002.csv') == const.API_CSV_FORMAT
+
+
+@pytest.mark.parametrize('file_name', ['part-000.avro', 'part-001.json', 'part-002.csv'])
+def test_read_file_same_output(snapshot_folder, file_name):
+    sf = SnapshotFiles()
+    r_df = sf.read_file(snapshot_folder / file_name, merge_body=True)
+    assert r_df.shape == (10, 8)
+    assert 'art' not in r_df.columns
+    assert 'snippet' not in r_df.columns
+    assert r_df['body'].iloc[0] == 'Snippet\n\nBody'
+    assert r_df['publication_datetime'].dtype == 'datetime64[ms]'
+    assert r_df['publication_datetime'].iloc[1] == pd.Timestamp('2023-01-01 01:00:00')
+    assert r_df['word_count'].sum() == 1045
+
+
+@pytest.mark.parametrize('file_name', ['part-000.avro', 'part-001.json', 'part-002.csv'])
+def test_read_file_all_fields_merge_body(snapshot_folder, file_name):
+    sf = SnapshotFiles()
+    r_df = sf.read_file(snapshot_folder / file_name, all_fields=True, merge_body=True)
+    assert 'snippet' not in r_df.columns
+    assert r_df['body'].iloc[0] == 'Snippet\n\nBody'
+    assert 'snippet' in sf.read_file(snapshot_folder / file_name, all_fields=True).columns
+
+
+def test_read_csv_empty_cells_are_null(tmp_path, test_records):
+    csv_records = pd.DataFrame(test_records[:2]).astype(str)
+    csv_records.loc[1, ['subject_codes', 'modification_datetime']] = ''
+    csv_records.to_csv(tmp_path / 'part-000.csv', index=False)
+    with open(tmp_path / 'part-001.json', 'w', encoding='utf-8') as fp:
+        fp.write(csv_records.iloc[[1]].drop(columns=['subject_codes', 'modification_datetime']).to_json(orient='records', lines=True))
+    sf = SnapshotFiles()
+    csv_df = sf.read_file(tmp_path / 'part-000.csv', all_fields=True)
+    json_df = sf.read_file(tmp_path / 'part-001.json', all_fields=True)
+    assert pd.isna(csv_df['subject_codes'].iloc[1])
+    assert pd.isna(csv_df['modification_datetime'].iloc[1])
+    assert csv_df['modification_datetime'].iloc[0] == pd.Timestamp('2023-01-01')
+    assert 'modification_datetime' not in json_df.columns
+    assert csv_df['an'].iloc[1] == json_df['an'].iloc[0]
+
+
+def test_iter_file_projection(snapshot_folder):
+    sf = SnapshotFiles()
+    chunks = list(sf.iter_file(snapshot_folder / 'part-001.json', chunksize=4, columns=['an', 'publication_datetime']))
+    assert [c_df.shape for c_df in chunks] == [(4, 2), (4, 2), (2, 2)]
+
+
+def test_read_folder(snapshot_folder):
+    sf = SnapshotFiles()
+    assert sf.read_avro_folder(snapshot_folder).shape[0] == 10
+    assert sf.read_avro_folder(snapshot_folder, file_format='JSON').shape[0] == 10
+    r_df = sf.read_folder(snapshot_folder, stats_only=True)
+    assert r_df.shape[0] == 30
+    assert 'body' not in r_df.columns
+
+
+def test_parquet_sidecar_cache(snapshot_folder, tmp_path_factory):
+    pytest.importorskip('pyarrow')
+    cache_folder = tmp_path_factory.mktemp('cache')
+    sf = SnapshotFiles(parquet_cache=True, cache_folder=str(cache_folder))
+    avro_path = snapshot_folder / 'part-000.avro'
+    first_df = sf.read_file(avro_path, columns=['an', 'publication_datetime'])
+    assert len(list(cache_folder.glob('*.parquet'))) == 1
+    cached_df = sf.read_file(avro_path, columns=['an', 'publication_datetime'])
+    pd.testing.assert_frame_equal(first_df, cached_df)
+    pd.testing.assert_frame_equal(sf.read_file(avro_path), SnapshotFiles().read_file(avro_path))
+    os.utime(avro_path, ns=(0, 0))
+    sf.read_file(avro_path, columns=['an'])
+    assert len(list(cache_folder.glob('*.parquet'))) == 1
+    assert sf.clear_cache(avro_path) == 1
+    assert len(list(cache_folder.glob('*.parquet'))) == 0
+
+
+def test_to_parquet_dataset(snapshot_folder, tmp_path_factory):
+    pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+    out_dir = tmp_path_factory.mktemp('dataset')
+    sf = SnapshotFiles()
+    assert sf.to_parquet_dataset(snapshot_folder, str(out_dir), file_format='avro', chunksize=4, stats_only=True) == 10
+    assert (out_dir / 'publication_date=2023-01-01' / 'source_code=DJDN').is_dir()
+    dataset = ds.dataset(str(out_dir), format='parquet', partitioning='hive')
+    assert dataset.count_rows(filter=ds.field('source_code') == 'DJDN') == 10
+
+
+def test_to_parquet_dataset_new_columns(snapshot_folder, test_records, tmp_path_factory):
+    pytest.importorskip('pyarrow')
+    extra_folder = tmp_path_factory.mktemp('extra')
+    pd.DataFrame(test_records[:2]).to_csv(extra_folder / 'part-000.csv', index=False)
+    pd.DataFrame(test_records[2:4]).assign(region_codes=',usa,').to_csv(extra_folder / 'part-001.csv', index=False)
+    sf = SnapshotFiles()
+    with pytest.raises(ValueError, match='region_codes'):
+        sf.to_parquet_dataset(extra_folder, str(tmp_path_factory.mktemp('dataset')), all_fields=True)
+    assert sf.to_parquet_dataset(extra_folder, str(tmp_path_factory.mktemp('dataset')),
+                                 columns=['an', 'source_code', 'region_codes']) == 4
+
+
+def test_deduplicate_keeps_latest(snapshot_folder, test_records, tmp_path_factory):
+    update_folder = tmp_path_factory.mktemp('update')
+    updated = pd.DataFrame(test_records[:3]).assign(title='Updated', modification_datetime=1675209600000)
+    updated.to_csv(update_folder / 'part-000.csv', index=False)
+    sf = SnapshotFiles()
+    r_df = sf.drop_duplicates(pd.concat([sf.read_folder(update_folder), sf.read_folder(snapshot_folder, file_format='avro')]))
+    assert r_df.shape[0] == 10
+    assert (r_df['title'] == 'Updated').sum() == 3
+    assert sf.last_dedup_stats['duplicate_rows'] == 3
+    chunks = list(sf.iter_deduplicated([snapshot_folder, update_folder], stats_only=True, num_buckets=4, chunksize=2))
+    d_df = pd.concat(chunks)
+    assert d_df['an'].is_unique
+    assert d_df.shape[0] == 10
+    assert (d_df['title'] == 'Updated').sum() == 3
+    assert sf.last_dedup_stats == {'total_rows': 33, 'unique_rows': 10, 'duplicate_rows': 23, 'duplicated_ans': 10}
+
+
+def test_deduplicate_missing_order_value(snapshot_folder, test_records, tmp_path_factory):
+    update_folder = tmp_path_factory.mktemp('update')
+    pd.DataFrame(test_records[:2]).assign(title='Undated', modification_datetime='').to_csv(update_folder / 'part-000.csv', index=False)
+    sf = SnapshotFiles()
+    r_df = sf.drop_duplicates(pd.concat([sf.read_folder(snapshot_folder, file_format='avro'), sf.read_folder(update_folder)]))
+    assert (r_df['title'] == 'Undated').sum() == 0
+    d_df = pd.concat(sf.iter_deduplicated([update_folder, snapshot_folder], num_buckets=3, chunksize=3))
+    assert d_df['an'].is_unique
+    assert (d_df['title'] == 'Undated').sum() == 0
+
+
+def test_to_parquet_dataset_reexport(test_records, tmp_path_factory):
+    pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+    source_folder = tmp_path_factory.mktemp('source')
+    out_dir = tmp_path_factory.mktemp('dataset')
+    pd.DataFrame(test_records).assign(source_code=['DJDN', 'WSJO'] * 5).to_csv(source_folder / 'part-000.csv', index=False)
+    sf = SnapshotFiles()
+    assert sf.to_parquet_dataset(source_folder, str(out_dir), stats_only=True, max_rows_per_file=2, row_group_size=2) == 10
+    assert (out_dir / 'publication_date=2023-01-01' / 'source_code=WSJO').is_dir()
+    pd.DataFrame(test_records[:3]).to_csv(source_folder / 'part-000.csv', index=False)
+    assert sf.to_parquet_dataset(source_folder, str(out_dir), stats_only=True, max_rows_per_file=2, row_group_size=2) == 3
+    assert not list((out_dir / 'publication_date=2023-01-01' / 'source_code=WSJO').glob('*.parquet'))
+    assert ds.dataset(str(out_dir), format='parquet', partitioning='hive').count_rows() == 3
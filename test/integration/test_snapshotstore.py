@@ -0,0 +1,24 @@
+import pandas as pd
+from factiva.analytics.integration import SnapshotStore
+
+
+def test_load_and_query(snapshot_folder):
+    s = SnapshotStore(':memory:')
+    assert s.load_folder(snapshot_folder, file_format='avro', stats_only=True, batch_size=4) == 10
+    assert s.count_documents() == 10
+    r_df = s.get_documents(codes=['CCAT'], code_field='subject_codes',
+                           start_date='2023-01-01 02:00:00', end_date='2023-01-01 04:00:00')
+    assert r_df['an'].tolist() == ['DJDN000020230101ej1100002', 'DJDN000020230101ej1100003']
+    assert r_df['publication_datetime'].iloc[0] == pd.Timestamp('2023-01-01 02:00:00')
+    codes = s.query("SELECT code, COUNT(*) AS docs FROM document_codes GROUP BY code ORDER BY code")
+    assert codes.to_dict('records') == [{'code': 'c11', 'docs': 10}, {'code': 'ccat', 'docs': 10}]
+
+
+def test_reload_and_delete(snapshot_folder):
+    s = SnapshotStore(':memory:')
+    s.load_folder(snapshot_folder, file_format='avro', stats_only=True)
+    assert s.load_folder(snapshot_folder, file_format='json', stats_only=True) == 10
+    assert s.count_documents() == 10
+    assert s.delete_documents(['DJDN000020230101ej1100000', 'DJDN000020230101ej1100001']) == 2
+    assert s.count_documents() == 8
+    assert s.query("SELECT COUNT(*) AS n FROM document_codes")['n'].iloc[0] == 16
@@ -87,6 +87,15 @@ def test_failed_where_and_jobid():
         se = SnapshotExtraction(query=VALID_WHERE_STATEMENT, job_id='abcd1234-ab12-ab12-ab12-abcdef123456')
         assert isinstance(se, SnapshotExtraction)
 
+def test_auto_shards_query():
+    seq = SnapshotExtractionQuery(VALID_WHERE_STATEMENT, shards='auto')
+    with pytest.raises(ValueError, match=r'Shards set to auto*'):
+        seq.get_payload()
+    assert seq.resolve_shards(1000) == const.API_EXTRACTION_MIN_SHARDS
+    assert seq.resolve_shards(10000000) == 306
+    assert seq.get_payload()['query']['shards'] == 306
+    assert seq.resolve_shards(10 ** 10) == const.API_EXTRACTION_MAX_SHARDS
+
 
 # Test operations sending requests to the API
 # These are only executed when running locally. For optimisation purposes
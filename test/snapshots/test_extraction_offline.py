@@ -0,0 +1,41 @@
+from factiva.analytics import SnapshotExtraction, SnapshotExtractionQuery
+from factiva.analytics.common import ResultCache, const
+from factiva.analytics.snapshots.explain import SnapshotExplain, SnapshotExplainJobResponse
+
+VALID_WHERE_STATEMENT = "publication_datetime >= '2023-01-01 00:00:00' AND LOWER(language_code) = 'en'"
+
+
+def test_resolved_shards_follow_query_changes():
+    seq = SnapshotExtractionQuery(VALID_WHERE_STATEMENT, shards='auto')
+    assert seq.resolve_shards(10000000) == 306
+    seq.where = f"{VALID_WHERE_STATEMENT} AND source_code = 'DJDN'"
+    assert seq.resolved_shards is None
+    assert seq.resolve_shards(1000) == const.API_EXTRACTION_MIN_SHARDS
+    seq.includes = {'source_code': ['WSJO']}
+    assert seq.resolved_shards is None
+    seq.resolve_shards(10000000)
+    seq.file_format = 'json'
+    assert seq.resolved_shards is None
+
+
+def test_volume_estimate_uses_result_cache(offline_user_key, monkeypatch, tmp_path):
+    submitted = []
+
+    def submit_job(self):
+        submitted.append(self.query.where)
+        self.job_response = SnapshotExplainJobResponse(f"explain-{len(submitted)}")
+        self.job_response.job_state = const.API_JOB_DONE_STATE
+        self.job_response.volume_estimate = 1000 * len(submitted)
+        return True
+
+    monkeypatch.setattr(SnapshotExplain, 'submit_job', submit_job)
+    monkeypatch.setattr(SnapshotExplain, 'get_job_response', lambda self: True)
+    r_cache = ResultCache(cache_folder=str(tmp_path))
+    se = SnapshotExtraction(query=VALID_WHERE_STATEMENT, user_key=offline_user_key)
+    assert se.get_volume_estimate(use_cache=r_cache) == 1000
+    assert se.get_volume_estimate(use_cache=r_cache) == 1000
+    assert len(submitted) == 1
+    # Expired volumes are requested again
+    r_cache.ttl[const.RESULT_CACHE_EXPLAIN] = -1
+    assert se.get_volume_estimate(use_cache=r_cache) == 2000
+    assert se.get_volume_estimate(use_cache=False) == 3000
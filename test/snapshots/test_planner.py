@@ -0,0 +1,82 @@
+import os
+import re
+import pytest
+import pandas as pd
+from factiva.analytics import SnapshotExtractionPlanner, SnapshotExtractionQuery
+from factiva.analytics.common import const
+from factiva.analytics.snapshots import planner as planner_module
+
+BASE_WHERE = "LOWER(language_code) = 'en'"
+# Stubbed explain volumes: 1,000 documents per day in January, none in February
+DAILY_VOLUME = 1000
+
+
+def _stub_volume(self, date_range):
+    start_date, end_date = date_range
+    end_date = min(end_date, pd.Timestamp('2023-02-01'))
+    return max(0, int((end_date - start_date).total_seconds() / 86400 * DAILY_VOLUME))
+
+
+def test_plan_bisects_until_under_max_volume(monkeypatch, offline_user_key):
+    monkeypatch.setattr(SnapshotExtractionPlanner, '_explain_volume', _stub_volume)
+    planner = SnapshotExtractionPlanner(BASE_WHERE, '2023-01-01', '2023-03-01', user_key=offline_user_key,
+                                        max_volume=10000, min_slice_seconds=3600)
+    slices = planner.plan()
+    assert (slices['volume_estimate'] <= 10000).all()
+    assert slices['volume_estimate'].sum() == 31 * DAILY_VOLUME
+    # Ranges are contiguous and the empty February half is discarded
+    assert slices['start_date'].iloc[0] == pd.Timestamp('2023-01-01')
+    assert (slices['start_date'].iloc[1:].values == slices['end_date'].iloc[:-1].values).all()
+    assert slices['end_date'].iloc[-1] == pd.Timestamp('2023-03-01')
+    assert planner._slice_where(*planner.split_range(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'))[1]) == (
+        f"({BASE_WHERE}) AND publication_datetime >= '2023-01-01 12:00:00' "
+        "AND publication_datetime < '2023-01-02 00:00:00'")
+
+
+def test_plan_min_slice_seconds(monkeypatch, offline_user_key):
+    monkeypatch.setattr(SnapshotExtractionPlanner, '_explain_volume', _stub_volume)
+    planner = SnapshotExtractionPlanner(BASE_WHERE, '2023-01-01', '2023-01-03', user_key=offline_user_key,
+                                        max_volume=100, min_slice_seconds=86400)
+    slices = planner.plan()
+    assert slices['volume_estimate'].tolist() == [DAILY_VOLUME, DAILY_VOLUME]
+
+
+class _StubJobResponse():
+    def __init__(self, short_id):
+        self.short_id = short_id
+        self.job_state = const.API_JOB_DONE_STATE
+
+
+class _StubExtraction():
+    # Writes two files per slice, with the same names in every slice
+    def __init__(self, user_key=None, query=None):
+        start_day = re.search(r">= '\d{4}-\d{2}-(\d{2})", query.where).group(1)
+        self.job_response = _StubJobResponse(f"id{start_day}")
+
+    def process_job(self, path=None):
+        os.makedirs(path)
+        for file_name in ['part-000.avro', 'part-001.avro']:
+            with open(os.path.join(path, file_name), 'wb') as fp:
+                fp.write(b'Obj\x01')
+        return True
+
+
+def test_process_jobs_renames_slice_files(monkeypatch, offline_user_key, tmp_path):
+    monkeypatch.setattr(SnapshotExtractionPlanner, '_explain_volume', _stub_volume)
+    monkeypatch.setattr(planner_module, 'SnapshotExtraction', _StubExtraction)
+    planner = SnapshotExtractionPlanner(BASE_WHERE, '2023-01-01', '2023-01-05', user_key=offline_user_key,
+                                        max_volume=2000, min_slice_seconds=3600)
+    assert planner.process_jobs(path=str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        f"id{day:02d}-part-{part:03d}.avro" for day in [1, 3] for part in range(2)]
+    assert planner.slices['files'].tolist() == [2, 2]
+    assert planner.slices['job_state'].tolist() == [const.API_JOB_DONE_STATE] * 2
+
+
+def test_planner_query_checks(offline_user_key):
+    with pytest.raises(ValueError, match='limit'):
+        SnapshotExtractionPlanner(SnapshotExtractionQuery(BASE_WHERE, limit=100), '2023-01-01', '2023-01-05',
+                                  user_key=offline_user_key)
+    planner = SnapshotExtractionPlanner(' ', '2023-01-01', '2023-01-05', user_key=offline_user_key)
+    assert planner._slice_where(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02')) == (
+        "publication_datetime >= '2023-01-01 00:00:00' AND publication_datetime < '2023-01-02 00:00:00'")
@@ -0,0 +1,200 @@
+import re
+import pytest
+import pandas as pd
+from factiva.analytics import SnapshotTimeSeries, SnapshotTimeSeriesQuery
+from factiva.analytics.common import const, req, tools
+from factiva.analytics.common.cache import ResultCache
+from factiva.analytics.snapshots.time_series import (SnapshotTimeSeriesJobReponse, _iter_timeseries_records,
+                                                     _period_to_timestamp, _timeseries_frame, stitch_time_series)
+
+BASE_WHERE = "LOWER(language_code) = 'en'"
+JOB_ID = 'abcd1234-ab12-ab12-ab12-abcdef123456'
+
+
+@pytest.fixture
+def stub_jobs(monkeypatch):
+    # Replaces process_job with a stub that returns monthly counts from the
+    # current series, starting at the date condition added to the where clause.
+    # With a group dimension, counts per value are taken from 'groups'.
+    state = {'series': {'2023-01': 10, '2023-02': 20, '2023-03': 30}, 'wheres': [], 'tops': [],
+             'groups': {'2023-01': {'A': 5, 'B': 3, 'C': 1}, '2023-02': {'A': 2, 'B': 4, 'C': 1}}}
+
+    def process_job(self, use_cache=False):
+        state['wheres'].append(self.query.where)
+        state['tops'].append(self.query.top)
+        start = re.search(r">= '(\d{4}-\d{2})", self.query.where)
+        self.job_response = SnapshotTimeSeriesJobReponse(JOB_ID)
+        self.job_response.job_state = const.API_JOB_DONE_STATE
+        if self.query.group_dimension:
+            rows = [(period, code, count) for period, counts in state['groups'].items()
+                    if (not start) or (period >= start.group(1)) for code, count in counts.items()]
+            ts_df = pd.DataFrame(rows, columns=['publication_datetime', self.query.group_dimension, 'count'])
+            ts_df['publication_datetime'] = pd.to_datetime(ts_df['publication_datetime'])
+            self.job_response.data = tools.top_per_period(ts_df, 'publication_datetime',
+                                                          self.query.group_dimension, self.query.top)
+            return True
+        periods = [period for period in state['series'] if (not start) or (period >= start.group(1))]
+        self.job_response.data = pd.DataFrame({
+            'publication_datetime': pd.to_datetime(periods),
+            'count': [state['series'][period] for period in periods]})
+        return True
+
+    monkeypatch.setattr(SnapshotTimeSeries, 'process_job', process_job)
+    return state
+
+
+def _counts(ts):
+    return dict(zip(ts.job_response.data['publication_datetime'].dt.strftime('%Y-%m'),
+                    ts.job_response.data['count']))
+
+
+def test_process_job_incremental(stub_jobs, offline_user_key, tmp_path):
+    r_cache = ResultCache(cache_folder=str(tmp_path))
+    ts = SnapshotTimeSeries(user_key=offline_user_key, query=SnapshotTimeSeriesQuery(BASE_WHERE))
+    assert ts.process_job_incremental(use_cache=r_cache)
+    assert stub_jobs['wheres'] == [BASE_WHERE]
+
+    # The last stored period is recomputed and new periods are appended
+    stub_jobs['series'].update({'2023-01': 99, '2023-03': 35, '2023-04': 40})
+    ts.process_job_incremental(use_cache=r_cache)
+    assert stub_jobs['wheres'][-1] == f"({BASE_WHERE}) AND publication_datetime >= '2023-03-01 00:00:00'"
+    assert _counts(ts) == {'2023-01': 10, '2023-02': 20, '2023-03': 35, '2023-04': 40}
+
+    ts.process_job_incremental(overlap_periods=2, use_cache=r_cache)
+    assert stub_jobs['wheres'][-1] == f"({BASE_WHERE}) AND publication_datetime >= '2023-03-01 00:00:00'"
+    assert _counts(ts) == {'2023-01': 10, '2023-02': 20, '2023-03': 35, '2023-04': 40}
+
+    # Not enough stored periods for the overlap
+    ts.process_job_incremental(overlap_periods=4, use_cache=r_cache)
+    assert stub_jobs['wheres'][-1] == BASE_WHERE
+    assert _counts(ts)['2023-01'] == 99
+
+
+def test_process_job_incremental_top(stub_jobs, offline_user_key, tmp_path):
+    r_cache = ResultCache(cache_folder=str(tmp_path))
+    query = SnapshotTimeSeriesQuery(BASE_WHERE, group_dimension='source_code', top=2)
+    ts = SnapshotTimeSeries(user_key=offline_user_key, query=query)
+    ts.process_job_incremental(use_cache=r_cache)
+    stub_jobs['groups']['2023-02'] = {'A': 2, 'B': 4, 'C': 6}
+    stub_jobs['groups']['2023-03'] = {'C': 1}
+    ts.process_job_incremental(use_cache=r_cache)
+    # Only the delta is requested, with all values, and top is applied per period
+    assert stub_jobs['wheres'][-1] == f"({BASE_WHERE}) AND publication_datetime >= '2023-02-01 00:00:00'"
+    assert stub_jobs['tops'] == [2, -1]
+    r_df = ts.job_response.data
+    assert list(zip(r_df['publication_datetime'].dt.strftime('%Y-%m'), r_df['source_code'], r_df['count'])) == [
+        ('2023-01', 'A', 5), ('2023-01', 'B', 3), ('2023-02', 'C', 6), ('2023-02', 'B', 4), ('2023-03', 'C', 1)]
+
+
+def test_period_to_timestamp():
+    periods = _period_to_timestamp(pd.Series(['2023', '2023-02', '2023-03-15']))
+    assert periods.tolist() == [pd.Timestamp('2023-01-01'), pd.Timestamp('2023-02-01'), pd.Timestamp('2023-03-15')]
+    timestamps = pd.Series(pd.to_datetime(['2023-01-01']))
+    assert _period_to_timestamp(timestamps) is timestamps
+
+
+def test_iter_timeseries_records():
+    records = [{'publication_datetime': '2023-01', 'source_code': 'DJDN', 'count': 5},
+               {'publication_datetime': '2023-01', 'count': 2},
+               {'publication_datetime': '2023-02', 'source_code': 'WSJO', 'count': '7', 'extra': 1}]
+    chunks = list(_iter_timeseries_records(iter(records), 'publication_datetime', 'source_code', chunksize=2))
+    assert [len(c_df) for c_df in chunks] == [2, 1]
+    assert chunks[0]['source_code'].dtype == 'category'
+    assert pd.isna(chunks[0]['source_code'].iloc[1])
+    assert chunks[1]['count'].dtype == 'int64'
+    assert chunks[1]['extra'].tolist() == [1]
+    r_df = next(_iter_timeseries_records(records, 'publication_datetime', 'source_code'))
+    assert r_df.shape == (3, 4)
+    assert r_df['count'].sum() == 14
+    assert pd.isna(r_df['extra'].iloc[0])
+    empty_df = next(_iter_timeseries_records([], 'publication_datetime'))
+    assert empty_df.empty
+
+
+def test_timeseries_frame():
+    r_df = _timeseries_frame({'publication_datetime': ['2023-01-01', '2023-01-02'], 'count': [1, 2],
+                              'region_codes': ['usa', 'fra']}, 'publication_datetime', 'region_codes')
+    assert r_df['publication_datetime'].dtype.kind == 'M'
+    assert r_df['count'].dtype == 'int64'
+    assert r_df['region_codes'].dtype == 'category'
+
+
+class _FakeResponse():
+    status_code = 200
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.chunk_size = None
+        self.closed = False
+
+    def iter_lines(self, chunk_size=512):
+        self.chunk_size = chunk_size
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+
+def test_iter_results_streams_download(monkeypatch, offline_user_key):
+    lines = [f'{{"publication_datetime": "2023-{m:02d}", "source_code": "S{m % 3}", "count": {m}}}'.encode()
+             for m in range(1, 13)] + [b'']
+    response = _FakeResponse(lines)
+    monkeypatch.setattr(req, 'api_send_request', lambda **kwargs: response)
+    monkeypatch.setattr(const, 'TIMESERIES_RESULTS_CHUNKSIZE', 5)
+    query = SnapshotTimeSeriesQuery(BASE_WHERE, group_dimension='source_code')
+    ts = SnapshotTimeSeries(user_key=offline_user_key, query=query)
+    ts.job_response = SnapshotTimeSeriesJobReponse(JOB_ID)
+    ts.job_response.job_state = const.API_JOB_DONE_STATE
+    ts.job_response.download_link = 'https://example.com/results.jsonl'
+    assert [len(c_df) for c_df in ts.iter_results(chunksize=4)] == [4, 4, 4]
+    assert response.chunk_size == const.DOWNLOAD_CHUNK_SIZE
+    assert response.closed
+    r_df = next(ts.iter_results(chunksize=None))
+    assert r_df.columns.tolist() == ['publication_datetime', 'source_code', 'count']
+    assert r_df['source_code'].dtype == 'category'
+    assert r_df['source_code'].tolist() == [f"S{m % 3}" for m in range(1, 13)]
+    assert r_df['count'].sum() == 78
+
+
+def test_stitch_time_series():
+    first = pd.DataFrame({'publication_datetime': ['2023-01', '2023-02'], 'source_code': ['DJDN', 'DJDN'], 'count': [1, 2]})
+    # Second range starts in the middle of February, so its counts are added
+    second = pd.DataFrame({'publication_datetime': ['2023-02', '2023-03'], 'source_code': ['DJDN', 'WSJO'], 'count': [3, 4]})
+    r_df = stitch_time_series([('source_code', first), ('source_code', second), ('source_code', None)])
+    assert r_df.columns.tolist() == ['publication_datetime', 'dimension', 'code', 'count']
+    assert r_df['code'].dtype == 'category'
+    assert list(zip(r_df['publication_datetime'].dt.strftime('%Y-%m'), r_df['code'], r_df['count'])) == [
+        ('2023-01', 'DJDN', 1), ('2023-02', 'DJDN', 5), ('2023-03', 'WSJO', 4)]
+    totals = stitch_time_series([(None, first[['publication_datetime', 'count']]), (None, second)])
+    assert totals['count'].tolist() == [1, 5, 4]
+    assert totals['dimension'].isna().all()
+    assert stitch_time_series([]).columns.tolist() == ['publication_datetime', 'dimension', 'code', 'count']
+
+
+def test_multi(monkeypatch, offline_user_key):
+    submitted = []
+
+    def submit_job(self, payload=None):
+        submitted.append(self.query.get_payload()['query'])
+        self.job_response = SnapshotTimeSeriesJobReponse(JOB_ID)
+        self.job_response.job_state = const.API_JOB_RUNNING_STATE
+        return True
+
+    def get_job_response(self, download_data=True):
+        dimension = self.query.group_dimension
+        month = re.search(r">= '\d{4}-(\d{2})", self.query.where).group(1)
+        self.job_response.job_state = const.API_JOB_DONE_STATE
+        self.job_response.data = pd.DataFrame({'publication_datetime': [f"2023-{month}"] * 2,
+                                               dimension: [f"{dimension}-a", f"{dimension}-b"], 'count': [1, 2]})
+        return True
+
+    monkeypatch.setattr(SnapshotTimeSeries, 'submit_job', submit_job)
+    monkeypatch.setattr(SnapshotTimeSeries, 'get_job_response', get_job_response)
+    r_df = SnapshotTimeSeries.multi(BASE_WHERE, group_dimensions=['source_code', 'region_codes'],
+                                    date_ranges=[('2023-01-01', '2023-02-01'), ('2023-02-01', '2023-03-01')],
+                                    user_key=offline_user_key)
+    assert len(submitted) == 4
+    assert sorted(q['group_dimensions'][0] for q in submitted) == ['region_codes'] * 2 + ['source_code'] * 2
+    assert r_df.shape == (8, 4)
+    assert r_df.groupby('dimension', observed=True)['count'].sum().to_dict() == {'region_codes': 6, 'source_code': 6}
+    assert set(r_df['code']) == {'source_code-a', 'source_code-b', 'region_codes-a', 'region_codes-b'}
@@ -0,0 +1,110 @@
+import json
+import pytest
+import pandas as pd
+from factiva.analytics import SnapshotUpdate
+from factiva.analytics.integration import SnapshotFiles, SnapshotStore
+from factiva.analytics.common import const
+
+
+def _record(i, title='Original'):
+    return {
+        'an': f"DJDN000020230101ej1100{i:03d}",
+        'title': title,
+        'source_code': 'DJDN',
+        'subject_codes': ',c11,',
+        'word_count': 100 + i,
+        'publication_datetime': 1672531200000 + i * 3600000,
+        'modification_datetime': 1672531200000 + i * 3600000
+    }
+
+
+def _write_json(folder, records):
+    folder.mkdir(parents=True, exist_ok=True)
+    with open(folder / 'part-000.json', 'w', encoding='utf-8') as fp:
+        for record in records:
+            fp.write(f"{json.dumps(record)}\n")
+
+
+@pytest.fixture
+def update_folders(tmp_path):
+    # Original documents 0-4. Updates add 5 and 6, replace 1 and 2 (and 6), and
+    # delete 3 and 2, so AN 2 is both replaced and deleted.
+    _write_json(tmp_path / 'extraction', [_record(i) for i in range(5)])
+    _write_json(tmp_path / 'updates' / 'additions', [_record(5, 'Added'), _record(6, 'Added')])
+    _write_json(tmp_path / 'updates' / 'replacements', [_record(1, 'Replaced'), _record(2, 'Replaced'),
+                                                        _record(6, 'Replaced')])
+    _write_json(tmp_path / 'updates' / 'deletes', [{'an': _record(3)['an']}, {'an': _record(2)['an']}])
+    return tmp_path
+
+
+@pytest.fixture
+def snapshot_update(offline_user_key):
+    return SnapshotUpdate(snapshot_id='abcd1234xy', user_key=offline_user_key)
+
+
+EXPECTED_TITLES = {0: 'Original', 1: 'Replaced', 4: 'Original', 5: 'Added', 6: 'Replaced'}
+
+
+def _titles(r_df):
+    return {int(an[-3:]): title for an, title in zip(r_df['an'], r_df['title'])}
+
+
+def test_apply_to_store(update_folders, snapshot_update):
+    store = SnapshotStore(':memory:')
+    store.load_folder(update_folders / 'extraction')
+    applied = snapshot_update.apply_to_store(store, path=str(update_folders / 'updates'))
+    assert applied == {'additions': 2, 'replacements': 3, 'deletes': 2}
+    assert _titles(store.get_documents()) == EXPECTED_TITLES
+
+
+def test_apply_to_parquet(update_folders, snapshot_update):
+    pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+    dataset_dir = update_folders / 'dataset'
+    SnapshotFiles().to_parquet_dataset(update_folders / 'extraction', str(dataset_dir), stats_only=True)
+    applied = snapshot_update.apply_to_parquet(str(dataset_dir), path=str(update_folders / 'updates'), stats_only=True)
+    assert applied == {'additions': 1, 'replacements': 2, 'deletes': 2, 'rewritten_files': 1}
+    r_df = ds.dataset(str(dataset_dir), format='parquet', partitioning='hive').to_table().to_pandas()
+    assert r_df['an'].is_unique
+    assert _titles(r_df) == EXPECTED_TITLES
+
+    # A second update with the same folder must not overwrite the files added before
+    _write_json(update_folders / 'updates' / 'additions', [_record(7, 'Added')])
+    for u_type in ['replacements', 'deletes']:
+        (update_folders / 'updates' / u_type / 'part-000.json').unlink()
+    snapshot_update.apply_to_parquet(str(dataset_dir), path=str(update_folders / 'updates'), stats_only=True)
+    r_df = ds.dataset(str(dataset_dir), format='parquet', partitioning='hive').to_table().to_pandas()
+    assert _titles(r_df) == {**EXPECTED_TITLES, 7: 'Added'}
+
+
+def test_download_files_clears_previous_updates(update_folders, snapshot_update):
+    snapshot_update.job_responses = {}
+    assert not snapshot_update.download_files(path=str(update_folders / 'updates'))
+    for u_type in const.API_UPDATE_TYPES:
+        assert list((update_folders / 'updates' / u_type).iterdir()) == []
+
+
+def test_update_ids_with_full_job_ids(offline_user_key, monkeypatch):
+    requested = []
+
+    class _JobResponse(object):
+        status_code = 200
+
+        def __init__(self, url):
+            self.url = url
+
+        def json(self):
+            return {'data': {'attributes': {'current_state': 'JOB_STATE_RUNNING'}}, 'links': {'self': self.url}}
+
+    def api_send_request(method='GET', endpoint_url=None, headers=None, **kwargs):
+        requested.append(endpoint_url)
+        return _JobResponse(endpoint_url)
+
+    monkeypatch.setattr('factiva.analytics.common.req.api_send_request', api_send_request)
+    job_ids = [f"dj-synhub-extraction-{offline_user_key.key}-abcd1234xy-{update_type}-20230201120000"
+               for update_type in ['additions', 'deletes']]
+    su = SnapshotUpdate(update_ids=job_ids, user_key=offline_user_key)
+    assert su.snapshot_id == 'abcd1234xy'
+    assert su.update_types == ['additions', 'deletes']
+    assert su.job_responses['deletes'].update_id == 'abcd1234xy-deletes-20230201120000'
+    assert len(requested) == 2
@@ -0,0 +1,63 @@
+import threading
+import pytest
+from factiva.analytics.taxonomy.company_identifiers import FactivaCompany
+from factiva.analytics.common import const, req
+from factiva.analytics.common.cache import ResultCache
+
+
+class _FakeResponse():
+    def __init__(self, ids):
+        self.status_code = 207
+        self.ids = ids
+
+    def json(self):
+        return {'data': {'attributes': {
+            'successes': [{'id': c_id, 'fcode': f"F{c_id[-3:]}"} for c_id in self.ids if not c_id.startswith('BAD')],
+            'failures': [{'id': c_id, 'title': 'Not found'} for c_id in self.ids if c_id.startswith('BAD')]}}}
+
+
+@pytest.fixture
+def companies_api(monkeypatch):
+    requests = []
+    lock = threading.Lock()
+
+    def api_send_request(method='GET', endpoint_url=None, headers=None, payload=None, **kwargs):
+        assert endpoint_url.endswith('/isin')
+        with lock:
+            requests.append(payload['data']['attributes']['ids'])
+        return _FakeResponse(payload['data']['attributes']['ids'])
+
+    monkeypatch.setattr(req, 'api_send_request', api_send_request)
+    return requests
+
+
+def test_get_multiple_companies_chunks(companies_api, offline_user_key):
+    codes = [f"US{i:010d}" for i in range(25)] + ['BAD0000001', 'US0000000003']
+    c = FactivaCompany(user_key=offline_user_key)
+    r_df = c.get_multiple_companies('isin', codes, chunksize=10, max_workers=3)
+    assert sorted(len(chunk) for chunk in companies_api) == [6, 10, 10]
+    assert sorted(code for chunk in companies_api for code in chunk) == sorted(set(codes))
+    assert len(r_df) == 25
+    assert r_df['id'].is_unique
+    assert c.failures['id'].tolist() == ['BAD0000001']
+
+
+def test_get_multiple_companies_cache(companies_api, offline_user_key, tmp_path, monkeypatch):
+    r_cache = ResultCache(cache_folder=str(tmp_path))
+    codes = ['US0000000001', 'US0000000002', 'BAD0000001']
+    r_df = FactivaCompany(user_key=offline_user_key).get_multiple_companies('isin', codes, use_cache=r_cache)
+    assert len(r_df) == 2
+
+    # A new instance reads resolved identifiers from disk. Failures are requested again.
+    c = FactivaCompany(user_key=offline_user_key)
+    r_df = c.get_multiple_companies('isin', codes + ['US0000000003'], use_cache=r_cache)
+    assert companies_api[-1] == ['BAD0000001', 'US0000000003']
+    assert sorted(r_df['id']) == ['US0000000001', 'US0000000002', 'US0000000003']
+
+    # Expired entries are requested again, and dropped from the stored entry
+    monkeypatch.setattr(const, 'COMPANY_IDENTIFIERS_CACHE_TTL', -1)
+    c = FactivaCompany(user_key=offline_user_key)
+    c.get_multiple_companies('isin', ['US0000000001'], use_cache=r_cache)
+    assert companies_api[-1] == ['US0000000001']
+    cache_key = r_cache.make_key({'code_type': 'isin'}, offline_user_key)
+    assert r_cache.get(const.RESULT_CACHE_COMPANY_IDENTIFIERS, cache_key) == {}
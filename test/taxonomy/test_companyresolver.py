@@ -0,0 +1,21 @@
+from factiva.analytics.taxonomy import CompanyNameResolver
+
+CODES = ['MCROST', 'IBM', 'APPLC', 'MICROC']
+NAMES = ['Microsoft Corp', 'International Business Machines Corp', 'Apple Inc', 'Micron Technology Inc']
+
+
+def test_resolve_and_persist(tmp_path):
+    resolver = CompanyNameResolver.from_names(CODES, NAMES)
+    matches = resolver.resolve(['microsoft corporation', 'Intl Business Machines', '', 'Apple'],
+                               top_k=2, max_workers=1)
+    best = matches[matches['rank'] == 1].set_index('query_index')['code'].to_dict()
+    assert best == {0: 'MCROST', 1: 'IBM', 3: 'APPLC'}
+    assert matches['score'].between(0, 1).all()
+    assert matches.loc[matches['query_index'] == 0, 'score'].iloc[0] > 0.99
+    assert len(resolver.resolve(['microsoft'], top_k=2, min_score=0.5, max_workers=1)) == 1
+
+    r_path = str(tmp_path / 'resolver.npz')
+    resolver.save(r_path)
+    loaded = CompanyNameResolver.load(r_path)
+    assert len(loaded) == 4
+    assert loaded.resolve(['apple'], max_workers=1).equals(resolver.resolve(['apple'], max_workers=1))
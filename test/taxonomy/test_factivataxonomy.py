@@ -57,3 +57,48 @@ def test_lookup_code_good():
     assert 'code' in mcat.keys()
     assert 'descriptor' in mcat.keys()
     assert mcat['code'] == 'MCAT'
+
+
+def test_lookup_codes_bulk():
+    time.sleep(const.TEST_REQUEST_SPACING_SECONDS)
+    t = FactivaTaxonomy()
+    regions = t.lookup_codes(['usa', 'FRA', 'NOTACODE', 'USA'], FactivaTaxonomyCategories.REGIONS)
+    assert isinstance(regions, pd.DataFrame)
+    assert regions['code'].tolist() == ['USA', 'FRA', 'NOTACODE', 'USA']
+    assert regions.loc['FRA', 'descriptor'] == t.lookup_code('FRA', FactivaTaxonomyCategories.REGIONS)['descriptor']
+    assert pd.isna(regions.loc['NOTACODE', 'descriptor'])
+
+
+def test_get_category_hierarchy():
+    time.sleep(const.TEST_REQUEST_SPACING_SECONDS)
+    t = FactivaTaxonomy()
+    ind_hrchy = t.get_category_hierarchy(FactivaTaxonomyCategories.INDUSTRIES)
+    assert 'I16' in ind_hrchy
+    assert 'I162' in ind_hrchy.descendants('I16')
+    assert ind_hrchy.is_ancestor('I16', 'I162')
+    assert not ind_hrchy.is_ancestor('I162', 'I16')
+    assert ind_hrchy is t.get_category_hierarchy(FactivaTaxonomyCategories.INDUSTRIES)
+    with pytest.raises(ValueError):
+        t.get_category_hierarchy(FactivaTaxonomyCategories.COMPANIES)
+
+
+def test_enrich_dataframe():
+    time.sleep(const.TEST_REQUEST_SPACING_SECONDS)
+    t = FactivaTaxonomy()
+    articles = pd.DataFrame({'region_codes': [',usa,fra,notacode,', None]})
+    enriched = t.enrich(articles, output='parallel')
+    assert enriched['region_codes_list'].tolist() == [['USA', 'FRA', 'NOTACODE'], []]
+    descriptors = enriched['region_codes_descriptors'].iloc[0]
+    assert descriptors[0] == t.lookup_code('USA', FactivaTaxonomyCategories.REGIONS)['descriptor']
+    assert descriptors[2] is None
+    with pytest.raises(ValueError):
+        t.enrich(articles, columns=['language_code'])
+
+
+def test_prefetch_categories():
+    time.sleep(const.TEST_REQUEST_SPACING_SECONDS)
+    t = FactivaTaxonomy()
+    futures = t.prefetch([FactivaTaxonomyCategories.REGIONS])
+    assert futures[FactivaTaxonomyCategories.REGIONS.value].result(timeout=300)
+    assert isinstance(t.all_regions, pd.DataFrame)
+    assert t.lookup_code('USA', FactivaTaxonomyCategories.REGIONS)['code'] == 'USA'
@@ -0,0 +1,41 @@
+import pandas as pd
+from factiva.analytics.taxonomy import PointInTimeIndex
+
+PIT_DATA = pd.DataFrame({
+    'isin': ['US0001', 'us0001', 'GB0002', 'GB0003'],
+    'fcode': ['abcx', 'bcdx', 'cdex', 'defx'],
+    'start_date': ['2010-01-01', '2015-06-01', None, '2020-01-01'],
+    'end_date': ['2015-05-31', None, '2012-12-31', '2020-12-31']
+})
+
+
+def test_interval_lookup(tmp_path):
+    csv_path = str(tmp_path / 'pit-isin.csv')
+    PIT_DATA.to_csv(csv_path, index=False)
+    pit_index = PointInTimeIndex.from_file(csv_path)
+    assert len(pit_index) == 4
+    assert 'us0001' in pit_index
+    codes = pit_index.lookup(['US0001', 'US0001', 'us0001', 'GB0002', 'GB0002', 'GB0003', 'XX0000'],
+                             ['2009-12-31', '2015-05-31', '2024-01-01', '1990-01-01', '2013-01-01',
+                              '2020-12-31', '2020-01-01'])
+    assert codes.fillna('').tolist() == ['', 'ABCX', 'BCDX', 'CDEX', '', 'DEFX', '']
+    assert pit_index.lookup(['US0001', 'GB0003'], '2020-06-01').tolist() == ['BCDX', 'DEFX']
+
+    npz_path = str(tmp_path / 'pit-isin.npz')
+    pit_index.save(npz_path)
+    assert PointInTimeIndex.load(npz_path).lookup(['GB0003'], '2020-06-01').tolist() == ['DEFX']
+
+
+def test_overlapping_intervals():
+    pit_df = pd.DataFrame({
+        'isin': ['X', 'X', 'X', 'Y', 'Y'],
+        'fcode': ['A', 'B', 'C', 'D', 'E'],
+        'start_date': ['2000-01-01', '2005-01-01', '2005-06-01', '2000-01-01', '2001-01-01'],
+        'end_date': [None, '2006-01-01', '2005-06-30', '2000-12-31', '2001-12-31']
+    })
+    pit_index = PointInTimeIndex.from_dataframe(pit_df)
+    dates = ['1999-12-31', '2004-12-31', '2005-01-01', '2005-06-15', '2005-07-01', '2006-01-01', '2006-01-02', '2010-01-01']
+    assert pit_index.lookup(['X'] * len(dates), dates).fillna('').tolist() == ['', 'A', 'B', 'C', 'B', 'B', 'A', 'A']
+    # Values without overlaps are not split
+    assert pit_index.lookup(['Y', 'Y', 'Y'], ['2000-12-31', '2001-01-01', '2002-01-01']).fillna('').tolist() == ['D', 'E', '']
+    assert len(pit_index) == 7
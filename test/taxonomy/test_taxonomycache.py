@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from factiva.analytics.taxonomy import TaxonomyCache
+
+USER_KEY = 'a' * 32
+
+
+def test_write_read_and_revalidation(tmp_path):
+    t_cache = TaxonomyCache(cache_folder=str(tmp_path), revalidate_after=3600)
+    assert t_cache.get_metadata('regions', USER_KEY) is None
+    r_df = pd.DataFrame({'Code': ['WEURZ', 'FRA'], 'Descriptor': ['Western Europe', 'France'],
+                         'direct_parents_1': [np.nan, 'WEURZ']})
+    t_cache.write('regions', USER_KEY, r_df, '"v1"', etag='"v1"')
+    metadata = t_cache.get_metadata('regions', USER_KEY)
+    assert metadata['version'] == '"v1"'
+    assert not t_cache.needs_revalidation(metadata)
+    c_df = t_cache.read('regions', USER_KEY)
+    assert c_df['Code'].tolist() == ['WEURZ', 'FRA']
+    assert pd.isna(c_df['direct_parents_1'].iloc[0])
+    assert t_cache.get_metadata('regions', 'b' * 32) is None
+
+    t_cache.revalidate_after = -1
+    assert t_cache.needs_revalidation(t_cache.get_metadata('regions', USER_KEY))
+    t_cache.revalidate_after = 3600
+    t_cache.touch('regions', USER_KEY)
+    assert t_cache.get_metadata('regions', USER_KEY)['validated_at'] >= metadata['validated_at']
+    assert t_cache.clear() == 1
@@ -0,0 +1,16 @@
+from factiva.analytics.taxonomy import TaxonomySearchIndex
+
+CODES = ['APPL', 'PNAPGR', 'APPLE', 'GNMOTR', 'MOTLA']
+DESCRIPTORS = ['Apple Inc', 'Pineapple Growers', 'Apple', 'General Motors Co', 'Motorola']
+
+
+def test_search_ranking():
+    s_index = TaxonomySearchIndex(CODES, DESCRIPTORS)
+    assert len(s_index) == 5
+    assert [r['code'] for r in s_index.search('apple')] == ['APPLE', 'APPL', 'PNAPGR']
+    assert [r['code'] for r in s_index.search('  MOTOR ')] == ['MOTLA', 'GNMOTR']
+    assert [r['code'] for r in s_index.search('growers')] == ['PNAPGR']
+    assert s_index.search('gnmotr') == [{'code': 'GNMOTR', 'descriptor': 'General Motors Co'}]
+    assert len(s_index.search('app', limit=2)) == 2
+    assert s_index.search('xyz') == []
+    assert s_index.search('') == []
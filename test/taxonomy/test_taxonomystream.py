@@ -0,0 +1,138 @@
+import io
+import time
+import threading
+import pandas as pd
+from factiva.analytics import FactivaTaxonomy, FactivaTaxonomyCategories
+from factiva.analytics.taxonomy.factiva_taxonomies import _category_usecols
+
+REGIONS_CSV = ("Code,Descriptor,Description,direct_parents_1,direct_parents_2,indirect_parents_1\n"
+               "usa,United States,United States of America,namz,,\n"
+               "namz,North America,,,,\n"
+               "0001,Numeric Region,Leading zeros,usa,namz,namz\n").encode('utf-8')
+
+
+class _FakeResponse(object):
+
+    def __init__(self, content):
+        self.status_code = 200
+        self.headers = {}
+        self.raw = io.BytesIO(content)
+
+
+def test_read_category_stream_keeps_codes_as_text():
+    response = _FakeResponse(REGIONS_CSV)
+    r_df = FactivaTaxonomy._read_category_stream(response)
+    assert response.raw.decode_content is True
+    assert r_df['Code'].tolist() == ['usa', 'namz', '0001']
+    assert pd.isna(r_df.loc[1, 'Description'])
+
+
+def test_category_usecols():
+    usecols = _category_usecols(FactivaTaxonomyCategories.REGIONS, ['descriptor', 'direct_parent'])
+    r_df = FactivaTaxonomy._read_category_stream(_FakeResponse(REGIONS_CSV), usecols)
+    assert r_df.columns.tolist() == ['Code', 'Descriptor', 'direct_parents_1']
+    usecols = _category_usecols(FactivaTaxonomyCategories.COMPANIES, ['descriptor'])
+    assert usecols('description') and usecols('code')
+    assert not usecols('isin') and not usecols('direct_parents_1')
+
+
+def test_column_filtered_codes_are_not_kept(offline_user_key, monkeypatch):
+    requests = []
+
+    def request_category(self, category, extra_headers=None):
+        requests.append(category)
+        return _FakeResponse(REGIONS_CSV)
+
+    monkeypatch.setattr(FactivaTaxonomy, '_request_category', request_category)
+    f = FactivaTaxonomy(user_key=offline_user_key)
+    p_df = f.get_category_codes(FactivaTaxonomyCategories.REGIONS, columns=['descriptor'])
+    assert p_df.columns.tolist() == ['code', 'descriptor']
+    assert p_df.index.tolist() == ['USA', 'NAMZ', '0001']
+    assert f.all_regions is None
+    assert f.lookup_code('0001', FactivaTaxonomyCategories.REGIONS)['direct_parent'] == 'usa'
+    assert f.all_regions.columns.tolist() == ['code', 'descriptor', 'description', 'direct_parent']
+    assert f.get_category_hierarchy(FactivaTaxonomyCategories.REGIONS).is_ancestor('NAMZ', '0001')
+    assert len(requests) == 2
+
+
+def test_concurrent_calls_wait_for_prefetch(offline_user_key, monkeypatch):
+    downloads = []
+    release = threading.Event()
+
+    def download_category_df(self, category, usecols=None):
+        downloads.append(category)
+        release.wait(5)
+        return FactivaTaxonomy._read_category_stream(_FakeResponse(REGIONS_CSV), usecols)
+
+    monkeypatch.setattr(FactivaTaxonomy, '_download_category_df', download_category_df)
+    f = FactivaTaxonomy(user_key=offline_user_key)
+    futures = f.prefetch([FactivaTaxonomyCategories.REGIONS])
+    results = {}
+    threads = [
+        threading.Thread(target=lambda: results.update(
+            lookup=f.lookup_code('usa', FactivaTaxonomyCategories.REGIONS))),
+        threading.Thread(target=lambda: results.update(
+            codes=f.get_category_codes(FactivaTaxonomyCategories.REGIONS, columns=['descriptor'])))
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    assert not results
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert futures['regions'].result() is True
+    assert downloads == [FactivaTaxonomyCategories.REGIONS]
+    assert results['lookup']['descriptor'] == 'United States'
+    assert results['codes'].columns.tolist() == ['code', 'descriptor']
+    assert results['codes'].shape[0] == 3
+
+
+def test_accessors_wait_for_prefetch(offline_user_key, monkeypatch):
+    downloads = []
+    release = threading.Event()
+
+    def download_category_df(self, category, usecols=None):
+        downloads.append(category)
+        release.wait(5)
+        return FactivaTaxonomy._read_category_stream(_FakeResponse(REGIONS_CSV), usecols)
+
+    monkeypatch.setattr(FactivaTaxonomy, '_download_category_df', download_category_df)
+    f = FactivaTaxonomy(user_key=offline_user_key)
+    f.prefetch([FactivaTaxonomyCategories.REGIONS])
+    category = FactivaTaxonomyCategories.REGIONS
+    results = {}
+    accessors = {
+        'codes': lambda: f.lookup_codes(['USA', '0001'], category),
+        'hierarchy': lambda: f.get_category_hierarchy(category),
+        'search': lambda: f.get_search_index(category)
+    }
+    threads = [threading.Thread(target=lambda name=name, accessor=accessor: results.update({name: accessor()}))
+               for name, accessor in accessors.items()]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    assert not results
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert downloads == [category]
+    assert results['codes']['descriptor'].tolist() == ['United States', 'Numeric Region']
+    assert results['hierarchy'].is_ancestor('NAMZ', '0001')
+    assert results['search'] is f.get_search_index(category)
+
+    # A new download replaces the dataset and all derived indexes
+    f.get_category_codes(category)
+    assert f.get_search_index(category) is not results['search']
+    assert f.get_category_hierarchy(category) is not results['hierarchy']
+
+
+def test_company_resolver_follows_dataset(offline_user_key, monkeypatch):
+    companies_csv = b"code,description\nabc,Alpha Beta Corp\nxyz,Xylo Systems\n"
+    monkeypatch.setattr(FactivaTaxonomy, '_request_category',
+                        lambda self, category, extra_headers=None: _FakeResponse(companies_csv))
+    f = FactivaTaxonomy(user_key=offline_user_key)
+    resolver = f.get_company_resolver()
+    assert f.get_company_resolver() is resolver
+    f.get_category_codes(FactivaTaxonomyCategories.COMPANIES)
+    assert f.get_company_resolver() is not resolver